@@ -0,0 +1,159 @@
+import ipaddress
+from functools import lru_cache
+
+# Address checks used by the command builders and by job file plans. Parsed values are cached, since
+# fleet-wide plans repeat the same masks, DNS servers and gateways on many devices.
+
+
+@lru_cache(maxsize=8192)
+def parse_ipv4(text) -> ipaddress.IPv4Address:
+    # raises ValueError with a message suitable for the user
+    try:
+        return ipaddress.IPv4Address(str(text))
+    except ValueError:
+        raise ValueError(f"'{text}' is not a valid IPv4 address.") from None
+
+
+def is_ipv4(text) -> bool:
+    if not isinstance(text, str):
+        return False
+    try:
+        parse_ipv4(text)
+    except ValueError:
+        return False
+    return True
+
+
+def invalid_addresses(values) -> list:
+    # the values of a list that are not IPv4 addresses, for checking many addresses at once
+    return [value for value in values if not is_ipv4(value)]
+
+
+@lru_cache(maxsize=256)
+def parse_netmask(mask) -> int:
+    # returns the prefix length of a dotted mask ("255.255.255.0") or a prefix ("/24" or "24")
+    text = str(mask).strip().lstrip('/')
+    try:
+        # masks that are not contiguous (255.0.255.0) are rejected here
+        network = ipaddress.IPv4Network(f'0.0.0.0/{text}')
+    except ValueError:
+        network = None
+    # ipaddress also accepts wildcard masks (0.0.0.255), which IOS does not take in these commands
+    if network is None or ('.' in text and str(network.netmask) != text):
+        raise ValueError(f"'{mask}' is not a valid subnet mask.")
+    return network.prefixlen
+
+
+@lru_cache(maxsize=256)
+def dotted_netmask(mask) -> str:
+    # the mask in the form IOS expects ("/24" -> "255.255.255.0")
+    return str(ipaddress.IPv4Address(_mask_bits(parse_netmask(mask))))
+
+
+def interface_network(ip, mask) -> ipaddress.IPv4Network:
+    # the subnet an interface address belongs to; built from integers, which is much faster than
+    # letting ipaddress parse an "address/prefix" string
+    prefixlen = parse_netmask(mask)
+    return ipaddress.IPv4Network((int(parse_ipv4(ip)) & _mask_bits(prefixlen), prefixlen))
+
+
+def _mask_bits(prefixlen) -> int:
+    return (0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF
+
+
+def check_host_address(ip, network, what='address') -> None:
+    address = int(parse_ipv4(ip))
+    first = int(network.network_address)
+    last = first | (0xFFFFFFFF >> network.prefixlen)
+    if not first <= address <= last:
+        raise ValueError(f"The {what} {ip} is not in the subnet {network}.")
+    if network.prefixlen < 31 and address in (first, last):
+        raise ValueError(f"The {what} {ip} is the network or broadcast address of {network}.")
+
+
+def check_hsrp(real_ip, subnet_mask, virtual_ip) -> ipaddress.IPv4Network:
+    # the virtual IP must be a different host address in the interface's subnet
+    network = interface_network(real_ip, subnet_mask)
+    check_host_address(real_ip, network, 'interface address')
+    check_host_address(virtual_ip, network, 'HSRP virtual IP')
+    if parse_ipv4(virtual_ip) == parse_ipv4(real_ip):
+        raise ValueError(f"The HSRP virtual IP cannot be the interface's own address ({real_ip}).")
+    return network
+
+
+def check_dhcp_pool(network_address, netmask, default_router, excluded_start=None,
+                    excluded_end=None) -> ipaddress.IPv4Network:
+    # the pool must be given by its network address, and the default router and excluded range must lie inside it
+    network = interface_network(network_address, netmask)
+    if network.network_address != parse_ipv4(network_address):
+        raise ValueError(f"{network_address} is not the network address of its subnet; use {network.network_address}.")
+    check_host_address(default_router, network, 'default router')
+    if excluded_start or excluded_end:
+        if not (excluded_start and excluded_end):
+            raise ValueError("Give both the first and the last excluded address.")
+        check_host_address(excluded_start, network, 'first excluded address')
+        check_host_address(excluded_end, network, 'last excluded address')
+        if parse_ipv4(excluded_start) > parse_ipv4(excluded_end):
+            raise ValueError(f"The excluded range {excluded_start} - {excluded_end} ends before it starts.")
+    return network
+
+
+def classful_network(ip) -> str:
+    # the classful network IOS stores for a RIP 'network' statement (10.1.2.0 -> 10.0.0.0)
+    address = int(parse_ipv4(ip))
+    first_octet = address >> 24
+    prefixlen = 8 if first_octet < 128 else 16 if first_octet < 192 else 24
+    return str(ipaddress.IPv4Address(address & _mask_bits(prefixlen)))
+
+
+def find_overlaps(networks) -> list:
+    # networks: (label, IPv4Network) pairs; returns (label, network, other label, other network) for each
+    # network that overlaps an earlier one. Sorting once makes this O(n log n) instead of comparing every pair:
+    # CIDR blocks either nest or are disjoint, so a block overlaps exactly when it starts inside the widest
+    # block seen so far.
+    overlaps = []
+    enclosing = None
+    for label, network in sorted(networks, key=lambda item: (item[1].network_address, item[1].prefixlen)):
+        if enclosing is not None and network.network_address <= enclosing[1].broadcast_address:
+            overlaps.append((label, network) + enclosing)
+            if network.broadcast_address <= enclosing[1].broadcast_address:
+                continue
+        enclosing = (label, network)
+    return overlaps
+
+
+class AddressPlan:
+    # Addresses assigned by all the operations of a job file, checked together before anything is sent:
+    # an interface address used on two devices, an HSRP virtual IP equal to an interface address,
+    # and DHCP pools that overlap on the same or on different routers.
+    def __init__(self):
+        self._interfaces = {}  # address -> (hostname, interface)
+        self._virtual_ips = []  # (address, hostname, group)
+        self._pools = []  # (label, network)
+        self._conflicts = []
+
+    def add_operation(self, hostname, name, params) -> None:
+        if name == 'hsrp':
+            self.add_interface(hostname, params['interface'], params['real_ip'])
+            self._virtual_ips.append((parse_ipv4(params['virtual_ip']), hostname, params['group_id']))
+        elif name == 'dhcp_server':
+            network = check_dhcp_pool(params['network_address'], params['netmask'], params['default_router'])
+            self._pools.append((f"pool {params['pool_name']} on {hostname}", network))
+
+    def add_interface(self, hostname, interface, ip) -> None:
+        address = parse_ipv4(ip)
+        owner = self._interfaces.setdefault(address, (hostname, interface))
+        if owner != (hostname, interface):
+            self._conflicts.append(f"{address} is assigned to {owner[1]} on {owner[0]} "
+                                   f"and to {interface} on {hostname}.")
+
+    def conflicts(self) -> list:
+        conflicts = list(self._conflicts)
+        for address, hostname, group in self._virtual_ips:
+            owner = self._interfaces.get(address)
+            if owner is not None:
+                conflicts.append(f"The HSRP virtual IP {address} of group {group} on {hostname} "
+                                 f"is the address of {owner[1]} on {owner[0]}.")
+        for label, network, other_label, other_network in find_overlaps(self._pools):
+            conflicts.append(f"DHCP {label} ({network}) overlaps {other_label} ({other_network}).")
+        return conflicts
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import re
+
+from Metrics import registry
+from SessionRecorder import recorder
+from Vault import vault
+
+try:
+    import asyncssh
+except ImportError:  # without asyncssh the async API falls back to Netmiko in worker threads
+    asyncssh = None
+
+# device types the asyncssh backend knows how to drive (IOS-style prompts, enable, terminal length)
+ASYNCSSH_DEVICE_TYPES = ('cisco_ios', 'cisco_xe', 'cisco_nxos')
+
+# end of a prompt before the hostname is known: "SW1>" or "SW1#"
+ANY_PROMPT = r'[>#]\s*$'
+
+# known_hosts file the devices' SSH host keys are checked against. Without it any host key is accepted, as
+# Netmiko does by default, which leaves the sessions open to a man in the middle on untrusted networks.
+KNOWN_HOSTS = os.environ.get('NETAUTO_KNOWN_HOSTS') or None
+
+
+class NetmikoTransport:
+    # Fallback backend: runs the blocking (pooled) Netmiko calls in worker threads so they can be awaited.
+    def __init__(self, device):
+        self.device = device
+
+    async def connect(self) -> None:
+        # sessions are opened by the connection pool on first use
+        pass
+
+    async def send_command(self, command, read_timeout=30, expect_string=None) -> str:
+        return await asyncio.to_thread(self.device.run_command, command, read_timeout, expect_string)
+
+    async def send_config_set(self, commands) -> str:
+        # the push mode was already applied by Device.push_config_async
+        return await asyncio.to_thread(self.device.push_config, commands, 'full')
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncSSHTransport:
+    # Native asyncio backend: one asyncssh interactive shell per device, so a single event loop
+    # can keep thousands of sessions open without a thread for each of them.
+    def __init__(self, device_details, connect_timeout=30, known_hosts=KNOWN_HOSTS, pool=None):
+        self.device_details = device_details
+        self.connect_timeout = connect_timeout
+        self.known_hosts = known_hosts
+        # ConnectionPool whose circuit breaker (health) and retry policy the connection follows
+        self.pool = pool
+        self._connection = None
+        self._process = None
+        self._prompt = ANY_PROMPT
+
+    async def connect(self) -> None:
+        # same policy as ConnectionPool._open_with_retry: a device whose circuit is open fails at once, failed
+        # attempts are retried after the pool's jittered backoff (wrong credentials are not), and every outcome
+        # is recorded in the circuit breaker; a vault error is raised without retrying
+        details = vault.resolve_details(self.device_details)
+        host = details['host']
+        health = self.pool.health if self.pool else None
+        probe = health.check(host) if health else False
+        # the first attempt after a cooldown only probes the device, without retries
+        attempts = 1 if probe or self.pool is None else self.pool.retries + 1
+        for attempt in range(attempts):
+            try:
+                await self._connect(details)
+            except Exception as e:
+                self._abort()
+                if attempt == attempts - 1 or isinstance(e, (asyncssh.PermissionDenied, PermissionError)):
+                    if health:
+                        health.record_failure(host, e)
+                    raise
+                registry.increment('netauto_retries_total', device=host)
+                await asyncio.sleep(self.pool.backoff(attempt))
+            else:
+                if health:
+                    health.record_success(host)
+                return
+
+    async def _connect(self, details) -> None:
+        host = details['host']
+        with registry.timer('ssh_auth', host):
+            self._connection = await asyncio.wait_for(
+                asyncssh.connect(host, port=details.get('port', 22), username=details['username'],
+                                 password=details['password'], known_hosts=self.known_hosts),
+                self.connect_timeout)
+        with registry.timer('session_prep', host):
+            self._process = await self._connection.create_process(term_type='vt100', term_size=(511, 24))
+            self._process.stdin.write('\n')
+            output = await self._read_until(ANY_PROMPT, self.connect_timeout)
+        last_line = output.strip().splitlines()[-1]
+        base_prompt = last_line[:-1]
+        # the prompt also matches configuration modes, e.g. "SW1(config-if)#"
+        self._prompt = re.escape(base_prompt) + r'(\([^)]*\))?[>#]\s*$'
+
+        if last_line.endswith('>') and details.get('secret'):
+            with registry.timer('enable', host):
+                self._process.stdin.write('enable\n')
+                await self._read_until(r'[Pp]assword:\s*$', self.connect_timeout)
+                self._process.stdin.write(details['secret'] + '\n')
+                output = await self._read_until(self._prompt, self.connect_timeout)
+                if not output.rstrip().endswith('#'):
+                    raise PermissionError(f"Could not enter enable mode on {host}.")
+
+        await self.send_command('terminal length 0')
+        await self.send_command('terminal width 511')
+
+    async def send_command(self, command, read_timeout=30, expect_string=None) -> str:
+        host = self.device_details['host']
+        with registry.timer('command', host):
+            self._process.stdin.write(command + '\n')
+            output = await self._read_until(expect_string or self._prompt, read_timeout)
+        registry.increment('netauto_bytes_total', len(command.encode()) + 1, device=host, direction='sent')
+        registry.increment('netauto_bytes_total', len(output.encode()), device=host, direction='received')
+        recorder.record(host, 'sent', command)
+        recorder.record(host, 'received', output.replace('\r', ''))
+        # drop the echoed command and the trailing prompt
+        lines = output.replace('\r', '').splitlines()
+        if lines and lines[0].strip().endswith(command):
+            lines = lines[1:]
+        if lines and re.search(self._prompt, lines[-1]):
+            lines = lines[:-1]
+        return '\n'.join(lines)
+
+    async def send_config_set(self, commands) -> str:
+        outputs = []
+        for command in ['configure terminal', *commands, 'end']:
+            outputs.append(command)
+            outputs.append(await self.send_command(command))
+        return '\n'.join(line for line in outputs if line)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            await self._connection.wait_closed()
+            self._connection = None
+
+    def _abort(self) -> None:
+        # drops a half-opened connection before the next attempt
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = self._process = None
+        self._prompt = ANY_PROMPT
+
+    async def _read_until(self, pattern, timeout) -> str:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        buffer = ''
+        # only the tail can contain the prompt, so large outputs are not searched again on every chunk
+        while not re.search(pattern, buffer[-512:]):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"Timed out waiting for the prompt of {self.device_details['host']}.")
+            chunk = await asyncio.wait_for(self._process.stdout.read(65536), remaining)
+            if not chunk:
+                raise ConnectionError(f"Connection to {self.device_details['host']} closed.")
+            buffer += chunk
+        return buffer
+
+
+async def open_transport(device):
+    # picks the asyncssh backend when it is installed and supports the device type, Netmiko otherwise
+    if asyncssh is not None and device.device_details['device_type'] in ASYNCSSH_DEVICE_TYPES:
+        transport = AsyncSSHTransport(device.device_details, pool=device.pool)
+    else:
+        # the Netmiko sessions are opened by the pool, with its circuit breaker and retries
+        transport = NetmikoTransport(device)
+    await transport.connect()
+    return transport
@@ -0,0 +1,174 @@
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from Fleet import FleetExecutor, build_device
+
+# lines of 'show running-config' that change without the configuration itself changing
+VOLATILE_PREFIXES = ('Building configuration', 'Current configuration :', '! Last configuration change',
+                     '! NVRAM config last updated', '! No configuration change since last restart',
+                     'ntp clock-period')
+
+
+class ConfigArchive:
+    # Local, content-addressed store of configuration backups. Every distinct config is saved once,
+    # gzip-compressed, under its SHA-256 (objects/ab/abcd....gz); a per-device index (index/<host>.jsonl)
+    # records which version each backup found, so unchanged configs only cost one index line.
+    def __init__(self, root='backups'):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_dir = os.path.join(root, 'index')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def store(self, host, hostname, config) -> tuple:
+        return self.store_lines(host, hostname, config.splitlines())
+
+    def store_lines(self, host, hostname, lines) -> tuple:
+        # saves a config given line by line (e.g. straight from Device.stream_command);
+        # returns (sha256, whether it differs from the device's previous backup)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.tmp')
+        try:
+            # mtime=0 keeps the compressed file identical for identical content
+            with os.fdopen(fd, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as file:
+                for line in lines:
+                    if line.startswith(VOLATILE_PREFIXES):
+                        continue
+                    data = (line.rstrip() + '\n').encode()
+                    digest.update(data)
+                    file.write(data)
+                    size += len(data)
+            sha256 = digest.hexdigest()
+            path = self._object_path(sha256)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        previous = self.latest(host)
+        changed = previous is None or previous['sha256'] != sha256
+        entry = {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'hostname': hostname,
+            'sha256': sha256,
+            'size': size,
+            'changed': changed,
+        }
+        with open(self._index_path(host), 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+        return sha256, changed
+
+    def history(self, host) -> list:
+        # every backup of a device, oldest first
+        try:
+            with open(self._index_path(host), 'r') as file:
+                return [json.loads(line) for line in file if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def latest(self, host):
+        entries = self.history(host)
+        return entries[-1] if entries else None
+
+    def read(self, sha256) -> str:
+        # returns a stored config by its hash (a unique prefix of at least 4 characters is enough)
+        path = self._object_path(self.resolve(sha256))
+        with gzip.open(path, 'rt') as file:
+            return file.read()
+
+    def resolve(self, prefix) -> str:
+        prefix = prefix.lower()
+        if len(prefix) < 4:
+            raise ValueError("Give at least 4 characters of the hash.")
+        directory = os.path.join(self.objects_dir, prefix[:2])
+        names = os.listdir(directory) if os.path.isdir(directory) else []
+        matches = [name[:-3] for name in names if name.endswith('.gz') and name.startswith(prefix)]
+        if len(matches) != 1:
+            raise ValueError(f"No stored config matches '{prefix}'." if not matches
+                             else f"'{prefix}' matches {len(matches)} configs; give more characters.")
+        return matches[0]
+
+    def stats(self) -> dict:
+        objects = disk_bytes = 0
+        for directory, _, names in os.walk(self.objects_dir):
+            for name in names:
+                if name.endswith('.gz'):
+                    objects += 1
+                    disk_bytes += os.path.getsize(os.path.join(directory, name))
+        return {'devices': len(os.listdir(self.index_dir)), 'objects': objects, 'bytes': disk_bytes}
+
+    def _object_path(self, sha256) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], f"{sha256}.gz")
+
+    def _index_path(self, host) -> str:
+        return os.path.join(self.index_dir, f"{host.replace(os.sep, '_')}.jsonl")
+
+
+def backup_fleet(devices, archive: ConfigArchive, max_workers=32, timeout=300) -> list:
+    # fetches the running-config of every device in parallel and stores it in the archive;
+    # configs are streamed into the archive, so large ones are never held in memory whole
+    def action(device):
+        sha256, changed = archive.store_lines(device.device_details['host'], device.hostname,
+                                              device.stream_command('show running-config', read_timeout=120))
+        return f"{'changed' if changed else 'unchanged'}, version {sha256[:12]}"
+
+    results = FleetExecutor(max_workers=max_workers, timeout=timeout).run_and_report(devices, action)
+    stats = archive.stats()
+    print(f"Archive '{archive.root}': {stats['devices']} device(s), {stats['objects']} distinct config(s), "
+          f"{stats['bytes'] / 1024:.0f} KiB on disk.")
+    return results
+
+
+def main():
+    from Menu import load_devices_from_json
+
+    parser = argparse.ArgumentParser(description="Back up the running-config of the devices in devices.json.")
+    parser.add_argument('--devices', default='devices.json', help="device data file (default: devices.json)")
+    parser.add_argument('--archive', default='backups', help="archive directory (default: backups)")
+    parser.add_argument('--parallel', type=int, default=32, help="devices backed up at the same time")
+    parser.add_argument('--timeout', type=int, default=300, help="per-device timeout in seconds")
+    parser.add_argument('--type', help="only back up devices of this type (router/switch)")
+    parser.add_argument('--site', help="only back up devices of this site")
+    parser.add_argument('--history', metavar='HOST', help="list the stored versions of a device instead")
+    parser.add_argument('--show', metavar='HASH', help="print a stored config instead")
+    args = parser.parse_args()
+
+    archive = ConfigArchive(args.archive)
+    if args.history:
+        for entry in archive.history(args.history):
+            print(f"{entry['timestamp']}  {entry['sha256'][:12]}  {entry['size']:>8} bytes"
+                  f"{'  changed' if entry['changed'] else ''}")
+        return
+    if args.show:
+        try:
+            print(archive.read(args.show), end='')
+        except ValueError as e:
+            print(f"Error: {e}")
+            raise SystemExit(2)
+        return
+
+    devices = []
+    for device_info in load_devices_from_json(args.devices).filter(type=args.type, site=args.site):
+        try:
+            devices.append(build_device(device_info))
+        except (KeyError, ValueError) as e:
+            print(f"Skipping '{device_info.get('hostname', 'N/A')}': {e}")
+
+    results = backup_fleet(devices, archive, args.parallel, args.timeout)
+    if any(not result.ok for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
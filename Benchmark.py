@@ -0,0 +1,157 @@
+import argparse
+import json
+import sys
+import time
+
+from ConnectionPool import ConnectionPool
+from Device import Device
+from Fleet import FleetExecutor, build_device
+from Simulator import DeviceFarm
+from Switch import Switch
+
+
+def measure(function, iterations) -> dict:
+    # calls function() 'iterations' times and returns latency statistics in milliseconds
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'avg_ms': round(sum(samples) / len(samples), 2),
+        'p50_ms': round(samples[len(samples) // 2], 2),
+        'p95_ms': round(samples[min(len(samples) - 1, int(0.95 * len(samples)))], 2),
+        'max_ms': round(samples[-1], 2),
+    }
+
+
+def fresh_pool(size) -> None:
+    # replaces the shared pool so the next command has to log in again
+    Device.pool.close_all()
+    Device.pool = ConnectionPool(max_sessions=size)
+
+
+def bench_connect(device, iterations, pool_size) -> dict:
+    # full login (TCP, SSH auth, session preparation, enable) with a fresh pool every time
+    def connect():
+        fresh_pool(pool_size)
+        device.run_command('show version')
+    return measure(connect, iterations)
+
+
+def bench_commands(switch, router, iterations) -> dict:
+    # per-command latency over an already open session
+    switch.run_command('show version')
+    router.run_command('show version')
+    vlan_id = iter(range(100, 100 + iterations))
+    return {
+        'show ip interface brief': measure(lambda: switch.interfaces(refresh=True), iterations),
+        'show vlan brief': measure(lambda: switch.vlans(refresh=True), iterations),
+        'ping': measure(lambda: router.run_command(f"ping {router.device_details['host']} repeat 2 timeout 1"),
+                        iterations),
+        'config vlan': measure(lambda: switch.push_config(Switch.vlan_commands(next(vlan_id), 'BENCH')), iterations),
+    }
+
+
+def bench_fleet(devices, workers, pool_size) -> dict:
+    # throughput of one show command across the whole farm, with cold (new logins) and warm (pooled) sessions
+    executor = FleetExecutor(max_workers=workers, timeout=60)
+    results = {}
+    for label in ('cold', 'warm'):
+        if label == 'cold':
+            fresh_pool(pool_size)
+        start = time.perf_counter()
+        outcome = list(executor.run(devices, lambda device: device.interfaces(refresh=True)))
+        elapsed = time.perf_counter() - start
+        results[label] = {
+            'devices': len(devices),
+            'failed': sum(1 for result in outcome if not result.ok),
+            'seconds': round(elapsed, 3),
+            'devices_per_second': round(len(devices) / elapsed, 2),
+        }
+    return results
+
+
+def compare(results, baseline, tolerance) -> list:
+    # latencies that grew by more than 'tolerance' (a fraction) over the baseline run
+    regressions = []
+
+    def walk(current, previous, path):
+        for key, value in current.items():
+            if key not in previous:
+                continue
+            if isinstance(value, dict):
+                walk(value, previous[key], path + [key])
+            elif key in ('avg_ms', 'p95_ms', 'seconds') and previous[key] and value > previous[key] * (1 + tolerance):
+                regressions.append(f"{' / '.join(path + [key])}: {previous[key]} -> {value}")
+
+    walk(results, baseline, [])
+    return regressions
+
+
+def print_results(results) -> None:
+    print("\n----------- Benchmark Results -----------")
+    print(f"Connect: {results['connect']}")
+    for command, stats in results['commands'].items():
+        print(f"{command}: {stats}")
+    for label, stats in results['fleet'].items():
+        print(f"Fleet ({label} sessions): {stats}")
+    print("-----------------------------------------\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the automation paths against a simulated device farm.")
+    parser.add_argument('--switches', type=int, default=8)
+    parser.add_argument('--routers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=2222)
+    parser.add_argument('--latency', type=float, default=0.0, help="simulated per-command device latency (seconds)")
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--parallel', type=int, default=32, help="workers for the fleet throughput run")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--baseline', help="results file of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown over the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # the benchmark measures the pool itself, so it uses fresh ones sized for the farm
+    pool_size = max(32, args.switches + args.routers)
+    fresh_pool(pool_size)
+
+    with DeviceFarm(args.switches, args.routers, args.port, latency=args.latency) as farm:
+        devices = [build_device(entry) for entry in farm.inventory()]
+        switch = next(d for d in devices if isinstance(d, Switch))
+        router = next(d for d in devices if not isinstance(d, Switch))
+
+        print(f"Benchmarking against {len(devices)} simulated devices...")
+        results = {
+            'connect': bench_connect(switch, max(1, args.iterations // 4), pool_size),
+            'commands': bench_commands(switch, router, args.iterations),
+            'fleet': bench_fleet(devices, args.parallel, pool_size),
+        }
+        Device.pool.close_all()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to '{args.json}'.")
+
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r') as file:
+                baseline = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error: could not read the baseline '{args.baseline}': {e}")
+            sys.exit(2)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Performance regressions (more than {args.tolerance:.0%} slower than the baseline):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No performance regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import argparse
+import inspect
+import json
+import sys
+
+from Device import Device
+from Fleet import FleetExecutor, build_device
+from JobRunner import OPERATIONS
+from Parsers import parse_ping
+from Templates import DEFAULT_PLATFORM
+
+# show subcommands: name -> (device type it applies to or None for all, function returning the parsed output)
+SHOWS = {
+    'vlan': ('switch', lambda device: device.vlans()),
+    'interfaces': (None, lambda device: device.interfaces()),
+}
+
+# builder parameters that take a list, given on the command line as comma-separated values
+LIST_PARAMETERS = ('networks',)
+
+# exit statuses: every device succeeded / at least one device failed / bad arguments or no devices selected
+EXIT_OK, EXIT_DEVICE_FAILED, EXIT_USAGE = 0, 1, 2
+
+
+class UsageError(Exception):
+    pass
+
+
+def parse_operation(name, values, platform=DEFAULT_PLATFORM) -> list:
+    # builds the commands of a job-file operation from command-line values: positional values fill the
+    # builder's parameters in order, 'key=value' sets one by name ("vlan 10 DATA", "stp primary_vlan=10")
+    operation = name.replace('-', '_')
+    if operation not in OPERATIONS:
+        raise UsageError(f"Unknown operation '{name}'. Available: {', '.join(sorted(OPERATIONS))}.")
+    builder = OPERATIONS[operation][1]
+    # the platform comes from each device's device_type, not from the command line
+    parameters = [name for name in inspect.signature(builder).parameters if name != 'platform']
+
+    positional, named = [], {}
+    for value in values:
+        key, separator, text = value.partition('=')
+        if separator and key in parameters:
+            named[key] = text
+        else:
+            positional.append(value)
+    if len(positional) > len(parameters):
+        raise UsageError(f"Too many values for '{name}'; its parameters are: {', '.join(parameters)}.")
+    arguments = dict(zip(parameters, positional), **named)
+
+    for key, text in arguments.items():
+        if key in LIST_PARAMETERS:
+            arguments[key] = [item.strip() for item in text.split(',') if item.strip()]
+        elif text.lower() in ('true', 'yes'):
+            arguments[key] = True
+        elif text.lower() in ('false', 'no'):
+            arguments[key] = False
+    try:
+        return builder(**arguments, platform=platform)
+    except (TypeError, ValueError) as e:
+        raise UsageError(f"Operation '{name}': {e}")
+
+
+def select_devices(args) -> list:
+    # devices named with --hosts (hostnames or IP addresses), or matching --group/--type/--site, or --all
+    from Menu import load_devices_from_json
+
+    devices_data = load_devices_from_json(args.devices)
+    if args.hosts:
+        records = []
+        for name in args.hosts.split(','):
+            record = devices_data.find(name.strip())
+            if record is None:
+                raise UsageError(f"Device '{name.strip()}' not found in '{args.devices}'.")
+            records.append(record)
+    elif args.group or args.type or args.site or args.all:
+        records = devices_data.filter(type=args.type, site=args.site, group=args.group)
+    else:
+        raise UsageError("No devices selected; use --hosts, --group, --type, --site or --all.")
+    if not records:
+        raise UsageError("No devices match the selection.")
+    try:
+        return [build_device(record) for record in records]
+    except (KeyError, ValueError) as e:
+        raise UsageError(str(e))
+
+
+def check_device_type(devices, device_type, what) -> None:
+    if device_type is None:
+        return
+    wrong = [device.hostname for device in devices if type(device).__name__.lower() != device_type]
+    if wrong:
+        raise UsageError(f"'{what}' only applies to {device_type} devices, not to {', '.join(wrong)}.")
+
+
+def build_action(args, devices):
+    # returns the function run on every device for the chosen subcommand
+    if args.command == 'show':
+        device_type, show = SHOWS[args.what]
+        check_device_type(devices, device_type, f"show {args.what}")
+        return show
+
+    if args.command == 'run':
+        return lambda device: device.run_command(args.cli_command, read_timeout=args.timeout)
+
+    if args.command == 'ping':
+        if not Device.check_ipv4(args.target):
+            raise UsageError(f"'{args.target}' is not a valid IPv4 address.")
+
+        def ping(device):
+            output = device.run_command(f'ping {args.target} repeat {args.repeat}', read_timeout=args.timeout)
+            return parse_ping(output)
+        return ping
+
+    if args.command == 'push':
+        check_device_type(devices, OPERATIONS[args.operation.replace('-', '_')][0], f"push {args.operation}")
+        commands = {platform: parse_operation(args.operation, args.values, platform)
+                    for platform in {device.platform for device in devices}}
+        return lambda device: device.push_config(commands[device.platform], mode=args.mode)
+
+    raise UsageError(f"Unknown command '{args.command}'.")
+
+
+def emit(result, text=False) -> None:
+    # one JSON object per device and line, written as soon as the device finishes
+    if text:
+        status = "OK" if result.ok else "FAILED"
+        print(f"{status:6} {result.hostname} ({result.host}) in {result.elapsed:.1f}s")
+        body = result.output if result.ok else f"Error: {result.error}"
+        if body:
+            print(body if isinstance(body, str) else json.dumps(body, indent=2))
+    else:
+        record = {'hostname': result.hostname, 'host': result.host, 'ok': result.ok,
+                  'elapsed': round(result.elapsed, 3)}
+        if result.ok:
+            record['output'] = result.output
+        else:
+            record['error'] = result.error
+        print(json.dumps(record))
+    sys.stdout.flush()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='netauto', description="Run network automation tasks without the menu. "
+                                                                 "Prints one JSON object per device and line.")
+    selection = argparse.ArgumentParser(add_help=False)
+    group = selection.add_argument_group('device selection')
+    group.add_argument('--hosts', help="comma-separated hostnames or IP addresses")
+    group.add_argument('--group', help="devices with this group in devices.json")
+    group.add_argument('--type', help="devices of this type (router/switch)")
+    group.add_argument('--site', help="devices of this site")
+    group.add_argument('--all', action='store_true', help="every device")
+    group.add_argument('--devices', default='devices.json', help="device data file (default: devices.json)")
+    group.add_argument('--parallel', type=int, default=32, help="devices handled at the same time")
+    group.add_argument('--timeout', type=int, default=60, help="per-device timeout in seconds")
+    group.add_argument('--text', action='store_true', help="human-readable output instead of JSON lines")
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    show = commands.add_parser('show', parents=[selection], help="structured show output")
+    show.add_argument('what', choices=sorted(SHOWS))
+
+    run = commands.add_parser('run', parents=[selection], help="run any command and return its raw output")
+    run.add_argument('cli_command', metavar='COMMAND', help="e.g. 'show version'")
+
+    ping = commands.add_parser('ping', parents=[selection], help="ping a target from every selected device")
+    ping.add_argument('target')
+    ping.add_argument('--repeat', type=int, default=5)
+
+    push = commands.add_parser('push', parents=[selection], help="push a configuration operation",
+                               description="Operations and their parameters are those of job files: "
+                                           + ", ".join(sorted(OPERATIONS)) + ".")
+    push.add_argument('operation', help="e.g. vlan, vlan-range, port-security, stp, hsrp")
+    push.add_argument('values', nargs='*', help="parameters in order, or as name=value")
+    push.add_argument('--mode', choices=('full', 'diff', 'dry-run'), default='full',
+                      help="send everything, only what the running-config is missing, or only print that diff")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        devices = select_devices(args)
+        action = build_action(args, devices)
+    except UsageError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    failed = 0
+    for result in FleetExecutor(max_workers=args.parallel, timeout=args.timeout).run(devices, action):
+        failed += not result.ok
+        emit(result, args.text)
+
+    Device.pool.close_all()
+    return EXIT_DEVICE_FAILED if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
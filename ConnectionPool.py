@@ -0,0 +1,358 @@
+import atexit
+import random
+import socket
+import threading
+import time
+
+from Metrics import MeteredConnection, registry
+from SessionRecorder import recorder
+from Vault import vault
+
+# Netmiko methods behind the per-phase login timing; they are not public API, so their presence is checked
+PHASED_LOGIN_METHODS = ('_modify_connection_params', 'establish_connection', '_try_session_preparation')
+
+
+class PooledSession:
+    # one open Netmiko connection plus the bookkeeping the pool needs for it
+    def __init__(self, host, connection):
+        self.host = host
+        self.connection = connection
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.in_use = False
+        self.reused = False
+        # set when the device's details changed while the session was in use; it is closed on release
+        self.stale = False
+        # thread that holds the session, so the sessions of a cancelled worker can be cut
+        self.owner = None
+
+    def idle_for(self, now=None) -> float:
+        return (now or time.monotonic()) - self.last_used
+
+
+class ConnectionPool:
+    # Keeps SSH sessions open between actions, keyed by device host, so that back-to-back
+    # actions on the same device skip the handshake, authentication and enable steps.
+    def __init__(self, max_sessions=32, max_per_host=1, idle_timeout=300, keepalive_interval=30,
+                 acquire_timeout=60, retries=2, retry_delay=1.0, max_retry_delay=10.0, health=None):
+        self.max_sessions = max_sessions
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.acquire_timeout = acquire_timeout
+        # failed connections are retried with exponential backoff and jitter
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        # optional Health.DeviceHealth circuit breaker that fast-fails devices known to be down
+        self.health = health
+
+        self._sessions = {}  # host -> list of PooledSession
+        self._pending = {}  # host -> number of connections currently being opened
+        self._cancelled = set()  # threads whose actions were given up on, see cancel()
+        self._cond = threading.Condition()
+        self._keepalive_thread = None
+        self._closed = False
+        atexit.register(self.close_all)
+
+    def acquire(self, device_details, per_host_limit=None) -> PooledSession:
+        # hands out an idle healthy session for the host, or opens a new one if the limits allow it
+        # (per_host_limit lets one operation, e.g. a ping sweep, use more parallel sessions to a host)
+        host = device_details['host']
+        per_host_limit = per_host_limit or self.max_per_host
+        deadline = time.monotonic() + self.acquire_timeout
+
+        with self._cond:
+            while True:
+                self._check_cancelled_locked(host)
+                self._evict_idle_locked()
+                session = self._take_idle_locked(host)
+                if session:
+                    # owned from now on, so cancel() also reaches it during the health check and reconnect
+                    session.owner = threading.get_ident()
+                    break
+                if self._can_open_locked(host, per_host_limit):
+                    self._pending[host] = self._pending.get(host, 0) + 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No free session for {host} within {self.acquire_timeout}s "
+                                       f"(max_sessions={self.max_sessions}, max_per_host={per_host_limit}).")
+                self._cond.wait(remaining)
+
+        if session:
+            # sessions that sat idle for a while get a health check before being reused
+            if session.idle_for() >= self.keepalive_interval and not self._is_alive(session):
+                self._close(session)
+                return self._reconnect(session, device_details)
+            session.reused = True
+            return session
+
+        try:
+            connection = self._open_with_retry(device_details)
+        except Exception:
+            with self._cond:
+                self._pending[host] -= 1
+                self._cond.notify_all()
+            raise
+
+        session = PooledSession(host, connection)
+        session.in_use = True
+        with self._cond:
+            self._pending[host] -= 1
+            self._sessions.setdefault(host, []).append(session)
+        self._start_keepalive()
+        return self._claim(session)
+
+    def release(self, session: PooledSession, discard=False) -> None:
+        # returns a session to the pool; broken sessions are closed instead of being kept
+        with self._cond:
+            session.in_use = False
+            session.owner = None
+            session.last_used = time.monotonic()
+            discard = discard or session.stale or self._closed
+            if discard:
+                self._remove_locked(session)
+            self._cond.notify_all()
+        if discard:
+            self._close(session)
+
+    def invalidate(self, host) -> None:
+        # drops every idle session to a host (e.g. after its details changed); busy ones are dropped on release
+        with self._cond:
+            stale = []
+            for session in list(self._sessions.get(host, [])):
+                if session.in_use:
+                    session.stale = True
+                else:
+                    self._remove_locked(session)
+                    stale.append(session)
+        for session in stale:
+            self._close(session)
+
+    def cancel(self, thread_id) -> None:
+        # gives up on the actions of a worker thread (e.g. one that timed out, which cannot be stopped): the
+        # sessions it holds are closed, so its current read or write fails and the host's slot is freed, and
+        # every further acquire() from the thread fails at once until uncancel()
+        with self._cond:
+            self._cancelled.add(thread_id)
+            busy = [session for host_sessions in self._sessions.values() for session in host_sessions
+                    if session.in_use and session.owner == thread_id]
+            for session in busy:
+                self._remove_locked(session)
+            self._cond.notify_all()
+        for session in busy:
+            self._close(session)
+
+    def uncancel(self, thread_id) -> None:
+        # called when the cancelled worker is done, before the thread is given other work
+        with self._cond:
+            self._cancelled.discard(thread_id)
+
+    def close_all(self) -> None:
+        with self._cond:
+            self._closed = True
+            sessions = [s for host_sessions in self._sessions.values() for s in host_sessions if not s.in_use]
+            for session in sessions:
+                self._remove_locked(session)
+            self._cond.notify_all()
+        for session in sessions:
+            self._close(session)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                'hosts': len(self._sessions),
+                'sessions': sum(len(s) for s in self._sessions.values()),
+                'in_use': sum(1 for s_list in self._sessions.values() for s in s_list if s.in_use),
+            }
+
+    def _open_with_retry(self, device_details):
+        # retries failed connections after a random delay of up to retry_delay * 2^attempt seconds
+        # (full jitter, so many devices failing together do not retry in lockstep); wrong credentials
+        # are not retried, and a device whose circuit is open fails at once without connecting
+        from netmiko import NetmikoAuthenticationException
+
+        # passwords kept in the vault are filled in here, so they are only held by the connection itself;
+        # a vault error is not a failure of the device and is raised without retrying
+        device_details = vault.resolve_details(device_details)
+        host = device_details['host']
+        probe = self.health.check(host) if self.health else False
+        # the first attempt after a cooldown only probes the device, without retries
+        attempts = 1 if probe else self.retries + 1
+        for attempt in range(attempts):
+            try:
+                connection = self._open(device_details)
+            except Exception as e:
+                last_attempt = attempt == attempts - 1 or isinstance(e, NetmikoAuthenticationException)
+                if last_attempt:
+                    if self.health:
+                        self.health.record_failure(host, e)
+                    raise
+                registry.increment('netauto_retries_total', device=host)
+                time.sleep(self.backoff(attempt))
+            else:
+                if self.health:
+                    self.health.record_success(host)
+                return connection
+
+    def backoff(self, attempt) -> float:
+        # seconds to wait before retrying after the given failed attempt (0 = the first); also used by the
+        # asyncssh sessions, which connect outside the pool
+        return random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2 ** attempt))
+
+    def _open(self, device_details):
+        # opens a connection step by step so each phase of the login is timed separately
+        # (Netmiko is imported on the first connection; it is slow to load and not needed before)
+        from netmiko import ConnectHandler, NetmikoTimeoutException
+
+        host = device_details['host']
+        port = device_details.get('port', 22)
+        try:
+            with registry.timer('tcp_connect', host):
+                sock = socket.create_connection((host, port), timeout=device_details.get('conn_timeout', 10))
+        except OSError as e:
+            # reported like Netmiko's own TCP failures, so callers handle both the same way
+            raise NetmikoTimeoutException(f"TCP connection to {host}:{port} failed: {e}")
+        try:
+            try:
+                connection = ConnectHandler(**device_details, sock=sock, auto_connect=False)
+            except TypeError:
+                connection = None  # a Netmiko without the sock and auto_connect arguments
+            if connection is not None and all(hasattr(connection, name) for name in PHASED_LOGIN_METHODS):
+                with registry.timer('ssh_auth', host):
+                    connection._modify_connection_params()
+                    connection.establish_connection()
+                with registry.timer('session_prep', host):
+                    connection._try_session_preparation()
+            else:
+                # the phases rely on Netmiko internals (tested with 4.x); when they are missing, log in the
+                # public way and time the whole login as ssh_auth
+                sock.close()
+                with registry.timer('ssh_auth', host):
+                    connection = ConnectHandler(**device_details)
+            if device_details.get('secret'):
+                with registry.timer('enable', host):
+                    if not connection.check_enable_mode():
+                        connection.enable()
+        except Exception:
+            sock.close()
+            raise
+        registry.increment('netauto_connections_total', device=host)
+        return MeteredConnection(connection, host, registry, recorder)
+
+    def _reconnect(self, session: PooledSession, device_details) -> PooledSession:
+        # the session went stale: open a replacement in the same slot
+        try:
+            session.connection = self._open_with_retry(device_details)
+        except Exception:
+            with self._cond:
+                self._remove_locked(session)
+                self._cond.notify_all()
+            raise
+        session.created = time.monotonic()
+        session.last_used = session.created
+        session.reused = False
+        return self._claim(session)
+
+    def _claim(self, session: PooledSession) -> PooledSession:
+        # hands a newly connected session to the calling thread; the worker may have been cancelled while it
+        # was connecting, in which case the session is closed and the acquire fails
+        session.owner = threading.get_ident()
+        with self._cond:
+            cancelled = session.owner in self._cancelled
+            if cancelled:
+                self._remove_locked(session)
+                self._cond.notify_all()
+        if cancelled:
+            self._close(session)
+            raise _cancelled_error(session.host)
+        return session
+
+    def _check_cancelled_locked(self, host) -> None:
+        if threading.get_ident() in self._cancelled:
+            raise _cancelled_error(host)
+
+    def _take_idle_locked(self, host):
+        for session in self._sessions.get(host, []):
+            if not session.in_use:
+                session.in_use = True
+                return session
+        return None
+
+    def _can_open_locked(self, host, per_host_limit) -> bool:
+        host_count = len(self._sessions.get(host, [])) + self._pending.get(host, 0)
+        if host_count >= per_host_limit:
+            return False
+        total = sum(len(s) for s in self._sessions.values()) + sum(self._pending.values())
+        if total < self.max_sessions:
+            return True
+        # pool is full: make room by closing the least recently used idle session of another host
+        idle = [s for s_list in self._sessions.values() for s in s_list if not s.in_use]
+        if not idle:
+            return False
+        victim = min(idle, key=lambda s: s.last_used)
+        self._remove_locked(victim)
+        threading.Thread(target=self._close, args=(victim,), daemon=True).start()
+        return True
+
+    def _remove_locked(self, session: PooledSession) -> None:
+        host_sessions = self._sessions.get(session.host, [])
+        if session in host_sessions:
+            host_sessions.remove(session)
+        if not host_sessions:
+            self._sessions.pop(session.host, None)
+
+    def _evict_idle_locked(self) -> None:
+        now = time.monotonic()
+        expired = [s for s_list in self._sessions.values() for s in s_list
+                   if not s.in_use and s.idle_for(now) >= self.idle_timeout]
+        for session in expired:
+            self._remove_locked(session)
+        if expired:
+            threading.Thread(target=lambda: [self._close(s) for s in expired], daemon=True).start()
+
+    def _start_keepalive(self) -> None:
+        with self._cond:
+            if self._keepalive_thread is not None:
+                return
+            self._keepalive_thread = threading.Thread(target=self._keepalive_loop, name='pool-keepalive', daemon=True)
+        self._keepalive_thread.start()
+
+    def _keepalive_loop(self) -> None:
+        # background loop: evicts sessions idle past the timeout and pings the rest so the device keeps them open
+        while not self._closed:
+            time.sleep(self.keepalive_interval)
+            with self._cond:
+                self._evict_idle_locked()
+                idle = [s for s_list in self._sessions.values() for s in s_list if not s.in_use]
+                for session in idle:
+                    session.in_use = True
+
+            for session in idle:
+                alive = self._is_alive(session)
+                with self._cond:
+                    session.in_use = False
+                    if not alive:
+                        self._remove_locked(session)
+                    self._cond.notify_all()
+                if not alive:
+                    self._close(session)
+
+    @staticmethod
+    def _is_alive(session: PooledSession) -> bool:
+        try:
+            return session.connection.is_alive()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(session: PooledSession) -> None:
+        try:
+            session.connection.disconnect()
+        except Exception:
+            pass
+
+
+def _cancelled_error(host) -> TimeoutError:
+    return TimeoutError(f"Gave up on the action on {host}: it was cancelled after timing out.")
@@ -1,85 +1,598 @@
-from netmiko import ConnectHandler
-from netmiko import NetmikoAuthenticationException, NetmikoTimeoutException
-
-
-class Device:
-    def __init__(self, hostname, ip_address, username, password, exec_pass, device_type):
-        self.hostname = hostname
-        self.device_details = {
-            'device_type': device_type,
-            'host': ip_address,
-            'username': username,
-            'password': password,
-            'secret': exec_pass,
-        }
-
-    def _connect(self):
-        # Helper function for establishing connection
-        try:
-            print(f"\nAttempting to connect to {self.hostname} ({self.device_details['host']})...")
-            net_connect = ConnectHandler(**self.device_details)
-            print("Connection successful.")
-            return net_connect
-        except NetmikoTimeoutException:
-            print(f"Connection timed out to {self.hostname}.")
-            return None
-        except NetmikoAuthenticationException:
-            print(f"Authentication failed for {self.hostname}.")
-            return None
-        except Exception as e:
-            print(f"An unexpected error occurred while connecting to {self.hostname}: {e}")
-            return None
-
-    def ping(self) -> None:
-        # Sends the "ping <ip>" command to the selected device
-
-        #check if ip address is correctly written using a method
-        while True:
-            destination_ip = input(f"Enter the destination IP address to ping from {self.hostname}: ").strip()
-            if Device.check_ipv4(destination_ip):
-                break
-            else: print(f"'{destination_ip}' is not a valid IPv4 address. Please try again.")
-
-        command = f'ping {destination_ip}'
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print(f"Sending command: {command}")
-                # using expect_string for waiting until the command is finished and printing all of its output
-                output = net_connect.send_command(command, expect_string=r'#')
-                print(f"\n--- Ping Output from {self.hostname} ---")
-                print(output)
-                print("--- End of Ping Output ---")
-
-    def show_ip_interface_brief(self) -> None:
-        # Sends the 'show ip int br' command to the device
-        command = 'show ip interface brief'
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print(f"Sending command: {command}")
-                output = net_connect.send_command(command)
-                print(f"\n--- Output of '{command}' from {self.hostname} ---")
-                print(output)
-                print("--- End of Output ---")
-
-    @staticmethod
-    def check_ipv4(ip: str) -> bool:
-        # checker for ipv4 addresses
-
-        # check if received ip variable is actually a string
-        if not isinstance(ip, str):
-            return False
-
-        parts = ip.split('.')
-
-        # check if the ip address has 4 numbers separated by the dots.
-        if len(parts) != 4:
-            return False
-
-        for part in parts:
-            # each of these numbers is in range 0-255
-            if not part.isdigit() or not 0 <= int(part) <= 255:
-                return False
-
-        return True
\ No newline at end of file
+import copy
+import ipaddress
+import os
+import queue
+import re
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+
+from Addressing import is_ipv4
+from ConnectionPool import ConnectionPool
+from Health import CircuitOpenError, DeviceHealth
+from Metrics import registry
+from Parsers import format_table, parse_ip_interface_brief, parse_ping
+from RunningConfig import ConfigTree, format_diff
+from SessionRecorder import recorder
+from ShowCache import ResultCache
+from Templates import platform_for
+from Verification import format_results, run_checks
+
+INTERFACE_COLUMNS = [('interface', 'Interface'), ('ip_address', 'IP-Address'), ('status', 'Status'),
+                     ('protocol', 'Protocol')]
+PING_COLUMNS = [('target', 'Target'), ('success_rate', 'Success %'), ('rtt_min', 'Min ms'), ('rtt_avg', 'Avg ms'),
+                ('rtt_max', 'Max ms')]
+
+# how configuration commands are pushed: everything, only what the running-config is missing,
+# or only print that difference without sending anything
+PUSH_MODES = ('full', 'diff', 'dry-run')
+
+# upper limit for the number of targets in one ping sweep (a /22 network)
+MAX_SWEEP_TARGETS = 1024
+
+# how often a streamed command polls the channel for new output, in seconds
+STREAM_POLL_INTERVAL = 0.05
+
+
+class Device:
+    # SSH sessions are shared by every Device instance, so re-selecting a device reuses its open session;
+    # devices that keep failing are skipped for a while, also in later runs (see Health.py)
+    pool = ConnectionPool(health=DeviceHealth(os.environ.get('NETAUTO_HEALTH_FILE', 'device_health.json')))
+    # parsed show command results, shared the same way so repeated views are served from memory
+    cache = ResultCache()
+    # parsed running-config of each device, fetched the first time a diff is needed: host -> (weak reference to
+    # the session or async transport it was read on, ConfigTree). It is only used on that same session, and any
+    # configuration change to the device, sync or async, drops it.
+    running_configs = {}
+
+    def __init__(self, hostname, ip_address, username, password, exec_pass, device_type, port=None):
+        self.hostname = hostname
+        self.device_details = {
+            'device_type': device_type,
+            'host': ip_address,
+            'username': username,
+            'password': password,
+            'secret': exec_pass,
+        }
+        # SSH port, only needed when the device does not listen on 22
+        if port:
+            self.device_details['port'] = int(port)
+        self.push_mode = 'full'
+        # (event loop, lock, transport) used by the async methods, see _async_session
+        self._async_state = None
+
+    @property
+    def platform(self) -> str:
+        # which command templates the device gets (see Templates), from its Netmiko device_type
+        return platform_for(self.device_details['device_type'])
+
+    @contextmanager
+    def _connect(self):
+        # Helper function for borrowing a connection from the session pool (a new one is opened if needed)
+        session = self._acquire_session()
+        if session is None:
+            yield None
+            return
+        with self._lease(session) as net_connect:
+            yield net_connect
+
+    @contextmanager
+    def _session(self, per_host_limit=None):
+        # Same as _connect, but silent and connection errors are raised to the caller (used for unattended runs)
+        with self._lease(Device.pool.acquire(self.device_details, per_host_limit)) as net_connect:
+            yield net_connect
+
+    @staticmethod
+    @contextmanager
+    def _lease(session):
+        try:
+            yield session.connection
+        except BaseException:
+            # the session may be left in an unknown state (e.g. a streamed command abandoned or interrupted
+            # half-way), so it is not handed out again
+            Device.pool.release(session, discard=True)
+            raise
+        Device.pool.release(session)
+
+    def _acquire_session(self):
+        from netmiko import NetmikoAuthenticationException, NetmikoTimeoutException
+
+        try:
+            print(f"\nAttempting to connect to {self.hostname} ({self.device_details['host']})...")
+            session = Device.pool.acquire(self.device_details)
+            print("Reusing open session." if session.reused else "Connection successful.")
+            return session
+        except NetmikoTimeoutException:
+            print(f"Connection timed out to {self.hostname}.")
+            return None
+        except NetmikoAuthenticationException:
+            print(f"Authentication failed for {self.hostname}.")
+            return None
+        except CircuitOpenError as e:
+            print(f"Skipping {self.hostname}: {e}")
+            return None
+        except Exception as e:
+            print(f"An unexpected error occurred while connecting to {self.hostname}: {e}")
+            return None
+
+    def ping(self) -> None:
+        # Sends the "ping <ip>" command to the selected device
+
+        #check if ip address is correctly written using a method
+        while True:
+            destination_ip = input(f"Enter the destination IP address to ping from {self.hostname}: ").strip()
+            if Device.check_ipv4(destination_ip):
+                break
+            else: print(f"'{destination_ip}' is not a valid IPv4 address. Please try again.")
+
+        command = f'ping {destination_ip}'
+
+        with self._connect() as net_connect:
+            if net_connect:
+                print(f"Sending command: {command}")
+                print(f"\n--- Ping Output from {self.hostname} ---")
+                # the output is printed as the device sends it, so the '!!!!!' progress is visible
+                for chunk in self._stream(net_connect, command):
+                    print(chunk, end='', flush=True)
+                print("\n--- End of Ping Output ---")
+
+    def run_command_live(self, command=None) -> None:
+        # Runs any command and prints its output while it arrives (for long pings, traceroutes or large show outputs)
+        if command is None:
+            command = input(f"Enter the command to run on {self.hostname}: ").strip()
+            if not command:
+                print("No command entered.")
+                return
+
+        with self._connect() as net_connect:
+            if net_connect:
+                print(f"Sending command: {command}")
+                print(f"\n--- Output of '{command}' from {self.hostname} ---")
+                for chunk in self._stream(net_connect, command):
+                    print(chunk, end='', flush=True)
+                print("\n--- End of Output ---")
+
+    def ping_sweep(self, targets=None, sessions=4, repeat=2, timeout=1) -> list:
+        # Pings many destinations from this device; the targets are shared between `sessions` parallel
+        # SSH sessions, each sending its pings back to back, and the results are printed as a table
+        if targets is None:
+            while True:
+                targets = input(f"Enter a subnet (e.g., 10.0.0.0/28) or a comma-separated list of IPs to ping "
+                                f"from {self.hostname}: ").strip()
+                try:
+                    targets = Device.expand_targets(targets)
+                    break
+                except ValueError as e:
+                    print(f"{e} Please try again.")
+        else:
+            targets = Device.expand_targets(targets)
+
+        pending = queue.Queue()
+        for target in targets:
+            pending.put(target)
+        results = {}
+        command_timeout = 10 + repeat * timeout * 2
+
+        def worker():
+            try:
+                with self._session(per_host_limit=sessions) as net_connect:
+                    while True:
+                        try:
+                            target = pending.get_nowait()
+                        except queue.Empty:
+                            return
+                        results[target] = {'target': target, 'error': f"no result from {self.hostname}"}
+                        output = net_connect.send_command(f'ping {target} repeat {repeat} timeout {timeout}',
+                                                          expect_string=r'#', read_timeout=command_timeout)
+                        results[target] = dict(parse_ping(output), target=target, error=None)
+            except Exception as e:
+                print(f"A ping session to {self.hostname} failed: {e}")
+
+        print(f"\nPinging {len(targets)} target(s) from {self.hostname} over up to {sessions} session(s)...")
+        workers = [threading.Thread(target=worker, daemon=True) for _ in range(min(sessions, len(targets)))]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        # targets no session got to (e.g. the device could not be reached) are reported too
+        rows = [results.get(target, {'target': target, 'error': "not pinged"}) for target in targets]
+        for row in rows:
+            for key, _ in PING_COLUMNS:
+                if row.get(key) is None:
+                    row[key] = '-'
+        print(f"\n--- Ping Sweep from {self.hostname} ---")
+        print(format_table(rows, PING_COLUMNS))
+        for row in rows:
+            if row['error']:
+                print(f"  {row['target']}: {row['error']}")
+        reachable = sum(1 for row in rows if isinstance(row['success_rate'], int) and row['success_rate'] > 0)
+        print(f"--- {reachable}/{len(rows)} target(s) reachable ---")
+        return rows
+
+    @staticmethod
+    def expand_targets(targets) -> list:
+        # turns "10.0.0.0/28", "10.0.0.1, 10.0.0.9" or a list of those into a list of IPv4 addresses
+        if isinstance(targets, str):
+            targets = targets.split(',')
+        addresses = []
+        for item in (str(t).strip() for t in targets):
+            if not item:
+                continue
+            try:
+                network = ipaddress.IPv4Network(item, strict=False) if '/' in item else None
+                address = None if network else str(ipaddress.IPv4Address(item))
+            except ValueError:
+                raise ValueError(f"'{item}' is not a valid IPv4 address or subnet.")
+            # a subnet is counted before its hosts are listed, so a /8 is refused without building 16M addresses
+            # (/31 and /32 have no network and broadcast addresses to leave out)
+            count = 1 if network is None else network.num_addresses - (2 if network.prefixlen < 31 else 0)
+            if len(addresses) + count > MAX_SWEEP_TARGETS:
+                raise ValueError(f"Too many targets (more than {MAX_SWEEP_TARGETS}).")
+            if network is None:
+                addresses.append(address)
+            elif network.num_addresses > 1:
+                addresses.extend(str(host) for host in network.hosts())
+            else:
+                addresses.append(str(network.network_address))
+        if not addresses:
+            raise ValueError("No targets given.")
+        return list(dict.fromkeys(addresses))
+
+    def show_ip_interface_brief(self, refresh=False) -> None:
+        # Shows the 'show ip int br' output as a table (served from the cache unless refresh is set)
+        self._print_show('show ip interface brief', parse_ip_interface_brief, INTERFACE_COLUMNS, refresh)
+
+    def interfaces(self, refresh=False) -> list:
+        # 'show ip interface brief' as a list of dicts: interface, ip_address, ok, method, status, protocol
+        return self.show_structured('show ip interface brief', parse_ip_interface_brief, refresh)
+
+    def show_structured(self, command, parser, refresh=False) -> list:
+        # Returns the parsed output of a show command; repeated calls within the cache TTL do not touch the device.
+        # The caller gets its own copy of the rows, so changing them does not change what others are served.
+        host = self.device_details['host']
+        cached = None if refresh else Device.cache.get(host, command)
+        if cached is not None:
+            return copy.deepcopy(cached[0][0])
+        output = self.run_command(command)
+        records = parser(output)
+        Device.cache.put(host, command, (records, output))
+        return copy.deepcopy(records)
+
+    def clear_cached_output(self) -> None:
+        Device.cache.invalidate(self.device_details['host'])
+
+    def show_session_output(self) -> None:
+        # prints the recent commands and output of this device's sessions, kept in memory by the recorder
+        transcript = recorder.recent(self.device_details['host'])
+        if not transcript:
+            print(f"No session output recorded for {self.hostname} yet.")
+            return
+        print(f"--- Recent session output of {self.hostname} ---")
+        print(transcript, end='' if transcript.endswith('\n') else '\n')
+
+    def _print_show(self, command, parser, columns, refresh=False) -> None:
+        # prints a show command as a table, fetching it only when there is no fresh cached copy
+        host = self.device_details['host']
+        cached = None if refresh else Device.cache.get(host, command)
+
+        if cached is None:
+            with self._connect() as net_connect:
+                if not net_connect:
+                    return
+                print(f"Sending command: {command}")
+                output = net_connect.send_command(command)
+            records = parser(output)
+            Device.cache.put(host, command, (records, output))
+            print(f"\n--- Output of '{command}' from {self.hostname} ---")
+        else:
+            (records, output), age = cached
+            print(f"\n--- Output of '{command}' from {self.hostname} (cached {age:.0f}s ago) ---")
+
+        # output the parser does not recognise is shown as it came from the device
+        print(format_table(records, columns) if records else output)
+        print("--- End of Output ---")
+
+    def _send_config(self, commands, sending_message, done_message, checks=None):
+        # Sends configuration commands over one session and prints the device output; returns it (None if not connected)
+        # checks (see Verification.checks_for) are run once the change is sent, and their results printed
+        output = None
+        with self._connect() as net_connect:
+            if net_connect:
+                if self.push_mode != 'full':
+                    delta = self._config_delta(net_connect, commands)
+                    print(f"\n--- Configuration diff for {self.hostname} ('+' = not configured yet) ---")
+                    print(format_diff(commands, delta))
+                    print("--- End of Diff ---")
+                    if self.push_mode == 'dry-run':
+                        print("Dry run: nothing was sent.")
+                        return None
+                    if not delta:
+                        print(f"{self.hostname} already has this configuration. Nothing was sent.")
+                        return ''
+                    commands = delta
+
+                print(f"\n{sending_message}")
+                output = net_connect.send_config_set(commands)
+                self._config_changed()
+                print("--- Command Output ---")
+                print(output)
+                print("--- End of Output ---")
+                print(done_message)
+        # the session is released first, since the checks borrow one of their own
+        if output is not None and checks:
+            self._print_checks(checks)
+        return output
+
+    def _print_checks(self, checks) -> None:
+        # verifies that the change took effect; checks that wait for convergence (HSRP, DHCP) may take a while
+        print(f"\nVerifying the change on {self.hostname}...")
+        try:
+            results = run_checks(self, checks)
+        except Exception as e:
+            print(f"Verification could not run: {e}")
+            return
+        print(format_results(results))
+        failed = sum(1 for result in results if not result['ok'])
+        print(f"{len(results) - failed}/{len(results)} check(s) passed on {self.hostname}.")
+
+    def push_config(self, commands, mode=None) -> str:
+        # Sends configuration commands in a single config set and returns the output instead of printing it
+        # (in 'dry-run' mode the diff is returned and nothing is sent)
+        mode = mode or self.push_mode
+        with self._session() as net_connect:
+            if mode != 'full':
+                delta = self._config_delta(net_connect, commands)
+                if mode == 'dry-run':
+                    return format_diff(commands, delta)
+                if not delta:
+                    return ''
+                commands = delta
+            output = net_connect.send_config_set(commands)
+            self._config_changed()
+        return output
+
+    def config_delta(self, commands) -> list:
+        # Returns the commands that the device's running-config does not contain yet
+        with self._session() as net_connect:
+            return self._config_delta(net_connect, commands)
+
+    def _config_delta(self, net_connect, commands) -> list:
+        tree = self._running_config(net_connect)
+        if tree is None:
+            tree = self._keep_running_config(net_connect, net_connect.send_command('show running-config',
+                                                                                   read_timeout=60))
+        return tree.delta(commands)
+
+    def _running_config(self, connection):
+        # the snapshot read on this session, or None
+        snapshot = Device.running_configs.get(self.device_details['host'])
+        return snapshot[1] if snapshot is not None and snapshot[0]() is connection else None
+
+    def _keep_running_config(self, connection, text) -> ConfigTree:
+        tree = ConfigTree.parse(text)
+        Device.running_configs[self.device_details['host']] = (weakref.ref(connection), tree)
+        return tree
+
+    def _config_changed(self) -> None:
+        # anything cached about the device's state is out of date after a configuration change
+        Device.running_configs.pop(self.device_details['host'], None)
+        self.clear_cached_output()
+
+    def run_command(self, command: str, read_timeout=30, expect_string=None) -> str:
+        # Sends a command and returns its output instead of printing it
+        with self._session() as net_connect:
+            return net_connect.send_command(command, read_timeout=read_timeout, expect_string=expect_string)
+
+    def run_commands(self, commands, read_timeout=30) -> dict:
+        # Sends several show commands in one write and reads all their outputs in one pass, so a batch costs
+        # one round trip instead of one per command; returns command -> output
+        commands = list(dict.fromkeys(commands))
+        if not commands:
+            return {}
+        with self._session() as net_connect:
+            return self._run_batch(net_connect, commands, read_timeout)
+
+    def _run_batch(self, net_connect, commands, read_timeout=30) -> dict:
+        # the device echoes and answers the commands one after another, each followed by its prompt;
+        # the output is complete once a prompt was seen after every command
+        from netmiko import ReadTimeout
+
+        host = self.device_details['host']
+        prompt = re.compile(r'^' + re.escape(net_connect.base_prompt) + r'[>#]', re.MULTILINE)
+        end_pattern = re.compile(re.escape(net_connect.base_prompt) + r'[>#]\s*$')
+        text = ''.join(net_connect.normalize_cmd(command) for command in commands)
+
+        with registry.timer('command', host):
+            net_connect.write_channel(text)
+            recorder.record(host, 'sent', '\n'.join(commands), session=net_connect)
+            buffer = ''
+            last_data = time.monotonic()
+            try:
+                while True:
+                    chunk = net_connect.read_channel()
+                    if not chunk:
+                        if time.monotonic() - last_data > read_timeout:
+                            raise ReadTimeout(f"No output from {self.hostname} for {read_timeout}s while running "
+                                              f"'{commands[0]}' and {len(commands) - 1} more command(s).")
+                        time.sleep(STREAM_POLL_INTERVAL)
+                        continue
+                    last_data = time.monotonic()
+                    chunk = chunk.replace('\r', '')
+                    recorder.record(host, 'received', chunk, complete=False, session=net_connect)
+                    buffer += chunk
+                    # counting prompts is only worth it when the buffer ends with one
+                    if end_pattern.search(buffer[-256:]) and len(prompt.findall(buffer)) >= len(commands):
+                        break
+            finally:
+                recorder.record(host, 'received', '\n', complete=False, session=net_connect)
+        registry.increment('netauto_bytes_total', len(text.encode()), device=host, direction='sent')
+        registry.increment('netauto_bytes_total', len(buffer.encode()), device=host, direction='received')
+
+        # one segment per command: its echo on the first line, then its output
+        segments = prompt.split(buffer)
+        return {command: segment.split('\n', 1)[1].rstrip('\n') if '\n' in segment else ''
+                for command, segment in zip(commands, segments)}
+
+    def stream_command(self, command: str, read_timeout=30, expect_string=None, lines=True):
+        # Sends a command and yields its output while the device prints it: complete lines (without '\n'),
+        # or with lines=False the raw chunks as received. Only the current line is held in memory;
+        # read_timeout is how long the device may stay silent, not a limit on the whole command
+        with self._session() as net_connect:
+            chunks = self._stream(net_connect, command, read_timeout, expect_string)
+            yield from (_split_lines(chunks) if lines else chunks)
+
+    def _stream(self, net_connect, command, read_timeout=30, expect_string=None):
+        # Writes the command to the channel and yields the output without its echo and the final prompt
+        from netmiko import ReadTimeout
+
+        host = self.device_details['host']
+        base_prompt = net_connect.base_prompt
+        end_pattern = re.compile(expect_string or re.escape(base_prompt) + r'.*[>#]\s*$')
+        received = 0
+
+        with registry.timer('command', host):
+            net_connect.write_channel(net_connect.normalize_cmd(command))
+            recorder.record(host, 'sent', command, session=net_connect)
+            buffer = ''
+            echo_skipped = False
+            last_data = time.monotonic()
+            try:
+                while True:
+                    chunk = net_connect.read_channel()
+                    if not chunk:
+                        if time.monotonic() - last_data > read_timeout:
+                            raise ReadTimeout(f"No output from {self.hostname} for {read_timeout}s while running "
+                                              f"'{command}'.")
+                        time.sleep(STREAM_POLL_INTERVAL)
+                        continue
+                    last_data = time.monotonic()
+                    received += len(chunk.encode())
+                    chunk = chunk.replace('\r', '')
+                    recorder.record(host, 'received', chunk, complete=False, session=net_connect)
+                    buffer += chunk
+
+                    if not echo_skipped:
+                        # the first line is the device echoing the command back
+                        if '\n' not in buffer:
+                            continue
+                        buffer = buffer.split('\n', 1)[1]
+                        echo_skipped = True
+
+                    head, newline, tail = buffer.rpartition('\n')
+                    if end_pattern.search(tail):
+                        if head:
+                            yield head + newline
+                        break
+                    # an incomplete last line may be the start of the prompt, so it waits for more output
+                    if base_prompt.startswith(tail) or tail.startswith(base_prompt):
+                        if head:
+                            yield head + newline
+                        buffer = tail
+                    else:
+                        yield buffer
+                        buffer = ''
+            finally:
+                # the output ends with the prompt; the next command starts on a new line of the transcript.
+                # Also when the read fails or the caller stops early, so the held last line is not lost
+                recorder.record(host, 'received', '\n', complete=False, session=net_connect)
+        registry.increment('netauto_bytes_total', len(command.encode()) + 1, device=host, direction='sent')
+        registry.increment('netauto_bytes_total', received, device=host, direction='received')
+
+    # --- async API: the same operations driven by an event loop (asyncssh, or Netmiko in worker threads) ---
+
+    async def run_command_async(self, command: str, read_timeout=30, expect_string=None) -> str:
+        async with self._async_session() as transport:
+            return await transport.send_command(command, read_timeout, expect_string)
+
+    async def push_config_async(self, commands, mode=None) -> str:
+        # async counterpart of push_config, with the same push modes
+        mode = mode or self.push_mode
+        async with self._async_session() as transport:
+            if mode != 'full':
+                tree = self._running_config(transport)
+                if tree is None:
+                    tree = self._keep_running_config(transport, await transport.send_command('show running-config',
+                                                                                             read_timeout=60))
+                delta = tree.delta(commands)
+                if mode == 'dry-run':
+                    return format_diff(commands, delta)
+                if not delta:
+                    return ''
+                commands = delta
+            output = await transport.send_config_set(commands)
+        self._config_changed()
+        return output
+
+    async def ping_async(self, destination_ip, repeat=5) -> dict:
+        # returns the parsed success rate and round-trip times, plus the raw output
+        if not Device.check_ipv4(destination_ip):
+            raise ValueError(f"'{destination_ip}' is not a valid IPv4 address.")
+        output = await self.run_command_async(f'ping {destination_ip} repeat {repeat}', expect_string=r'#')
+        return dict(parse_ping(output), target=destination_ip, output=output)
+
+    async def show_ip_interface_brief_async(self, refresh=False) -> list:
+        return await self.show_structured_async('show ip interface brief', parse_ip_interface_brief, refresh)
+
+    async def show_structured_async(self, command, parser, refresh=False) -> list:
+        # async counterpart of show_structured, sharing the same result cache; the caller gets its own copy too
+        host = self.device_details['host']
+        cached = None if refresh else Device.cache.get(host, command)
+        if cached is not None:
+            return copy.deepcopy(cached[0][0])
+        output = await self.run_command_async(command)
+        records = parser(output)
+        Device.cache.put(host, command, (records, output))
+        return copy.deepcopy(records)
+
+    async def close_async(self) -> None:
+        if self._async_state is not None:
+            transport = self._async_state[2]
+            self._async_state = None
+            if transport is not None:
+                await transport.close()
+
+    @asynccontextmanager
+    async def _async_session(self):
+        # one transport per device and event loop; the lock keeps concurrent callers from interleaving commands
+        # the async stack (asyncio, asyncssh) is only loaded by scripts that use it
+        import asyncio
+        from AsyncTransport import open_transport
+
+        loop = asyncio.get_running_loop()
+        if self._async_state is None or self._async_state[0] is not loop:
+            self._async_state = (loop, asyncio.Lock(), None)
+        lock = self._async_state[1]
+
+        async with lock:
+            transport = self._async_state[2]
+            if transport is None:
+                transport = await open_transport(self)
+                self._async_state = (loop, lock, transport)
+            try:
+                yield transport
+            except Exception:
+                # a failed command can leave the shell in an unknown state: reconnect next time
+                self._async_state = (loop, lock, None)
+                try:
+                    await transport.close()
+                except Exception:
+                    pass
+                raise
+
+    @staticmethod
+    def check_ipv4(ip: str) -> bool:
+        # checker for ipv4 addresses (see Addressing for subnet and bulk checks)
+        return is_ipv4(ip)
+
+
+def _split_lines(chunks):
+    # turns a stream of text chunks into a stream of lines
+    pending = ''
+    for chunk in chunks:
+        pending += chunk
+        *complete, pending = pending.split('\n')
+        yield from complete
+    if pending:
+        yield pending
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from Device import Device
+from Router import Router
+from Switch import Switch
+from Vault import SECRET_FIELDS, vault
+
+
+def build_device(device_info):
+    # creates a Router or Switch instance from one devices.json entry
+    device_type = device_info.get('type', '').lower()
+    if device_type == 'router':
+        device_class = Router
+    elif device_type == 'switch':
+        device_class = Switch
+    else:
+        raise ValueError(f"Unsupported device type: '{device_info.get('type', 'N/A')}'.")
+
+    return device_class(
+        hostname=device_info['hostname'],
+        ip_address=device_info['ip_address'],
+        username=device_info['username'],
+        password=device_info['password'],
+        exec_pass=device_info['exec_password'],
+        device_type=device_info['device_type'],
+        port=device_info.get('port')
+    )
+
+
+def stream_to_log(command, log_dir, read_timeout=30):
+    # action for FleetExecutor.run that streams a command's output into <log_dir>/<hostname>.log as it
+    # arrives, so large outputs from many devices are never held in memory; the result output names the file
+    os.makedirs(log_dir, exist_ok=True)
+
+    def action(device):
+        path = os.path.join(log_dir, f"{device.hostname.replace(os.sep, '_')}.log")
+        with open(path, 'w') as file:
+            for chunk in device.stream_command(command, read_timeout=read_timeout, lines=False):
+                file.write(chunk)
+        return f"Output written to '{path}'."
+
+    return action
+
+
+class DeviceResult:
+    # outcome of running an action on one device of the fleet
+    def __init__(self, hostname, host, ok, output=None, error=None, elapsed=0.0):
+        self.hostname = hostname
+        self.host = host
+        self.ok = ok
+        self.output = output
+        self.error = error
+        self.elapsed = elapsed
+
+
+class FleetExecutor:
+    # Runs an action on many devices at once over a bounded thread pool.
+    # Results are yielded as each device finishes, so total time follows the slowest device.
+    def __init__(self, max_workers=32, timeout=60):
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+    def run(self, devices, action):
+        # action is called as action(device) and its return value becomes the result's output
+        devices = list(devices)
+        if not devices:
+            return
+        vault.unlock_for(device.device_details.get(field) for device in devices for field in SECRET_FIELDS)
+
+        started = {}
+        workers = {}  # index -> thread running the device's action, while it runs
+        workers_lock = threading.Lock()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fleet')
+        futures = {executor.submit(self._call, index, device, action, started, workers, workers_lock): index
+                   for index, device in enumerate(devices)}
+        pending = set(futures)
+
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=self._next_deadline(started, futures, pending),
+                                     return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+                # the per-device timeout counts from the moment a worker picked the device up
+                now = time.monotonic()
+                for future in list(pending):
+                    index = futures[future]
+                    if index in started and now - started[index] > self.timeout:
+                        pending.discard(future)
+                        device = devices[index]
+                        # the thread cannot be stopped; cancelling it in the pool cuts its session and fails its
+                        # next command, so the host is not held until the abandoned action ends by itself
+                        with workers_lock:
+                            if index in workers:
+                                Device.pool.cancel(workers[index])
+                        yield DeviceResult(device.hostname, device.device_details['host'], False,
+                                           error=f"timed out after {self.timeout}s", elapsed=now - started[index])
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run_async(self, devices, action):
+        # async counterpart of run(): action(device) is a coroutine (e.g. the *_async device methods);
+        # max_workers bounds how many devices are handled at once on the event loop
+        import asyncio
+
+        devices = list(devices)
+        vault.unlock_for(device.device_details.get(field) for device in devices for field in SECRET_FIELDS)
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def call(device):
+            async with semaphore:
+                start = loop.time()
+                try:
+                    output = await asyncio.wait_for(action(device), self.timeout)
+                    ok, error = True, None
+                except asyncio.TimeoutError:
+                    output, ok, error = None, False, f"timed out after {self.timeout}s"
+                except Exception as e:
+                    output, ok, error = None, False, str(e) or type(e).__name__
+                return DeviceResult(device.hostname, device.device_details['host'], ok, output=output, error=error,
+                                    elapsed=loop.time() - start)
+
+        tasks = [asyncio.ensure_future(call(device)) for device in devices]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def run_and_report(self, devices, action, show_output=True) -> list:
+        # runs the action on the fleet, printing each device's result as it arrives and a summary at the end
+        devices = list(devices)
+        results = []
+        start = time.monotonic()
+        print(f"\nRunning on {len(devices)} device(s) with up to {self.max_workers} in parallel...")
+
+        for result in self.run(devices, action):
+            results.append(result)
+            status = "OK" if result.ok else "FAILED"
+            print(f"[{len(results)}/{len(devices)}] {status:6} {result.hostname} ({result.host}) "
+                  f"in {result.elapsed:.1f}s")
+            if result.ok and show_output and result.output:
+                print(result.output)
+            elif not result.ok:
+                print(f"    Error: {result.error}")
+
+        print_summary(results, time.monotonic() - start)
+        return results
+
+    def _next_deadline(self, started, futures, pending) -> float:
+        # how long wait() may block before the next running device could time out
+        now = time.monotonic()
+        deadlines = [started[futures[f]] + self.timeout - now for f in pending if futures[f] in started]
+        return max(0.05, min(deadlines + [1.0]))
+
+    @staticmethod
+    def _call(index, device, action, started, workers, workers_lock) -> DeviceResult:
+        started[index] = time.monotonic()
+        with workers_lock:
+            workers[index] = threading.get_ident()
+        try:
+            output = action(device)
+            ok, error = True, None
+        except Exception as e:
+            output, ok, error = None, False, str(e) or type(e).__name__
+        finally:
+            # the thread goes back to the executor for other devices
+            with workers_lock:
+                del workers[index]
+                Device.pool.uncancel(threading.get_ident())
+        return DeviceResult(device.hostname, device.device_details['host'], ok, output=output, error=error,
+                            elapsed=time.monotonic() - started[index])
+
+
+def print_summary(results, elapsed) -> None:
+    succeeded = [r for r in results if r.ok]
+    failed = [r for r in results if not r.ok]
+
+    print("\n----------- Fleet Run Summary -----------")
+    print(f"Devices: {len(results)}, succeeded: {len(succeeded)}, failed: {len(failed)}, "
+          f"wall-clock time: {elapsed:.1f}s")
+    for result in failed:
+        print(f"  {result.hostname} ({result.host}): {result.error}")
+    print("-----------------------------------------\n")
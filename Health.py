@@ -0,0 +1,100 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# consecutive failed connections before a device is skipped for a cooldown period
+FAILURE_THRESHOLD = 2
+# first cooldown in seconds; it doubles with every further failure, up to MAX_COOLDOWN
+COOLDOWN = 300
+MAX_COOLDOWN = 3600
+
+
+class CircuitOpenError(Exception):
+    # raised instead of connecting to a device that failed repeatedly and is still cooling down
+    pass
+
+
+class DeviceHealth:
+    # Circuit breaker per device: after FAILURE_THRESHOLD failed connections in a row a device is
+    # fast-failed until its cooldown ends; then one attempt is let through (half-open), which either
+    # closes the circuit or opens it again for twice as long. The state is kept in a JSON file so
+    # that later runs skip the same dead devices.
+    def __init__(self, path='device_health.json', failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN,
+                 max_cooldown=MAX_COOLDOWN):
+        self.path = path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._hosts = None  # host -> {'failures', 'open_until', 'last_error', 'last_failure'}; loaded on first use
+        self._lock = threading.Lock()
+
+    def check(self, host) -> bool:
+        # raises CircuitOpenError while the host is cooling down; returns True when this attempt is the
+        # single probe after a cooldown (the caller should not retry it)
+        with self._lock:
+            state = self._state().get(host)
+            if state is None or state['failures'] < self.failure_threshold:
+                return False
+            remaining = state['open_until'] - time.time()
+            if remaining > 0:
+                raise CircuitOpenError(f"{host} failed {state['failures']} connection attempts in a row "
+                                       f"(last error: {state['last_error']}); skipped for another "
+                                       f"{remaining:.0f}s.")
+            return True
+
+    def record_success(self, host) -> None:
+        with self._lock:
+            if self._state().pop(host, None) is not None:
+                self._save()
+
+    def record_failure(self, host, error) -> None:
+        with self._lock:
+            state = self._state().setdefault(host, {'failures': 0, 'open_until': 0})
+            state['failures'] += 1
+            state['last_error'] = str(error).splitlines()[0][:200] if str(error) else type(error).__name__
+            state['last_failure'] = time.time()
+            if state['failures'] >= self.failure_threshold:
+                cooldown = self.cooldown * 2 ** (state['failures'] - self.failure_threshold)
+                state['open_until'] = time.time() + min(self.max_cooldown, cooldown)
+            self._save()
+
+    def reset(self, host=None) -> None:
+        # forgets the failures of one host (or of every host), e.g. after it was repaired
+        with self._lock:
+            if host is None:
+                self._state().clear()
+            else:
+                self._state().pop(host, None)
+            self._save()
+
+    def unhealthy(self) -> dict:
+        # hosts with recorded failures and the seconds left of their cooldown (0 when they may be tried)
+        with self._lock:
+            now = time.time()
+            return {host: max(0.0, state['open_until'] - now) for host, state in self._state().items()}
+
+    def _state(self) -> dict:
+        if self._hosts is None:
+            try:
+                with open(self.path, 'r') as file:
+                    self._hosts = json.load(file)
+            except FileNotFoundError:
+                self._hosts = {}
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read device health from '{self.path}' ({e}); starting afresh.",
+                      file=sys.stderr)
+                self._hosts = {}
+        return self._hosts
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w') as file:
+                json.dump(self._hosts, file, indent=2)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not save device health to '{self.path}': {e}", file=sys.stderr)
@@ -0,0 +1,320 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+REQUIRED_KEYS = ('type', 'hostname', 'ip_address', 'username', 'password', 'exec_password', 'device_type')
+
+# files bigger than this are parsed entry by entry instead of being loaded whole with json.load
+STREAM_THRESHOLD = 8 * 1024 * 1024
+
+# fields an open SSH session depends on; when only other fields change (site, groups, hostname) a device's
+# sessions are kept after a reload
+CONNECTION_KEYS = ('ip_address', 'username', 'password', 'exec_password', 'device_type', 'port')
+
+# warnings kept for the menu while the watcher runs (see Inventory.watch); older ones are dropped
+MAX_WARNINGS = 50
+
+
+class DeviceRecord:
+    # one validated devices.json entry; __slots__ keeps large inventories compact in memory
+    __slots__ = REQUIRED_KEYS + ('site', 'port', 'groups')
+
+    def __init__(self, type, hostname, ip_address, username, password, exec_password, device_type, site=None,
+                 port=None, groups=()):
+        self.type = type.lower()
+        self.hostname = hostname
+        self.ip_address = ip_address
+        self.username = username
+        self.password = password
+        self.exec_password = exec_password
+        self.device_type = device_type
+        self.site = site
+        self.port = port
+        # groups can be given as a list or as a comma-separated string ("access, floor2")
+        if isinstance(groups, str):
+            groups = groups.split(',')
+        self.groups = tuple(str(group).strip() for group in groups or () if str(group).strip())
+
+    @classmethod
+    def from_entry(cls, entry):
+        # validates a raw JSON entry; raises ValueError when it cannot be used
+        if not isinstance(entry, dict):
+            raise ValueError("Device entry is not a JSON object.")
+        missing = [key for key in REQUIRED_KEYS if key not in entry]
+        if missing:
+            raise ValueError(f"Device entry for '{entry.get('hostname', 'N/A')}' is missing required keys: "
+                             f"{', '.join(missing)}.")
+        return cls(**{key: entry[key] for key in REQUIRED_KEYS}, site=entry.get('site'), port=entry.get('port'),
+                   groups=entry.get('groups'))
+
+    # dict-style access, so records can be used wherever a devices.json entry was used before
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self) -> dict:
+        entry = {key: getattr(self, key) for key in REQUIRED_KEYS}
+        for key in ('site', 'port'):
+            if getattr(self, key) is not None:
+                entry[key] = getattr(self, key)
+        if self.groups:
+            entry['groups'] = list(self.groups)
+        return entry
+
+    def connection_changed(self, other) -> bool:
+        return any(getattr(self, key) != getattr(other, key) for key in CONNECTION_KEYS)
+
+
+class Inventory:
+    # Devices from devices.json with hash indexes by IP address, hostname, type, site and group,
+    # so lookups stay O(1) however many entries the file has.
+    def __init__(self, records=()):
+        self._records = []
+        self._by_ip = {}
+        self._by_hostname = {}
+        self._by_type = {}
+        self._by_site = {}
+        self._by_group = {}
+        # file the inventory was loaded from and its (mtime, size) at that time, for reload()
+        self.filename = None
+        self.file_signature = None
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        # called with each warning (skipped entries, failed reloads); while the watcher runs they are kept
+        # in _warnings for take_warnings() instead of being printed over the menu
+        self.warn = print_warning
+        self._warnings = deque(maxlen=MAX_WARNINGS)
+        for record in records:
+            self.add(record)
+
+    @classmethod
+    def load(cls, filename='devices.json', stream=None, warn=None):
+        # entries are validated once here; invalid ones are reported through warn (default: stderr) and skipped
+        # the signature is taken before reading, so a write during the read is picked up by the next reload
+        signature = file_signature(filename)
+        if stream is None:
+            stream = signature[1] > STREAM_THRESHOLD
+
+        inventory = cls()
+        inventory.warn = warn or print_warning
+        inventory.filename = filename
+        inventory.file_signature = signature
+        with open(filename, 'r') as file:
+            entries = iter_json_array(file) if stream else json.load(file)
+            if not isinstance(entries, list) and not stream:
+                raise ValueError(f"'{filename}' must contain a JSON list of devices.")
+            for entry in entries:
+                try:
+                    inventory.add(DeviceRecord.from_entry(entry))
+                except ValueError as e:
+                    inventory.warn(f"Warning: {e} Skipping it.")
+        return inventory
+
+    def add(self, record: DeviceRecord) -> None:
+        if record.ip_address in self._by_ip:
+            self.warn(f"Warning: Duplicate IP address {record.ip_address} for '{record.hostname}'. Skipping it.")
+            return
+        self._records.append(record)
+        self._index(record)
+
+    def reload(self) -> tuple:
+        # re-reads the file and applies only the differences: records are matched by IP address, unchanged
+        # ones are kept as they are, and the others are added, removed or replaced in place (keeping the
+        # file's order). Returns (added records, removed records, [(old record, new record)] for changes).
+        with self._reload_lock:
+            new = Inventory.load(self.filename, warn=self.warn)
+            added, changed = [], []
+            for record in new:
+                old = self._by_ip.get(record.ip_address)
+                if old is None:
+                    added.append(record)
+                elif old.as_dict() != record.as_dict():
+                    changed.append((old, record))
+            removed = [record for record in self._records if new.by_ip(record.ip_address) is None]
+
+            if removed or changed:
+                gone = {record.ip_address for record in removed}
+                replacements = {old.ip_address: record for old, record in changed}
+                self._records = [replacements.get(record.ip_address, record) for record in self._records
+                                 if record.ip_address not in gone]
+                for record in removed:
+                    self._unindex(record)
+                for old, record in changed:
+                    self._unindex(old)
+                    self._index(record)
+            for record in added:
+                self.add(record)
+            self.file_signature = new.file_signature
+            return added, removed, changed
+
+    def reload_if_changed(self):
+        # reloads when the file's modification time or size differs from the last load; returns the
+        # result of reload(), or None when the file is unchanged or cannot be read
+        try:
+            if self.filename is None or file_signature(self.filename) == self.file_signature:
+                return None
+            return self.reload()
+        except (OSError, ValueError) as e:
+            # a half-written file is read again on the next check
+            self.warn(f"Warning: could not reload '{self.filename}': {e}")
+            return None
+
+    def watch(self, on_change=None, interval=2.0) -> None:
+        # checks the file every `interval` seconds in a background thread and applies changes as they appear;
+        # on_change(added, removed, changed) is called after each reload that found a difference. From now on
+        # warnings are kept for take_warnings(), as the thread must not print while a menu owns the terminal
+        def loop():
+            while True:
+                time.sleep(interval)
+                result = self.reload_if_changed()
+                if result and any(result) and on_change:
+                    on_change(*result)
+
+        if self._watcher is None and self.filename:
+            self.warn = self._warnings.append
+            self._watcher = threading.Thread(target=loop, name='inventory-watcher', daemon=True)
+            self._watcher.start()
+
+    def take_warnings(self) -> list:
+        # returns the warnings kept since the last call and forgets them
+        warnings = []
+        while self._warnings:
+            warnings.append(self._warnings.popleft())
+        return warnings
+
+    def _index(self, record: DeviceRecord) -> None:
+        self._by_ip[record.ip_address] = record
+        self._by_hostname[record.hostname.lower()] = record
+        self._by_type.setdefault(record.type, []).append(record)
+        if record.site is not None:
+            self._by_site.setdefault(str(record.site).lower(), []).append(record)
+        for group in record.groups:
+            self._by_group.setdefault(group.lower(), []).append(record)
+
+    def _unindex(self, record: DeviceRecord) -> None:
+        # index lists are replaced rather than changed, so a lookup running meanwhile sees either version
+        self._by_ip.pop(record.ip_address, None)
+        if self._by_hostname.get(record.hostname.lower()) is record:
+            del self._by_hostname[record.hostname.lower()]
+        keys = [(self._by_type, record.type)] + [(self._by_group, group.lower()) for group in record.groups]
+        if record.site is not None:
+            keys.append((self._by_site, str(record.site).lower()))
+        for index, key in keys:
+            remaining = [r for r in index.get(key, []) if r is not record]
+            if remaining:
+                index[key] = remaining
+            else:
+                index.pop(key, None)
+
+    def by_ip(self, ip_address):
+        return self._by_ip.get(ip_address)
+
+    def by_hostname(self, hostname):
+        return self._by_hostname.get(hostname.lower())
+
+    def find(self, name_or_ip):
+        # looks a device up by IP address first, then by hostname
+        return self.by_ip(name_or_ip) or self.by_hostname(name_or_ip)
+
+    def filter(self, type=None, site=None, group=None) -> list:
+        # starts from the smallest matching index instead of scanning every record
+        indexes = []
+        if type:
+            indexes.append(self._by_type.get(type.lower(), []))
+        if site:
+            indexes.append(self._by_site.get(str(site).lower(), []))
+        if group:
+            indexes.append(self._by_group.get(str(group).lower(), []))
+        if not indexes:
+            return list(self._records)
+        candidates = min(indexes, key=len)
+        if len(indexes) == 1:
+            return list(candidates)
+        return [r for r in candidates
+                if (not type or r.type == type.lower())
+                and (not site or str(r.site).lower() == str(site).lower())
+                and (not group or str(group).lower() in (g.lower() for g in r.groups))]
+
+    def page(self, page_number, page_size=20, type=None, site=None, group=None):
+        # returns (records on the page, total number of pages); page numbers start at 1
+        records = self.filter(type, site, group) if (type or site or group) else self._records
+        total_pages = max(1, -(-len(records) // page_size))
+        start = (page_number - 1) * page_size
+        return records[start:start + page_size], total_pages
+
+    def types(self) -> list:
+        return sorted(self._by_type)
+
+    def sites(self) -> list:
+        return sorted(self._by_site)
+
+    def groups(self) -> list:
+        return sorted(self._by_group)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+
+def print_warning(message) -> None:
+    print(message, file=sys.stderr)
+
+
+def file_signature(filename) -> tuple:
+    stat = os.stat(filename)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def iter_json_array(file, chunk_size=64 * 1024):
+    # yields the elements of a top-level JSON array one by one, reading the file in chunks
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # skip whitespace and separators between elements
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+
+        if position >= len(buffer):
+            raise ValueError("Unexpected end of JSON device list.")
+        if not started:
+            if buffer[position] != '[':
+                raise ValueError("Device data file must contain a JSON list of devices.")
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # the element continues in the next chunk
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+
+        yield element
+        position = end
@@ -0,0 +1,193 @@
+import argparse
+import json
+
+from Addressing import AddressPlan
+from Fleet import FleetExecutor, build_device
+from Inventory import Inventory
+from Router import Router
+from RunningConfig import SUBMODE_PREFIXES
+from Switch import Switch
+from Templates import platform_for
+from Verification import checks_for, failed_checks, format_results, run_checks
+
+try:
+    import yaml
+except ImportError:  # YAML job files are optional, JSON always works
+    yaml = None
+
+
+# operation name used in job files -> (device type it applies to, command builder)
+OPERATIONS = {
+    'vlan': ('switch', Switch.vlan_commands),
+    'vlan_range': ('switch', Switch.vlan_range_commands),
+    'port_security': ('switch', Switch.security_commands),
+    'port_security_range': ('switch', Switch.security_range_commands),
+    'stp': ('switch', Switch.stp_commands),
+    'dhcp_server': ('router', Router.dhcp_server_commands),
+    'dhcp_helper': ('router', Router.dhcp_helper_commands),
+    'dhcp_client': ('router', Router.dhcp_client_commands),
+    'hsrp': ('router', Router.hsrp_commands),
+    'ripv2': ('router', Router.ripv2_commands),
+}
+
+
+def load_job_file(filename) -> dict:
+    # reads a YAML or JSON job file
+    with open(filename, 'r') as file:
+        if filename.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ValueError("PyYAML is not installed; use a JSON job file or run 'pip3 install pyyaml'.")
+            return yaml.safe_load(file) or {}
+        return json.load(file)
+
+
+def append_operation(commands, operation_commands) -> None:
+    # adds one operation to a device's config set, leaving the previous operation's sub-mode first
+    # (a bare 'exit' in global configuration mode would leave configuration mode altogether)
+    in_submode = False
+    for command in commands:
+        if command.startswith(SUBMODE_PREFIXES):
+            in_submode = True
+        elif command == 'exit':
+            in_submode = False
+    if in_submode and operation_commands:
+        commands.append('exit')
+    commands.extend(operation_commands)
+
+
+class JobRunner:
+    # Applies the operations of a job file to many devices in one pass: all commands for a
+    # device are grouped into a single send_config_set call on one session.
+    def __init__(self, devices_data: Inventory, max_workers=32, timeout=120):
+        self.devices_data = devices_data
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # hostname -> post-checks of its operations (see Verification), filled in by plan()
+        self.checks = {}
+
+    def plan(self, job_data) -> dict:
+        # validates every operation before any SSH session is opened; returns hostname -> (device info, commands)
+        plan = {}
+        self.checks = {}
+        addresses = AddressPlan()
+        for job_number, job in enumerate(job_data.get('jobs', []), start=1):
+            targets = self._resolve_targets(job, job_number)
+            for operation in job.get('operations', []):
+                if not isinstance(operation, dict) or len(operation) != 1:
+                    raise ValueError(f"Job {job_number}: each operation must be a single 'name: {{parameters}}' entry.")
+                name, params = next(iter(operation.items()))
+                if name not in OPERATIONS:
+                    raise ValueError(f"Job {job_number}: unknown operation '{name}'.")
+                device_type, builder = OPERATIONS[name]
+
+                # the commands and checks are built and validated once per platform, not once per device
+                commands_by_platform = {}
+                checks_by_platform = {}
+                for device_info in targets:
+                    if device_info.get('type', '').lower() != device_type:
+                        raise ValueError(f"Job {job_number}: operation '{name}' cannot be applied to "
+                                         f"{device_info.get('type', 'N/A')} '{device_info.get('hostname', 'N/A')}'.")
+                    platform = platform_for(device_info['device_type'])
+                    if platform not in commands_by_platform:
+                        try:
+                            commands_by_platform[platform] = builder(**(params or {}), platform=platform)
+                        except (TypeError, ValueError) as e:
+                            raise ValueError(f"Job {job_number}, operation '{name}': {e}")
+                        checks_by_platform[platform] = checks_for(name, platform, **(params or {}))
+                    entry = plan.setdefault(device_info['hostname'], (device_info, []))
+                    append_operation(entry[1], commands_by_platform[platform])
+                    self.checks.setdefault(device_info['hostname'], []).extend(checks_by_platform[platform])
+                    addresses.add_operation(device_info['hostname'], name, params)
+
+        # addresses are also checked across devices: duplicates and overlapping DHCP pools
+        conflicts = addresses.conflicts()
+        if conflicts:
+            shown = conflicts[:20] + ([f"... and {len(conflicts) - 20} more."] if len(conflicts) > 20 else [])
+            raise ValueError("Address conflicts in the job file:\n  " + "\n  ".join(shown))
+        return plan
+
+    def run(self, job_data, dry_run=False, mode='full', verify=False) -> list:
+        # mode 'diff' sends only what each running-config is missing; 'dry-run' prints that diff per device.
+        # With verify, every device is checked after its change and fails when a check does not pass.
+        plan = self.plan(job_data)
+        if not plan:
+            print("The job file does not contain any operations.")
+            return []
+
+        if dry_run:
+            for hostname, (device_info, commands) in plan.items():
+                print(f"\n--- {hostname} ({device_info['ip_address']}): {len(commands)} command(s) ---")
+                print("\n".join(commands))
+            return []
+
+        commands_by_host = {hostname: commands for hostname, (_, commands) in plan.items()}
+        devices = [build_device(device_info) for device_info, _ in plan.values()]
+
+        def apply(device):
+            output = device.push_config(commands_by_host[device.hostname], mode=mode)
+            if not verify or mode == 'dry-run':
+                return output
+            results = run_checks(device, self.checks.get(device.hostname, []))
+            failed = failed_checks(results)
+            if failed:
+                raise RuntimeError(f"verification failed: {failed}")
+            return f"{output}\n{format_results(results)}" if results else output
+
+        executor = FleetExecutor(max_workers=self.max_workers, timeout=self.timeout)
+        return executor.run_and_report(devices, apply)
+
+    def _resolve_targets(self, job, job_number) -> list:
+        # a job targets hostnames and/or IP addresses, or 'all' devices (optionally of one type)
+        selection = job.get('devices', 'all')
+        device_type = job.get('type', '').lower()
+
+        if selection == 'all':
+            targets = self.devices_data.filter(type=device_type)
+        else:
+            if isinstance(selection, str):
+                selection = [selection]
+            targets = []
+            for name in selection:
+                device_info = self.devices_data.find(str(name))
+                if device_info is None:
+                    raise ValueError(f"Job {job_number}: device '{name}' not found in the configuration.")
+                targets.append(device_info)
+
+        if not targets:
+            raise ValueError(f"Job {job_number}: no devices selected.")
+        return targets
+
+
+def main():
+    from Menu import load_devices_from_json
+
+    parser = argparse.ArgumentParser(description="Apply a YAML/JSON job file to the devices in devices.json.")
+    parser.add_argument('job_file')
+    parser.add_argument('--devices', default='devices.json', help="device data file (default: devices.json)")
+    parser.add_argument('--parallel', type=int, default=32, help="devices configured at the same time")
+    parser.add_argument('--timeout', type=int, default=120, help="per-device timeout in seconds")
+    parser.add_argument('--dry-run', action='store_true', help="print the commands without connecting "
+                                                               "(with --diff: print each device's diff)")
+    parser.add_argument('--diff', action='store_true', help="send only commands missing from the running-config")
+    parser.add_argument('--verify', action='store_true', help="check every device after its change (VLANs active, "
+                                                              "HSRP active/standby, DHCP leases, ...)")
+    args = parser.parse_args()
+
+    devices_data = load_devices_from_json(args.devices)
+    try:
+        job_data = load_job_file(args.job_file)
+        runner = JobRunner(devices_data, args.parallel, args.timeout)
+        if args.diff:
+            results = runner.run(job_data, mode='dry-run' if args.dry_run else 'diff', verify=args.verify)
+        else:
+            results = runner.run(job_data, dry_run=args.dry_run, verify=args.verify)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        raise SystemExit(2)
+
+    if any(not result.ok for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,250 +1,530 @@
-from Switch import Switch
-from Router import Router
-from Device import Device
-import json
-import os
-from simple_term_menu import TerminalMenu
-
-
-def load_devices_from_json(filename='devices.json'):
-    # method for loading details about known devices from a JSON file
-    try:
-        with open(filename, 'r') as file:
-            devices_data = json.load(file)
-        # Basic validation
-        for i, device_entry in enumerate(devices_data):
-             if not all(key in device_entry for key in ['type', 'hostname', 'ip_address', 'username', 'password', 'exec_password', 'device_type']):
-                 print(f"Warning: Device entry for '{device_entry.get('hostname', 'N/A')}' is missing one or more required keys.")
-        return devices_data
-    except FileNotFoundError:
-        print(f"Error: Device data file '{filename}' not found.")
-        return []
-    except json.JSONDecodeError:
-        print(f"Error: Could not decode JSON from '{filename}'.")
-        return []
-    except Exception as e:
-        print(f"An unexpected error occurred while loading device data: {e}")
-        return []
-
-    def clear_screen():
-        os.system('cls' if os.name == 'nt' else 'clear')
-
-def main():
-    # method for main menu
-    devices = load_devices_from_json()
-    if not devices:
-        print("No devices loaded or error during loading. Please check 'devices.json'. Exiting application.")
-        return
-
-    main_menu_title = "=======================================\n" \
-                      "======= Network Automation Tool =======\n" \
-                      "============== Main Menu ==============\n" \
-                      "=======================================\n"
-    main_menu_items = [
-        "List available devices",
-        "Choose a device to manage",
-        "Exit"
-    ]
-    main_menu = TerminalMenu(
-        main_menu_items,
-        title=main_menu_title,
-        clear_screen=True,
-    )
-
-    while True:
-        menu_entry_index = main_menu.show()
-
-        if menu_entry_index is None or main_menu_items[menu_entry_index] == "Exit":
-            print("Exiting application...")
-            break
-
-        choice = main_menu_items[menu_entry_index]
-
-        if choice == "List available devices":
-            list_available_devices(devices)
-        elif choice == "Choose a device to manage":
-            manage_device_menu(devices)
-
-
-def list_available_devices(devices_data):
-
-    print("\n----------- Available Devices -----------")
-    for i, device_info in enumerate(devices_data):
-        print(f"{i + 1}. Hostname: {device_info.get('hostname', 'N/A')}, "
-              f"IP: {device_info.get('ip_address', 'N/A')}, "
-              f"Type: {device_info.get('type', 'N/A')}")
-    print("-----------------------------------------\n")
-    input("Press Enter to return to the Main Menu...")
-
-
-def manage_device_menu(devices_data):
-
-    print("\n--- Manage Device ---")
-
-    while True:
-        selected_ip = input("Enter the IP address of the device to manage (or type 'back' to return): ").strip()
-
-        if selected_ip.lower() == 'back':
-            return
-
-            # if ip is validated by the method from file Device, then the loop for inputing an ip address is ended.
-        if Device.check_ipv4(selected_ip):
-            break
-        else:
-            print(f"'{selected_ip}' is not a valid IPv4 address. Please try again.")
-
-
-    target_device_info = next((dev for dev in devices_data if dev.get('ip_address') == selected_ip), None)
-
-    if not target_device_info:
-        print(f"Device with IP address '{selected_ip}' not found in the configuration.")
-        input("\nPress Enter to continue...")
-        return
-
-    print(f"\nSelected device: {target_device_info.get('hostname', 'N/A')} ({target_device_info.get('ip_address', 'N/A')})")
-
-    device_type = target_device_info.get('type', '').lower()
-
-    try:
-        if device_type == 'router':
-            instance = Router(
-                hostname=target_device_info['hostname'],
-                ip_address=target_device_info['ip_address'],
-                username=target_device_info['username'],
-                password=target_device_info['password'],
-                exec_pass=target_device_info['exec_password'],
-                device_type=target_device_info['device_type']
-            )
-            router_configuration_menu(instance)
-        elif device_type == 'switch':
-            instance = Switch(
-                hostname=target_device_info['hostname'],
-                ip_address=target_device_info['ip_address'],
-                username=target_device_info['username'],
-                password=target_device_info['password'],
-                exec_pass=target_device_info['exec_password'],
-                device_type=target_device_info['device_type']
-            )
-            switch_configuration_menu(instance)
-        else:
-            print(f"Unsupported device type: '{target_device_info.get('type', 'N/A')}'.")
-            input("\nPress Enter to continue...")
-    except KeyError as e:
-        print(f"Error: Device data for {selected_ip} is missing a required field: {e}")
-        input("\nPress Enter to continue...")
-
-
-def router_configuration_menu(router_instance: Router):
-    # method for config settings on a Router
-    menu_title = f"--- Router Configuration: {router_instance.hostname} ---"
-    menu_items = [
-        "Configure HSRP",
-        "DHCP Configuration",
-        "Set up RIPv2",
-        "Ping another device",
-        "Show IP Interface Brief",
-        "Return to Main Menu"
-    ]
-    config_menu = TerminalMenu(menu_items, title=menu_title, clear_screen=True)
-
-    while True:
-        menu_entry_index = config_menu.show()
-        if menu_entry_index is None or menu_items[menu_entry_index] == "Return to Main Menu":
-            break
-
-        selected_action = menu_items[menu_entry_index]
-        action_taken = False
-
-        if selected_action == "Configure HSRP":
-            router_instance.config_hsrp()
-            action_taken = True
-
-        elif selected_action == "DHCP Configuration":
-            # submenu for DHCP configuration options
-            dhcp_menu_title = f"--- DHCP Configuration: {router_instance.hostname} ---"
-            dhcp_menu_items = ["Configure a DHCP Server",
-                               "Add Helper Address",
-                               "Enable DHCP Client on interface",
-                               "Return to previous menu"]
-            dhcp_menu = TerminalMenu(dhcp_menu_items, title=dhcp_menu_title, clear_screen=True)
-
-            while True:
-                dhcp_menu_entry_index = dhcp_menu.show()
-                if dhcp_menu_entry_index is None or dhcp_menu_items[dhcp_menu_entry_index] == "Return to previous menu":
-                    break
-
-                dhcp_choice = dhcp_menu_items[dhcp_menu_entry_index]
-                if dhcp_choice == "Configure a DHCP Server":
-                    router_instance.setup_dhcp()
-                    action_taken = True
-                    break  # Exit sub-menu after action
-                elif dhcp_choice == "Add Helper Address":
-                    router_instance.config_dhcp_helper()
-                    action_taken = True
-                    break  # Exit sub-menu after action
-                elif dhcp_choice == "Enable DHCP Client on interface":
-                    router_instance.get_dhcp()
-                    action_taken = True
-                    break
-
-        elif selected_action == "Set up RIPv2":
-            router_instance.config_ripv2()
-            action_taken = True
-        elif selected_action == "Ping another device":
-            router_instance.ping()
-            action_taken = True
-        elif selected_action == "Show IP Interface Brief":
-            router_instance.show_ip_interface_brief()
-            action_taken = True
-
-        if action_taken:
-            input("\nOperation complete. Press Enter to continue...")
-
-
-def switch_configuration_menu(switch_instance: Switch):
-    # menu for Switch configuration
-    menu_title = f"--- Switch Configuration: {switch_instance.hostname} ---"
-    menu_items = [
-        "Configure a VLAN",
-        "Configure Port Security",
-        "Configure STP (Spanning Tree)",
-        "Ping another device",
-        "Show IP Interface Brief",
-        "Show VLAN Information",
-        "Return to Main Menu"
-    ]
-    config_menu = TerminalMenu(menu_items, title=menu_title, clear_screen=True)
-
-    while True:
-        menu_entry_index = config_menu.show()
-        if menu_entry_index is None or menu_items[menu_entry_index] == "Return to Main Menu":
-            break
-
-        selected_action = menu_items[menu_entry_index]
-        action_taken = False
-
-        if selected_action == "Configure a VLAN":
-            switch_instance.config_vlan()
-            action_taken = True
-        elif selected_action == "Configure Port Security":
-            switch_instance.config_security()
-            action_taken = True
-        elif selected_action == "Configure STP (Spanning Tree)":
-            switch_instance.config_stp()
-            action_taken = True
-        elif selected_action == "Ping another device":
-            switch_instance.ping()
-            action_taken = True
-        elif selected_action == "Show IP Interface Brief":
-            switch_instance.show_ip_interface_brief()
-            action_taken = True
-        elif selected_action == "Show VLAN Information":
-            switch_instance.show_vlan_brief()
-            action_taken = True
-
-        if action_taken:
-            input("\nOperation complete. Press Enter to continue...")
-
-
-if __name__ == "__main__":
+from Switch import Switch
+from Router import Router
+from Device import Device, PUSH_MODES
+from Fleet import FleetExecutor, build_device, stream_to_log
+from Inventory import Inventory
+from Metrics import registry
+from Parsers import format_table
+from Vault import vault
+import argparse
+import json
+import os
+import sys
+
+
+def load_devices_from_json(filename='devices.json'):
+    # method for loading details about known devices from a JSON file into an indexed Inventory
+    # (entries are validated once while loading; large files are parsed entry by entry)
+    try:
+        return Inventory.load(filename)
+    except FileNotFoundError:
+        print(f"Error: Device data file '{filename}' not found.", file=sys.stderr)
+        return Inventory()
+    except json.JSONDecodeError:
+        print(f"Error: Could not decode JSON from '{filename}'.", file=sys.stderr)
+        return Inventory()
+    except Exception as e:
+        print(f"An unexpected error occurred while loading device data: {e}", file=sys.stderr)
+        return Inventory()
+
+    def clear_screen():
+        os.system('cls' if os.name == 'nt' else 'clear')
+
+
+def terminal_menu(menu_items, **kwargs):
+    # simple_term_menu is only imported when a menu is drawn, so scripts that import this module
+    # (JobRunner, Backup, Rollout) do not load it
+    from simple_term_menu import TerminalMenu
+    return TerminalMenu(menu_items, **kwargs)
+
+
+def main():
+    # method for main menu
+    parser = argparse.ArgumentParser(description="Network automation menu for the devices in devices.json.")
+    parser.add_argument('--import-profile', action='store_true',
+                        help="report the import time of each module at startup and on the first connection")
+    parser.add_argument('--import-budget', type=float, metavar='MS',
+                        help="with --import-profile: exit with status 1 if startup imports take longer")
+    args = parser.parse_args()
+    if args.import_profile:
+        sys.exit(0 if import_profile(args.import_budget) else 1)
+
+    devices = load_devices_from_json()
+    if not devices:
+        print("No devices loaded or error during loading. Please check 'devices.json'. Exiting application.")
+        return
+
+    # optional metrics file for scraping, e.g. NETAUTO_METRICS_FILE=metrics.prom (or metrics.json)
+    metrics_file = os.environ.get('NETAUTO_METRICS_FILE')
+    if metrics_file:
+        registry.start_export(metrics_file)
+
+    # passwords kept in the vault are decrypted with a passphrase asked for once, at startup
+    vault.unlock_for([value for record in devices for value in (record.password, record.exec_password)], attempts=3)
+
+    # changes to devices.json are applied while the menu runs, without restarting
+    devices.watch(on_change=inventory_changed)
+
+    main_menu_title = "=======================================\n" \
+                      "======= Network Automation Tool =======\n" \
+                      "============== Main Menu ==============\n" \
+                      "=======================================\n"
+    main_menu_items = [
+        "List available devices",
+        "Choose a device to manage",
+        "Run a command on all devices",
+        "Back up all device configurations",
+        "Show performance metrics",
+        "Exit"
+    ]
+    main_menu = terminal_menu(
+        main_menu_items,
+        title=main_menu_title,
+        clear_screen=True,
+    )
+    showing_warnings = False
+
+    while True:
+        # warnings of the inventory watcher (e.g. a devices.json entry skipped after a reload) are shown above
+        # the menu, as the watcher thread does not print while the menu owns the terminal
+        warnings = devices.take_warnings()
+        if warnings or showing_warnings:
+            main_menu = terminal_menu(main_menu_items, title=main_menu_title + "".join(f"{w}\n" for w in warnings),
+                                      clear_screen=True)
+            showing_warnings = bool(warnings)
+        menu_entry_index = main_menu.show()
+
+        if menu_entry_index is None or main_menu_items[menu_entry_index] == "Exit":
+            print("Exiting application...")
+            # close the SSH sessions kept open between actions
+            Device.pool.close_all()
+            break
+
+        choice = main_menu_items[menu_entry_index]
+
+        if choice == "List available devices":
+            list_available_devices(devices)
+        elif choice == "Choose a device to manage":
+            manage_device_menu(devices)
+        elif choice == "Run a command on all devices":
+            fleet_command_menu(devices)
+        elif choice == "Back up all device configurations":
+            backup_menu(devices)
+        elif choice == "Show performance metrics":
+            show_metrics()
+
+
+def inventory_changed(added, removed, changed):
+    # called by the inventory watcher after devices.json changed: sessions to removed devices and to devices
+    # whose address or credentials changed are closed; the sessions of every other device stay open
+    for record in removed + [old for old, new in changed if old.connection_changed(new)]:
+        Device.pool.invalidate(record.ip_address)
+        Device.cache.invalidate(record.ip_address)
+    for change, records in (('added', added), ('removed', removed), ('changed', changed)):
+        if records:
+            registry.increment('netauto_inventory_changes_total', len(records), change=change)
+
+
+def list_available_devices(devices_data: Inventory, page_size=20):
+    # devices are listed one page at a time, optionally only those of one type, group or site
+    type_filter = site_filter = group_filter = None
+    filter_text = input(f"Filter by type ({'/'.join(devices_data.types())}), group or site "
+                        f"(press Enter to list all): ").strip().lower()
+    if filter_text in devices_data.types():
+        type_filter = filter_text
+    elif filter_text in devices_data.groups():
+        group_filter = filter_text
+    elif filter_text:
+        site_filter = filter_text
+
+    page_number = 1
+    while True:
+        records, total_pages = devices_data.page(page_number, page_size, type=type_filter, site=site_filter,
+                                                 group=group_filter)
+
+        print(f"\n----------- Available Devices (page {page_number}/{total_pages}) -----------")
+        for i, device_info in enumerate(records, start=(page_number - 1) * page_size):
+            site = f", Site: {device_info.site}" if device_info.site else ""
+            groups = f", Groups: {', '.join(device_info.groups)}" if device_info.groups else ""
+            print(f"{i + 1}. Hostname: {device_info.hostname}, "
+                  f"IP: {device_info.ip_address}, "
+                  f"Type: {device_info.type}{site}{groups}")
+        if not records:
+            print("No matching devices.")
+        print("-----------------------------------------\n")
+
+        if page_number >= total_pages:
+            input("Press Enter to return to the Main Menu...")
+            return
+        if input("Press Enter for the next page (or type 'back' to return): ").strip().lower() == 'back':
+            return
+        page_number += 1
+
+
+def import_times(statement) -> list:
+    # runs a statement in a fresh interpreter with '-X importtime' and returns one row per imported module
+    # (in the order the imports finished, so a module comes right after the modules it imported)
+    import subprocess
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append({'module': module.strip(), 'depth': (len(module) - len(module.lstrip()) - 1) // 2,
+                     'self': int(self_us) / 1000, 'cumulative': int(cumulative_us) / 1000})
+    return rows
+
+
+def import_profile(budget_ms=None, top=15) -> bool:
+    # prints the slowest imports of the menu at startup and of the connection stack loaded on the first
+    # connection; returns False if the startup imports took longer than the budget
+    columns = [('module', 'Module'), ('self', 'Self ms'), ('cumulative', 'Cumulative ms')]
+    phases = [('Startup', 'import Menu', 'Menu'),
+              ('First connection', 'import Menu; import netmiko', 'netmiko')]
+    startup_ms = None
+    for title, statement, root in phases:
+        try:
+            rows = import_times(statement)
+        except (OSError, RuntimeError) as e:
+            print(f"Could not profile '{statement}': {e}")
+            continue
+        index = next((i for i, row in enumerate(rows) if row['module'] == root and row['depth'] == 0), None)
+        if index is None:
+            print(f"{title}: '{root}' was already imported.")
+            continue
+        # the modules imported on behalf of the root are the nested rows just before it
+        subtree = []
+        for row in reversed(rows[:index]):
+            if row['depth'] == 0:
+                break
+            subtree.append(row)
+        slowest = sorted(subtree, key=lambda row: row['cumulative'], reverse=True)[:top]
+
+        total = rows[index]['cumulative']
+        if root == 'Menu':
+            startup_ms = total
+        print(f"\n--- {title} ('{statement}'): {total:.1f} ms ---")
+        print(format_table([dict(row, self=f"{row['self']:.1f}", cumulative=f"{row['cumulative']:.1f}")
+                            for row in slowest], columns))
+
+    if budget_ms is not None and startup_ms is not None:
+        within = startup_ms <= budget_ms
+        print(f"\nStartup imports: {startup_ms:.1f} ms, budget {budget_ms:.1f} ms: {'OK' if within else 'OVER BUDGET'}")
+        return within
+    return True
+
+
+def show_metrics():
+    # per-device timing of each phase (TCP connect, SSH auth, enable, prompt detection, commands)
+    rows = [row for row in registry.summary() if row['metric'] == 'netauto_phase_seconds']
+    print("\n----------- Performance Metrics (seconds) -----------")
+    if rows:
+        for row in rows:
+            for key in ('avg', 'p50', 'p95', 'max'):
+                row[key] = f"{row[key]:.3f}"
+        print(format_table(rows, [('device', 'Device'), ('phase', 'Phase'), ('count', 'Count'), ('avg', 'Avg'),
+                                  ('p50', 'p50'), ('p95', 'p95'), ('max', 'Max')]))
+        for counter in registry.counters():
+            if counter['metric'] == 'netauto_errors_total':
+                print(f"Errors on {counter['device']} during {counter['phase']}: {counter['value']}")
+            elif counter['metric'] == 'netauto_bytes_total':
+                print(f"Bytes {counter['direction']} for {counter['device']}: {counter['value']}")
+    else:
+        print("No device operations recorded yet.")
+    for counter in registry.counters():
+        if counter['metric'] == 'netauto_inventory_changes_total':
+            print(f"Devices {counter['change']} by reloading devices.json: {counter['value']}")
+        elif counter['metric'] == 'netauto_session_records_dropped_total':
+            print(f"Session log records of {counter['device']} dropped (writer behind): {counter['value']}")
+    health = Device.pool.health
+    for host, remaining in sorted(health.unhealthy().items() if health else []):
+        status = f"skipped for another {remaining:.0f}s" if remaining else "will be retried on next use"
+        print(f"Unreachable device {host}: {status}")
+    print("------------------------------------------------------\n")
+    input("Press Enter to return to the Main Menu...")
+
+
+def manage_device_menu(devices_data: Inventory):
+
+    print("\n--- Manage Device ---")
+
+    while True:
+        selected_ip = input("Enter the IP address of the device to manage (or type 'back' to return): ").strip()
+
+        if selected_ip.lower() == 'back':
+            return
+
+            # if ip is validated by the method from file Device, then the loop for inputing an ip address is ended.
+        if Device.check_ipv4(selected_ip):
+            break
+        else:
+            print(f"'{selected_ip}' is not a valid IPv4 address. Please try again.")
+
+
+    target_device_info = devices_data.by_ip(selected_ip)
+
+    if not target_device_info:
+        print(f"Device with IP address '{selected_ip}' not found in the configuration.")
+        input("\nPress Enter to continue...")
+        return
+
+    print(f"\nSelected device: {target_device_info.get('hostname', 'N/A')} ({target_device_info.get('ip_address', 'N/A')})")
+
+    try:
+        instance = build_device(target_device_info)
+    except KeyError as e:
+        print(f"Error: Device data for {selected_ip} is missing a required field: {e}")
+        input("\nPress Enter to continue...")
+        return
+    except ValueError as e:
+        print(e)
+        input("\nPress Enter to continue...")
+        return
+
+    if isinstance(instance, Router):
+        router_configuration_menu(instance)
+    else:
+        switch_configuration_menu(instance)
+
+
+def fleet_command_menu(devices_data: Inventory):
+    # runs one show command on every device (or every device of a type) at the same time
+    print("\n--- Run a Command on All Devices ---")
+    command = input("Enter the command to run (e.g., show ip interface brief): ").strip()
+    if not command:
+        print("No command entered. Aborting.")
+        input("\nPress Enter to continue...")
+        return
+
+    type_filter = input("Run on which device type? (router/switch, press Enter for all): ").strip().lower()
+    timeout_str = input("Per-device timeout in seconds (default 60): ").strip()
+    timeout = int(timeout_str) if timeout_str.isdigit() and int(timeout_str) > 0 else 60
+    log_dir = input("Write each device's output to a log file in which directory? "
+                    "(press Enter to print it here): ").strip()
+
+    targets = []
+    for device_info in devices_data.filter(type=type_filter):
+        try:
+            targets.append(build_device(device_info))
+        except (KeyError, ValueError) as e:
+            print(f"Skipping '{device_info.get('hostname', 'N/A')}': {e}")
+
+    if not targets:
+        print("No matching devices.")
+    else:
+        executor = FleetExecutor(timeout=timeout)
+        if log_dir:
+            # the output goes straight to <log_dir>/<hostname>.log while it arrives, nothing is kept in memory
+            executor.run_and_report(targets, stream_to_log(command, log_dir, read_timeout=timeout))
+        else:
+            executor.run_and_report(targets, lambda device: device.run_command(command, read_timeout=timeout))
+    input("\nPress Enter to return to the Main Menu...")
+
+
+def backup_menu(devices_data: Inventory):
+    # saves the running-config of every device into the local archive (unchanged configs are not stored again)
+    print("\n--- Back Up Device Configurations ---")
+    archive_dir = input("Archive directory (default: backups): ").strip() or 'backups'
+
+    targets = []
+    for device_info in devices_data:
+        try:
+            targets.append(build_device(device_info))
+        except (KeyError, ValueError) as e:
+            print(f"Skipping '{device_info.get('hostname', 'N/A')}': {e}")
+
+    if not targets:
+        print("No devices to back up.")
+    else:
+        from Backup import ConfigArchive, backup_fleet
+
+        try:
+            backup_fleet(targets, ConfigArchive(archive_dir))
+        except OSError as e:
+            print(f"Error: could not use the archive directory '{archive_dir}': {e}")
+    input("\nPress Enter to return to the Main Menu...")
+
+
+def router_configuration_menu(router_instance: Router):
+    # method for config settings on a Router
+    menu_title = f"--- Router Configuration: {router_instance.hostname} ---"
+    menu_items = [
+        "Configure HSRP",
+        "DHCP Configuration",
+        "Set up RIPv2",
+        "Ping another device",
+        "Ping sweep (subnet or list of IPs)",
+        "Run a command (live output)",
+        "Show IP Interface Brief",
+        "Show recent session output",
+        "Refresh cached show output",
+        "Change configuration push mode",
+        "Return to Main Menu"
+    ]
+    config_menu = terminal_menu(menu_items, title=menu_title, clear_screen=True)
+
+    while True:
+        menu_entry_index = config_menu.show()
+        if menu_entry_index is None or menu_items[menu_entry_index] == "Return to Main Menu":
+            break
+
+        selected_action = menu_items[menu_entry_index]
+        action_taken = False
+
+        if selected_action == "Configure HSRP":
+            router_instance.config_hsrp()
+            action_taken = True
+
+        elif selected_action == "DHCP Configuration":
+            # submenu for DHCP configuration options
+            dhcp_menu_title = f"--- DHCP Configuration: {router_instance.hostname} ---"
+            dhcp_menu_items = ["Configure a DHCP Server",
+                               "Add Helper Address",
+                               "Enable DHCP Client on interface",
+                               "Return to previous menu"]
+            dhcp_menu = terminal_menu(dhcp_menu_items, title=dhcp_menu_title, clear_screen=True)
+
+            while True:
+                dhcp_menu_entry_index = dhcp_menu.show()
+                if dhcp_menu_entry_index is None or dhcp_menu_items[dhcp_menu_entry_index] == "Return to previous menu":
+                    break
+
+                dhcp_choice = dhcp_menu_items[dhcp_menu_entry_index]
+                if dhcp_choice == "Configure a DHCP Server":
+                    router_instance.setup_dhcp()
+                    action_taken = True
+                    break  # Exit sub-menu after action
+                elif dhcp_choice == "Add Helper Address":
+                    router_instance.config_dhcp_helper()
+                    action_taken = True
+                    break  # Exit sub-menu after action
+                elif dhcp_choice == "Enable DHCP Client on interface":
+                    router_instance.get_dhcp()
+                    action_taken = True
+                    break
+
+        elif selected_action == "Set up RIPv2":
+            router_instance.config_ripv2()
+            action_taken = True
+        elif selected_action == "Ping another device":
+            router_instance.ping()
+            action_taken = True
+        elif selected_action == "Ping sweep (subnet or list of IPs)":
+            router_instance.ping_sweep()
+            action_taken = True
+        elif selected_action == "Run a command (live output)":
+            router_instance.run_command_live()
+            action_taken = True
+        elif selected_action == "Show IP Interface Brief":
+            router_instance.show_ip_interface_brief()
+            action_taken = True
+        elif selected_action == "Show recent session output":
+            router_instance.show_session_output()
+            action_taken = True
+        elif selected_action == "Change configuration push mode":
+            push_mode_menu(router_instance)
+        elif selected_action == "Refresh cached show output":
+            # the next show command is fetched from the device again
+            router_instance.clear_cached_output()
+            print(f"Cached show output for {router_instance.hostname} cleared.")
+            action_taken = True
+
+        if action_taken:
+            input("\nOperation complete. Press Enter to continue...")
+
+
+def switch_configuration_menu(switch_instance: Switch):
+    # menu for Switch configuration
+    menu_title = f"--- Switch Configuration: {switch_instance.hostname} ---"
+    menu_items = [
+        "Configure a VLAN",
+        "Configure a range of VLANs",
+        "Configure Port Security",
+        "Configure Port Security on an interface range",
+        "Configure STP (Spanning Tree)",
+        "Ping another device",
+        "Ping sweep (subnet or list of IPs)",
+        "Run a command (live output)",
+        "Show IP Interface Brief",
+        "Show VLAN Information",
+        "Show recent session output",
+        "Refresh cached show output",
+        "Change configuration push mode",
+        "Return to Main Menu"
+    ]
+    config_menu = terminal_menu(menu_items, title=menu_title, clear_screen=True)
+
+    while True:
+        menu_entry_index = config_menu.show()
+        if menu_entry_index is None or menu_items[menu_entry_index] == "Return to Main Menu":
+            break
+
+        selected_action = menu_items[menu_entry_index]
+        action_taken = False
+
+        if selected_action == "Configure a VLAN":
+            switch_instance.config_vlan()
+            action_taken = True
+        elif selected_action == "Configure a range of VLANs":
+            switch_instance.config_vlan_range()
+            action_taken = True
+        elif selected_action == "Configure Port Security":
+            switch_instance.config_security()
+            action_taken = True
+        elif selected_action == "Configure Port Security on an interface range":
+            switch_instance.config_security_range()
+            action_taken = True
+        elif selected_action == "Configure STP (Spanning Tree)":
+            switch_instance.config_stp()
+            action_taken = True
+        elif selected_action == "Ping another device":
+            switch_instance.ping()
+            action_taken = True
+        elif selected_action == "Ping sweep (subnet or list of IPs)":
+            switch_instance.ping_sweep()
+            action_taken = True
+        elif selected_action == "Run a command (live output)":
+            switch_instance.run_command_live()
+            action_taken = True
+        elif selected_action == "Show IP Interface Brief":
+            switch_instance.show_ip_interface_brief()
+            action_taken = True
+        elif selected_action == "Show VLAN Information":
+            switch_instance.show_vlan_brief()
+            action_taken = True
+        elif selected_action == "Show recent session output":
+            switch_instance.show_session_output()
+            action_taken = True
+        elif selected_action == "Change configuration push mode":
+            push_mode_menu(switch_instance)
+        elif selected_action == "Refresh cached show output":
+            # the next show command is fetched from the device again
+            switch_instance.clear_cached_output()
+            print(f"Cached show output for {switch_instance.hostname} cleared.")
+            action_taken = True
+
+        if action_taken:
+            input("\nOperation complete. Press Enter to continue...")
+
+
+def push_mode_menu(instance: Device):
+    # chooses how the configuration methods push their commands to the device
+    mode_items = [
+        "Send all commands (default)",
+        "Send only commands missing from the running-config",
+        "Dry run: only print the diff against the running-config",
+    ]
+    mode_menu = terminal_menu(mode_items, title=f"--- Push mode for {instance.hostname} "
+                                                f"(current: {instance.push_mode}) ---", clear_screen=True)
+    mode_index = mode_menu.show()
+    if mode_index is not None:
+        instance.push_mode = PUSH_MODES[mode_index]
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
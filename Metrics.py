@@ -0,0 +1,199 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# upper bounds (seconds) of the latency histogram buckets, as in Prometheus histograms
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# number of recent samples kept per histogram for the percentile summaries
+RESERVOIR_SIZE = 1024
+
+
+class Histogram:
+    def __init__(self):
+        self.bucket_counts = [0] * (len(BUCKETS) + 1)  # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.recent = deque(maxlen=RESERVOIR_SIZE)
+
+    def observe(self, value) -> None:
+        index = next((i for i, bound in enumerate(BUCKETS) if value <= bound), len(BUCKETS))
+        self.bucket_counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.recent.append(value)
+
+    def percentile(self, fraction):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'avg': round(self.sum / self.count, 6) if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+        }
+
+
+class MetricsRegistry:
+    # In-process store of per-device, per-phase latency histograms and counters
+    # (bytes transferred, errors), exportable as Prometheus text or JSON.
+    def __init__(self):
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._counters = {}  # (name, labels) -> value
+        self._lock = threading.Lock()
+        self._export_thread = None
+
+    def observe(self, name, value, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, phase, device):
+        # records how long the block took as a 'phase' of work on 'device'; failures are also counted
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.increment('netauto_errors_total', device=device, phase=phase)
+            raise
+        finally:
+            self.observe('netauto_phase_seconds', time.perf_counter() - start, device=device, phase=phase)
+
+    def summary(self) -> list:
+        # one row per histogram: its labels plus count/avg/min/max/p50/p95
+        with self._lock:
+            rows = []
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                row = dict(labels, metric=name)
+                row.update(histogram.summary())
+                rows.append(row)
+            return rows
+
+    def counters(self) -> list:
+        with self._lock:
+            return [dict(labels, metric=name, value=value) for (name, labels), value in sorted(self._counters.items())]
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self._histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + ('+Inf',), histogram.bucket_counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+            for name in sorted({name for name, _ in self._counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def to_json(self) -> str:
+        return json.dumps({'timestamp': time.time(), 'histograms': self.summary(), 'counters': self.counters()},
+                          indent=2)
+
+    def export(self, path) -> None:
+        # writes the metrics to a file (JSON for *.json, Prometheus text otherwise), replacing it atomically
+        content = self.to_json() if path.endswith('.json') else self.to_prometheus()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as file:
+            file.write(content)
+        os.replace(temp_path, path)
+
+    def start_export(self, path, interval=15) -> None:
+        # keeps the export file up to date in the background and writes it a last time at exit
+        if self._export_thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self._safe_export(path)
+
+        self._export_thread = threading.Thread(target=loop, name='metrics-export', daemon=True)
+        self._export_thread.start()
+        atexit.register(self._safe_export, path)
+
+    def _safe_export(self, path) -> None:
+        try:
+            self.export(path)
+        except OSError as e:
+            print(f"Warning: could not write metrics to '{path}': {e}", file=sys.stderr)
+
+
+class MeteredConnection:
+    # Wraps a Netmiko connection so every command and config set is timed and its bytes counted,
+    # and, with a session recorder, what was sent and received is added to the device's transcript.
+    def __init__(self, connection, device, registry, recorder=None):
+        self._connection = connection
+        self._device = device
+        self._registry = registry
+        self._recorder = recorder
+
+    def send_command(self, command_string, *args, **kwargs):
+        with self._registry.timer('command', self._device):
+            output = self._connection.send_command(command_string, *args, **kwargs)
+        self._count_bytes(command_string, output)
+        return output
+
+    def send_config_set(self, config_commands=None, *args, **kwargs):
+        with self._registry.timer('config', self._device):
+            output = self._connection.send_config_set(config_commands, *args, **kwargs)
+        self._count_bytes('\n'.join(config_commands or []), output)
+        return output
+
+    def _count_bytes(self, sent, received) -> None:
+        self._registry.increment('netauto_bytes_total', len(sent.encode()) + 1, device=self._device, direction='sent')
+        if isinstance(received, str):
+            self._registry.increment('netauto_bytes_total', len(received.encode()), device=self._device,
+                                     direction='received')
+        if self._recorder is not None:
+            self._recorder.record(self._device, 'sent', sent)
+            if isinstance(received, str):
+                self._recorder.record(self._device, 'received', received)
+
+    def __getattr__(self, name):
+        # everything else (is_alive, disconnect, read_channel, ...) goes straight to the connection
+        return getattr(self._connection, name)
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+# registry shared by the whole application
+registry = MetricsRegistry()
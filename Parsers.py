@@ -0,0 +1,130 @@
+import re
+
+# "Success rate is 80 percent (4/5), round-trip min/avg/max = 1/2/4 ms"
+PING_SUCCESS = re.compile(r'Success rate is (\d+) percent \((\d+)/(\d+)\)')
+PING_RTT = re.compile(r'min/avg/max = (\d+)/(\d+)/(\d+)')
+
+# "1    default                          active    Gi0/0, Gi0/1"
+VLAN_LINE = re.compile(r'^(\d+)\s+(\S+)\s+(\S+)\s*(.*)$')
+
+# 'show cdp neighbors detail' (IOS and NX-OS)
+CDP_DEVICE_ID = re.compile(r'^Device ID:\s*(\S+)', re.MULTILINE)
+CDP_ADDRESS = re.compile(r'(?:IP address|IPv4 Address):\s*(\d+\.\d+\.\d+\.\d+)')
+CDP_PLATFORM = re.compile(r'^Platform:\s*([^,]+?)\s*,\s*Capabilities:\s*(.*?)\s*$', re.MULTILINE)
+CDP_INTERFACES = re.compile(r'^Interface:\s*([^,]+?)\s*,\s*Port ID \(outgoing port\):\s*(\S+)', re.MULTILINE)
+
+# 'show lldp neighbors detail': IOS starts each entry with 'Local Intf', NX-OS with 'Chassis id'
+LLDP_LOCAL = re.compile(r'^(?:Local Intf|Local Port id):\s*(\S+)', re.MULTILINE)
+LLDP_PORT = re.compile(r'^Port id:\s*(\S+)', re.MULTILINE)
+LLDP_NAME = re.compile(r'^System Name:\s*(\S+)', re.MULTILINE)
+LLDP_ADDRESS = re.compile(r'^\s*(?:IP|Management Address):\s*(\d+\.\d+\.\d+\.\d+)', re.MULTILINE)
+LLDP_CAPABILITIES = re.compile(r'^Enabled Capabilities:\s*(.*?)\s*$', re.MULTILINE)
+
+
+def parse_ip_interface_brief(output: str) -> list:
+    # turns 'show ip interface brief' output into one dict per interface
+    interfaces = []
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 6 or parts[0] == 'Interface':
+            continue
+        interfaces.append({
+            'interface': parts[0],
+            'ip_address': parts[1],
+            'ok': parts[2],
+            'method': parts[3],
+            # the status can be two words ("administratively down")
+            'status': ' '.join(parts[4:-1]),
+            'protocol': parts[-1],
+        })
+    return interfaces
+
+
+def parse_vlan_brief(output: str) -> list:
+    # turns 'show vlan brief' output into one dict per VLAN with its list of ports
+    vlans = []
+    for line in output.splitlines():
+        match = VLAN_LINE.match(line)
+        if match:
+            vlan_id, name, status, ports = match.groups()
+            vlans.append({
+                'vlan_id': int(vlan_id),
+                'name': name,
+                'status': status,
+                'ports': split_ports(ports),
+            })
+        elif vlans and line[:1].isspace() and line.strip():
+            # long port lists continue on the following lines
+            vlans[-1]['ports'].extend(split_ports(line))
+    return vlans
+
+
+def parse_ping(output: str) -> dict:
+    # extracts the success rate and round-trip times (ms) from IOS ping output; missing values are None
+    result = {'success_rate': None, 'received': None, 'sent': None, 'rtt_min': None, 'rtt_avg': None, 'rtt_max': None}
+    success = PING_SUCCESS.search(output)
+    if success:
+        result['success_rate'], result['received'], result['sent'] = (int(v) for v in success.groups())
+    rtt = PING_RTT.search(output)
+    if rtt:
+        result['rtt_min'], result['rtt_avg'], result['rtt_max'] = (int(v) for v in rtt.groups())
+    return result
+
+
+def parse_cdp_neighbors_detail(output: str) -> list:
+    # one dict per CDP neighbor; 'neighbor' is the Device ID as sent (it may carry a domain or serial number)
+    neighbors = []
+    for entry in re.split(r'^(?=Device ID:)', output, flags=re.MULTILINE):
+        device_id = CDP_DEVICE_ID.search(entry)
+        interfaces = CDP_INTERFACES.search(entry)
+        if not device_id or not interfaces:
+            continue
+        address = CDP_ADDRESS.search(entry)
+        platform = CDP_PLATFORM.search(entry)
+        neighbors.append({
+            'neighbor': device_id.group(1),
+            'ip_address': address.group(1) if address else None,
+            'platform': platform.group(1) if platform else '',
+            'capabilities': platform.group(2).split() if platform else [],
+            'interface': interfaces.group(1),
+            'neighbor_interface': interfaces.group(2),
+        })
+    return neighbors
+
+
+def parse_lldp_neighbors_detail(output: str) -> list:
+    # one dict per LLDP neighbor, with the same keys as parse_cdp_neighbors_detail; the capabilities are
+    # the LLDP codes (B bridge, R router, T telephone, ...)
+    start = r'^(?=Local Intf:)' if 'Local Intf:' in output else r'^(?=Chassis id:)'
+    neighbors = []
+    for entry in re.split(start, output, flags=re.MULTILINE):
+        local = LLDP_LOCAL.search(entry)
+        port = LLDP_PORT.search(entry)
+        name = LLDP_NAME.search(entry)
+        if not local or not port or not name:
+            continue
+        address = LLDP_ADDRESS.search(entry)
+        capabilities = LLDP_CAPABILITIES.search(entry)
+        neighbors.append({
+            'neighbor': name.group(1),
+            'ip_address': address.group(1) if address else None,
+            'platform': '',
+            'capabilities': [code.strip() for code in capabilities.group(1).split(',') if code.strip()]
+            if capabilities else [],
+            'interface': local.group(1),
+            'neighbor_interface': port.group(1),
+        })
+    return neighbors
+
+
+def split_ports(text: str) -> list:
+    return [port.strip() for port in text.split(',') if port.strip()]
+
+
+def format_table(rows, columns) -> str:
+    # renders dicts as an aligned text table; columns is a list of (key, heading)
+    cells = [[heading for _, heading in columns]]
+    for row in rows:
+        cells.append([', '.join(row[key]) if isinstance(row[key], list) else str(row[key]) for key, _ in columns])
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(line, widths)).rstrip() for line in cells)
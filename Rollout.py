@@ -0,0 +1,211 @@
+import argparse
+import re
+import threading
+import time
+
+from Fleet import FleetExecutor, build_device, print_summary
+from Inventory import Inventory
+from JobRunner import JobRunner, load_job_file
+from RunningConfig import ConfigTree
+from Verification import failed_checks, run_checks
+
+# lines in the output of a config set that mean the device rejected a command
+CONFIG_ERROR = re.compile(r'^% (Invalid input|Incomplete command|Ambiguous command)', re.MULTILINE)
+
+
+class Rollout:
+    # Pushes a job file's changes in stages: a canary group first, then the remaining devices in
+    # concurrent waves. Every device is verified after its change; when a wave fails, every device
+    # changed so far is rolled back to the configuration it had before the rollout.
+    def __init__(self, devices_data: Inventory, canary=1, wave_size=10, max_workers=32, timeout=180, checks=None,
+                 rollback=True):
+        if canary < 0 or wave_size < 1:
+            raise ValueError("The canary size cannot be negative and waves need at least one device.")
+        self.devices_data = devices_data
+        self.canary = canary
+        self.wave_size = wave_size
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # show commands run on every changed device, besides the checks of its operations (see Verification):
+        # {'command': ..., 'expect': regex, 'reject': regex}
+        self.checks = checks or []
+        self._operation_checks = {}  # hostname -> checks of the operations in the job file
+        self.rollback = rollback
+        self._before = {}  # hostname -> ConfigTree of the device before its change
+        self._lock = threading.Lock()
+
+    def waves(self, job_data) -> list:
+        # groups the devices of the plan into waves of hostnames. Devices named together in one job or in jobs
+        # with the same 'group' (e.g. the two routers of an HSRP pair, or the STP primary and secondary root)
+        # are never split.
+        plan = JobRunner(self.devices_data).plan(job_data)
+        units = self._units(job_data, plan)
+
+        waves = []
+        canary_units, rest = units[:self.canary], units[self.canary:]
+        if canary_units:
+            waves.append([hostname for unit in canary_units for hostname in unit])
+        wave = []
+        for unit in rest:
+            if wave and len(wave) + len(unit) > self.wave_size:
+                waves.append(wave)
+                wave = []
+            wave.extend(unit)
+        if wave:
+            waves.append(wave)
+        return waves
+
+    def run(self, job_data, dry_run=False) -> list:
+        runner = JobRunner(self.devices_data)
+        plan = runner.plan(job_data)
+        self._operation_checks = runner.checks
+        if not plan:
+            print("The job file does not contain any operations.")
+            return []
+        waves = self.waves(job_data)
+
+        if dry_run:
+            for number, wave in enumerate(waves, start=1):
+                label = "canary" if number == 1 and self.canary else f"wave {number}"
+                print(f"\n=== {label}: {len(wave)} device(s) ===")
+                for hostname in wave:
+                    device_info, commands = plan[hostname]
+                    print(f"--- {hostname} ({device_info['ip_address']}): {len(commands)} command(s) ---")
+                    print("\n".join(commands))
+            return []
+
+        devices = {hostname: build_device(device_info) for hostname, (device_info, _) in plan.items()}
+        executor = FleetExecutor(max_workers=self.max_workers, timeout=self.timeout)
+        results = []
+        start = time.monotonic()
+
+        for number, wave in enumerate(waves, start=1):
+            label = "Canary" if number == 1 and self.canary else f"Wave {number}/{len(waves)}"
+            print(f"\n=== {label}: {', '.join(wave)} ===")
+            wave_results = executor.run_and_report([devices[h] for h in wave],
+                                                   lambda device: self._apply(device, plan[device.hostname][1]),
+                                                   show_output=False)
+            results.extend(wave_results)
+            failed = [r.hostname for r in wave_results if not r.ok]
+            if failed:
+                print(f"{label} failed on {', '.join(failed)}. The remaining waves are not started.")
+                if self.rollback:
+                    self._rollback_all(devices, plan, executor)
+                break
+        else:
+            print(f"\nRollout finished: {len(results)} device(s) changed in {len(waves)} wave(s).")
+
+        print_summary(results, time.monotonic() - start)
+        return results
+
+    def _apply(self, device, commands) -> str:
+        # changes one device and verifies it; the previous configuration is kept for a rollback
+        before = ConfigTree.parse(device.run_command('show running-config', read_timeout=60))
+        with self._lock:
+            self._before[device.hostname] = before
+        output = device.push_config(commands, mode='full')
+        error = CONFIG_ERROR.search(output or '')
+        if error:
+            raise RuntimeError(f"the device rejected a command ({error.group(0)})")
+
+        # the show commands of all checks go to the device in one batch; HSRP and DHCP are polled until they settle
+        failed = failed_checks(run_checks(device, self._operation_checks.get(device.hostname, []) + self.checks))
+        if failed:
+            raise RuntimeError(f"verification failed: {failed}")
+        return output
+
+    def _rollback_all(self, devices, plan, executor) -> None:
+        # restores every device that was (or may have been) changed, in parallel
+        with self._lock:
+            changed = dict(self._before)
+        if not changed:
+            return
+        print(f"\n=== Rolling back {len(changed)} device(s) ===")
+
+        def undo(device):
+            current = ConfigTree.parse(device.run_command('show running-config', read_timeout=60))
+            commands = changed[device.hostname].rollback(current, plan[device.hostname][1])
+            if not commands:
+                return "nothing to undo"
+            device.push_config(commands, mode='full')
+            return f"{len(commands)} command(s) undone"
+
+        rollback_results = executor.run_and_report([devices[h] for h in changed], undo)
+        for result in rollback_results:
+            if not result.ok:
+                print(f"Warning: {result.hostname} could not be rolled back and needs manual attention.")
+
+    def _units(self, job_data, plan) -> list:
+        # devices named together in a job form one unit, and so do the devices of all jobs with the same
+        # 'group' key (e.g. the two routers of an HSRP pair, each with its own job); units sharing a device
+        # are merged (union-find)
+        parent = {hostname: hostname for hostname in plan}
+        groups = {}  # group name -> a hostname of the group
+
+        def root(hostname):
+            while parent[hostname] != hostname:
+                parent[hostname] = parent[parent[hostname]]
+                hostname = parent[hostname]
+            return hostname
+
+        for job in job_data.get('jobs', []):
+            selection = job.get('devices', 'all')
+            group = job.get('group')
+            if selection == 'all':
+                if group is None:
+                    continue
+                selection = [d['hostname'] for d in self.devices_data.filter(type=job.get('type', '').lower())]
+            elif isinstance(selection, str):
+                selection = [selection]
+            hostnames = []
+            for name in selection:
+                device_info = self.devices_data.find(str(name))
+                if device_info is not None and device_info['hostname'] in parent:
+                    hostnames.append(device_info['hostname'])
+            if group is not None and hostnames:
+                hostnames.append(groups.setdefault(str(group), hostnames[0]))
+            for hostname in hostnames[1:]:
+                parent[root(hostname)] = root(hostnames[0])
+
+        units = {}
+        for hostname in plan:  # keeps the order of the plan
+            units.setdefault(root(hostname), []).append(hostname)
+        return list(units.values())
+
+
+def main():
+    from Menu import load_devices_from_json
+
+    parser = argparse.ArgumentParser(description="Roll out a YAML/JSON job file in verified waves, "
+                                                 "rolling back automatically on failure.")
+    parser.add_argument('job_file')
+    parser.add_argument('--devices', default='devices.json', help="device data file (default: devices.json)")
+    parser.add_argument('--canary', type=int, help="device groups changed first, on their own (default: 1)")
+    parser.add_argument('--wave-size', type=int, help="devices per wave after the canary (default: 10)")
+    parser.add_argument('--parallel', type=int, default=32, help="devices changed at the same time within a wave")
+    parser.add_argument('--timeout', type=int, default=180, help="per-device timeout in seconds")
+    parser.add_argument('--no-rollback', action='store_true', help="stop on failure without rolling back")
+    parser.add_argument('--dry-run', action='store_true', help="print the waves and commands without connecting")
+    args = parser.parse_args()
+
+    devices_data = load_devices_from_json(args.devices)
+    try:
+        job_data = load_job_file(args.job_file)
+        # the job file's 'rollout' section sets the defaults; command-line options override them
+        settings = job_data.get('rollout', {}) or {}
+        rollout = Rollout(devices_data,
+                          canary=args.canary if args.canary is not None else int(settings.get('canary', 1)),
+                          wave_size=args.wave_size or int(settings.get('wave_size', 10)),
+                          max_workers=args.parallel, timeout=args.timeout, checks=settings.get('verify', []),
+                          rollback=not args.no_rollback and settings.get('rollback', True))
+        results = rollout.run(job_data, dry_run=args.dry_run)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        raise SystemExit(2)
+
+    if any(not result.ok for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,196 +1,240 @@
-from Device import Device
-
-
-class Router(Device):
-    def config_ripv2(self):
-        # RIPv2 common config
-        commands = [
-            'router rip',
-            'version 2',
-            'no auto-summary'
-        ]
-
-        network_commands = []
-        # loop for reading network addresses for being able to advertise as many as needed
-        while True:
-            network_ip = input("Enter a network to advertise (or press Enter to finish): ").strip()
-            if not network_ip:
-                if not network_commands:
-                    print("No networks were entered. Aborting RIP configuration.")
-                    return
-                print("Finished adding networks.")
-                break
-            network_commands.append(f'network {network_ip}')
-
-        # extend the commands list with the elements from the list containing the "network <ip>" commands
-        commands.extend(network_commands)
-
-        # ask if the user wants the router to share its static routes through ripv2
-        redistribute_choice = input("Do you want to redistribute static routes? (yes/no): ").lower().strip()
-        if redistribute_choice == "yes":
-            commands.append('redistribute static')
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print("\nSending RIPv2 configuration commands...")
-                output = net_connect.send_config_set(commands)
-                print("--- Command Output ---")
-                print(output)
-                print("--- End of Output ---")
-                print(f"RIPv2 configuration attempted on {self.hostname}.")
-
-    def setup_dhcp(self):
-        # configure DHCP server
-        dhcp_pool_name = input("Enter the DHCP pool name (eg. LAN_POOL): ")
-        network_address = input("Enter the network address (eg. 192.168.10.0): ")
-        netmask = input("Enter the subnet mask (eg. 255.255.255.0): ")
-
-        while True:
-            default_router_ip = input("Enter the default router IP: ").strip()
-            if Device.check_ipv4(default_router_ip):
-                break
-            else:
-                print(f"'{default_router_ip}' is not a valid IPv4 address. Please try again.")
-
-
-        while True:
-            dns_server_ip = input("Enter the DNS server IP (default: 8.8.8.8): ").strip() or "8.8.8.8"
-            if Device.check_ipv4(dns_server_ip):
-                break
-            else:
-                print(f"'{dns_server_ip}' is not a valid IPv4 address. Please try again.")
-
-
-        excluded_start = input("Enter the first IP to exclude (or press Enter to skip): ")
-        excluded_end = input("Enter the last IP to exclude (or press Enter to skip): ")
-
-        commands = [
-            f"ip dhcp pool {dhcp_pool_name}",
-            f"network {network_address} {netmask}",
-            f"default-router {default_router_ip}",
-            f"dns-server {dns_server_ip}"
-        ]
-        if excluded_start and excluded_end:
-            commands.append("exit")
-            # optional excluded-address command: appended only if the user inputs a start and an end to the excl list
-            commands.append(f"ip dhcp excluded-address {excluded_start} {excluded_end}")
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print("\nSending DHCP configuration commands...")
-                output = net_connect.send_config_set(commands)
-                print("--- Command Output ---")
-                print(output)
-                print("--- End of Output ---")
-                print(f"DHCP server configuration attempted on {self.hostname}.")
-
-    def config_dhcp_helper(self):
-        # DHCP helper address for making a router be a relay agent
-        interface = input("Enter the interface to configure the helper address on (eg. g0/1): ")
-
-        while True:
-            helper_address = input("Enter the IP address of the DHCP server (the helper address): ").strip()
-            if Device.check_ipv4(helper_address):
-                break
-            else:
-                print(f"'{helper_address}' is not a valid IPv4 address. Please try again.")
-
-
-        if not interface or not helper_address:
-            print("Interface and helper address cannot be empty. Aborting.")
-            return
-
-        commands = [
-            f"interface {interface}",
-            f"ip helper-address {helper_address}"
-        ]
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print(f"\nSending DHCP helper-address configuration to {interface}...")
-                output = net_connect.send_config_set(commands)
-                print("--- Command Output ---")
-                print(output)
-                print("--- End of Output ---")
-                print(f"DHCP helper address configuration attempted on {self.hostname}.")
-
-    def get_dhcp(self):
-        # allow the device to lease an IP address from the DHCP server
-        interface = input("Enter the interface which will get its address through DHCP: ")
-
-        if not interface:
-            print("Interface not provided. Aborting.")
-            return
-
-        commands = [
-            f"interface {interface}",
-            "ip address dhcp",
-            "no shutdown"
-        ]
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print(f"\bSending DHCP enabling configuration to {interface}...")
-                output = net_connect.send_config_set(commands)
-                print("--- Command Output ---")
-                print(output)
-                print("--- End of Output ---")
-                print(f"DHCP client configuration attempted on {self.hostname}.")
-                print(f"\n Note: It may take a minute for the interface to receive an IP address.")
-
-    def config_hsrp(self):
-        # configuring HSRP on an interface
-
-        interface = input("Enter the interface for HSRP (e.g., GigabitEthernet0/0 or g0/0.10): ")
-        is_subinterface = '.' in interface # if the interface's name contains a '.' it means it is a subinterface
-
-        vlan_id_for_encap = ""
-        if is_subinterface == 'yes':
-            vlan_id_for_encap = input("Enter the VLAN ID for encapsulation (e.g., 10): ")
-
-        while True:
-            real_ip = input(f"Enter the REAL IP address for the interface '{interface}': ").strip()
-            if Device.check_ipv4(real_ip):
-                break
-            else:
-                print(f"'{real_ip}' is not a valid IPv4 address. Please try again.")
-
-        subnet_mask = input(f"Enter the subnet mask for '{real_ip}': ")
-
-        standby_group_id = input("Enter the HSRP standby group ID: ")
-
-        while True:
-            virtual_ip = input("Enter the HSRP virtual IP address: ").strip()
-            if Device.check_ipv4(virtual_ip):
-                break
-            else:
-                print(f"'{virtual_ip}' is not a valid IPv4 address. Please try again.")
-
-        priority = input("Enter HSRP priority (default 100): ") or "100"
-        preempt = input("Enable HSRP preemption? (yes/no, default yes): ").lower().strip() != 'no'
-
-        commands = [
-            f'interface {interface}',
-        ]
-        if is_subinterface == 'yes' and vlan_id_for_encap.isdigit():
-            commands.append(f'encapsulation dot1q {vlan_id_for_encap}')
-
-        commands.append(f'ip address {real_ip} {subnet_mask}')
-        # HSRP group commands
-        commands.extend([
-            'standby version 2',
-            f'standby {standby_group_id} ip {virtual_ip}',
-            f'standby {standby_group_id} priority {priority}'
-        ])
-
-        if preempt:
-            commands.append(f'standby {standby_group_id} preempt')
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print("\nSending complete HSRP and interface configuration...")
-                output = net_connect.send_config_set(commands)
-                print("--- Command Output ---")
-                print(output)
-                print("--- End of Output ---")
-                print(f"HSRP and interface configuration attempted on {self.hostname}.")
+from Addressing import check_dhcp_pool, check_hsrp, classful_network, dotted_netmask, invalid_addresses, parse_netmask
+from Device import Device
+from Templates import DEFAULT_PLATFORM, template
+from Verification import checks_for
+
+
+class Router(Device):
+    # Each config method can be called with its parameters (for scripts and job files),
+    # or without them, in which case the values are asked for interactively.
+
+    def config_ripv2(self, networks=None, redistribute_static=False):
+        if networks is None:
+            networks = []
+            # loop for reading network addresses for being able to advertise as many as needed
+            while True:
+                network_ip = input("Enter a network to advertise (or press Enter to finish): ").strip()
+                if not network_ip:
+                    if not networks:
+                        print("No networks were entered. Aborting RIP configuration.")
+                        return
+                    print("Finished adding networks.")
+                    break
+                networks.append(network_ip)
+
+            # ask if the user wants the router to share its static routes through ripv2
+            redistribute_choice = input("Do you want to redistribute static routes? (yes/no): ").lower().strip()
+            redistribute_static = redistribute_choice == "yes"
+
+        try:
+            commands = Router.ripv2_commands(networks, redistribute_static, platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting RIP configuration.")
+            return
+
+        self._send_config(commands, "Sending RIPv2 configuration commands...",
+                          f"RIPv2 configuration attempted on {self.hostname}.",
+                          checks_for('ripv2', self.platform, networks=networks))
+
+    @staticmethod
+    def ripv2_commands(networks, redistribute_static=False, platform=DEFAULT_PLATFORM) -> list:
+        if not networks:
+            raise ValueError("No networks were entered.")
+        invalid = invalid_addresses(networks)
+        if invalid:
+            raise ValueError(f"Invalid RIP network(s): {', '.join(map(str, invalid))}.")
+        # IOS keeps RIP networks classful (10.1.0.0 is stored as 10.0.0.0); networks that fall into
+        # the same classful network are sent once
+        networks = list(dict.fromkeys(classful_network(network) for network in networks))
+        return template('ripv2', platform)(networks=networks, redistribute_static=redistribute_static)
+
+    def setup_dhcp(self, pool_name=None, network_address=None, netmask=None, default_router=None,
+                   dns_server='8.8.8.8', excluded_start=None, excluded_end=None):
+        if pool_name is None:
+            # configure DHCP server
+            pool_name = input("Enter the DHCP pool name (eg. LAN_POOL): ")
+            network_address = input("Enter the network address (eg. 192.168.10.0): ")
+            netmask = input("Enter the subnet mask (eg. 255.255.255.0): ")
+
+            while True:
+                default_router = input("Enter the default router IP: ").strip()
+                if Device.check_ipv4(default_router):
+                    break
+                else:
+                    print(f"'{default_router}' is not a valid IPv4 address. Please try again.")
+
+            while True:
+                dns_server = input("Enter the DNS server IP (default: 8.8.8.8): ").strip() or "8.8.8.8"
+                if Device.check_ipv4(dns_server):
+                    break
+                else:
+                    print(f"'{dns_server}' is not a valid IPv4 address. Please try again.")
+
+            excluded_start = input("Enter the first IP to exclude (or press Enter to skip): ")
+            excluded_end = input("Enter the last IP to exclude (or press Enter to skip): ")
+
+        try:
+            commands = Router.dhcp_server_commands(pool_name, network_address, netmask, default_router,
+                                                   dns_server, excluded_start, excluded_end, platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        self._send_config(commands, "Sending DHCP configuration commands...",
+                          f"DHCP server configuration attempted on {self.hostname}.",
+                          checks_for('dhcp_server', self.platform, pool_name=pool_name, network_address=network_address,
+                                     netmask=netmask, default_router=default_router))
+
+    @staticmethod
+    def dhcp_server_commands(pool_name, network_address, netmask, default_router, dns_server='8.8.8.8',
+                             excluded_start=None, excluded_end=None, platform=DEFAULT_PLATFORM) -> list:
+        if not pool_name:
+            raise ValueError("DHCP pool name cannot be empty.")
+        if not Device.check_ipv4(dns_server):
+            raise ValueError(f"'{dns_server}' is not a valid IPv4 address.")
+        check_dhcp_pool(network_address, netmask, default_router, excluded_start, excluded_end)
+
+        # the excluded-address command is only added if the user inputs a start and an end to the excl list
+        return template('dhcp_server', platform)(
+            pool_name=pool_name, network_address=network_address, netmask=dotted_netmask(netmask),
+            default_router=default_router, dns_server=dns_server, excluded_start=excluded_start or None,
+            excluded_end=excluded_end or None)
+
+    def config_dhcp_helper(self, interface=None, helper_address=None):
+        if interface is None:
+            # DHCP helper address for making a router be a relay agent
+            interface = input("Enter the interface to configure the helper address on (eg. g0/1): ")
+
+            while True:
+                helper_address = input("Enter the IP address of the DHCP server (the helper address): ").strip()
+                if Device.check_ipv4(helper_address):
+                    break
+                else:
+                    print(f"'{helper_address}' is not a valid IPv4 address. Please try again.")
+
+        try:
+            commands = Router.dhcp_helper_commands(interface, helper_address, platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        self._send_config(commands, f"Sending DHCP helper-address configuration to {interface}...",
+                          f"DHCP helper address configuration attempted on {self.hostname}.",
+                          checks_for('dhcp_helper', self.platform, interface=interface, helper_address=helper_address))
+
+    @staticmethod
+    def dhcp_helper_commands(interface, helper_address, platform=DEFAULT_PLATFORM) -> list:
+        if not interface or not helper_address:
+            raise ValueError("Interface and helper address cannot be empty.")
+        if not Device.check_ipv4(helper_address):
+            raise ValueError(f"'{helper_address}' is not a valid IPv4 address.")
+
+        return template('dhcp_helper', platform)(interface=interface, helper_address=helper_address)
+
+    def get_dhcp(self, interface=None):
+        if interface is None:
+            # allow the device to lease an IP address from the DHCP server
+            interface = input("Enter the interface which will get its address through DHCP: ")
+
+        try:
+            commands = Router.dhcp_client_commands(interface, platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        # the verification waits for the lease, which may take up to a minute
+        self._send_config(commands, f"Sending DHCP enabling configuration to {interface}...",
+                          f"DHCP client configuration attempted on {self.hostname}.",
+                          checks_for('dhcp_client', self.platform, interface=interface))
+
+    @staticmethod
+    def dhcp_client_commands(interface, platform=DEFAULT_PLATFORM) -> list:
+        if not interface:
+            raise ValueError("Interface not provided.")
+
+        return template('dhcp_client', platform)(interface=interface)
+
+    def config_hsrp(self, interface=None, real_ip=None, subnet_mask=None, group_id=None, virtual_ip=None,
+                    priority=100, preempt=True, encapsulation_vlan=None):
+        if interface is None:
+            # configuring HSRP on an interface
+            interface = input("Enter the interface for HSRP (e.g., GigabitEthernet0/0 or g0/0.10): ")
+            is_subinterface = '.' in interface # if the interface's name contains a '.' it means it is a subinterface
+
+            if is_subinterface:
+                encapsulation_vlan = input("Enter the VLAN ID for encapsulation (e.g., 10): ")
+
+            while True:
+                real_ip = input(f"Enter the REAL IP address for the interface '{interface}': ").strip()
+                if Device.check_ipv4(real_ip):
+                    break
+                else:
+                    print(f"'{real_ip}' is not a valid IPv4 address. Please try again.")
+
+            subnet_mask = input(f"Enter the subnet mask for '{real_ip}': ")
+
+            group_id = input("Enter the HSRP standby group ID: ")
+
+            while True:
+                virtual_ip = input("Enter the HSRP virtual IP address: ").strip()
+                if Device.check_ipv4(virtual_ip):
+                    break
+                else:
+                    print(f"'{virtual_ip}' is not a valid IPv4 address. Please try again.")
+
+            priority = input("Enter HSRP priority (default 100): ") or "100"
+            preempt = input("Enable HSRP preemption? (yes/no, default yes): ").lower().strip() != 'no'
+
+        try:
+            commands = Router.hsrp_commands(interface, real_ip, subnet_mask, group_id, virtual_ip,
+                                            priority, preempt, encapsulation_vlan, platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        self._send_config(commands, "Sending complete HSRP and interface configuration...",
+                          f"HSRP and interface configuration attempted on {self.hostname}.",
+                          checks_for('hsrp', self.platform, interface=interface, group_id=group_id,
+                                     virtual_ip=virtual_ip))
+
+    @staticmethod
+    def hsrp_commands(interface, real_ip, subnet_mask, group_id, virtual_ip, priority=100, preempt=True,
+                      encapsulation_vlan=None, platform=DEFAULT_PLATFORM) -> list:
+        if not interface:
+            raise ValueError("Interface cannot be empty.")
+        check_hsrp(real_ip, subnet_mask, virtual_ip)
+        if not str(group_id).isdigit():
+            raise ValueError(f"Invalid HSRP group ID '{group_id}'.")
+
+        # the encapsulation is only set on subinterfaces
+        if not ('.' in interface and str(encapsulation_vlan).isdigit()):
+            encapsulation_vlan = None
+        return template('hsrp', platform)(
+            interface=interface, encapsulation_vlan=encapsulation_vlan, real_ip=real_ip,
+            subnet_mask=dotted_netmask(subnet_mask), prefix_length=parse_netmask(subnet_mask), group_id=group_id,
+            virtual_ip=virtual_ip, priority=priority, preempt=preempt)
+
+    # --- async API (see Device.run_command_async); parameters as in the *_commands builders ---
+
+    async def config_ripv2_async(self, networks, redistribute_static=False) -> str:
+        return await self.push_config_async(Router.ripv2_commands(networks, redistribute_static,
+                                                                  platform=self.platform))
+
+    async def setup_dhcp_async(self, pool_name, network_address, netmask, default_router, dns_server='8.8.8.8',
+                               excluded_start=None, excluded_end=None) -> str:
+        return await self.push_config_async(Router.dhcp_server_commands(
+            pool_name, network_address, netmask, default_router, dns_server, excluded_start, excluded_end,
+            platform=self.platform))
+
+    async def config_dhcp_helper_async(self, interface, helper_address) -> str:
+        return await self.push_config_async(Router.dhcp_helper_commands(interface, helper_address,
+                                                                        platform=self.platform))
+
+    async def get_dhcp_async(self, interface) -> str:
+        return await self.push_config_async(Router.dhcp_client_commands(interface, platform=self.platform))
+
+    async def config_hsrp_async(self, interface, real_ip, subnet_mask, group_id, virtual_ip, priority=100,
+                                preempt=True, encapsulation_vlan=None) -> str:
+        return await self.push_config_async(Router.hsrp_commands(
+            interface, real_ip, subnet_mask, group_id, virtual_ip, priority, preempt, encapsulation_vlan,
+            platform=self.platform))
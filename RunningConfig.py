@@ -0,0 +1,175 @@
+import re
+
+# commands that move the CLI from global configuration mode into a sub-mode
+SUBMODE_PREFIXES = ('interface ', 'vlan ', 'router ', 'ip dhcp pool ', 'line ')
+
+# full interface names as they appear in the running-config; abbreviations are matched by prefix in this order
+INTERFACE_NAMES = ('GigabitEthernet', 'FastEthernet', 'TenGigabitEthernet', 'Ethernet', 'Vlan', 'Port-channel',
+                   'Loopback', 'Serial', 'Tunnel')
+INTERFACE_LINE = re.compile(r'^interface\s+([A-Za-z-]+)\s*(\d[\d/.:]*)$')
+
+
+def global_key(line: str) -> str:
+    # the leading words that identify a global command ('spanning-tree mode', 'ip dhcp', 'hostname')
+    words = line[3:].split() if line.startswith('no ') else line.split()
+    return ' '.join(words[:max(1, min(2, len(words) - 1))])
+
+
+def normalize(command: str) -> str:
+    # makes a command comparable with running-config lines: single spaces, full interface names
+    line = ' '.join(command.split())
+    match = INTERFACE_LINE.match(line)
+    if match:
+        abbreviation, number = match.groups()
+        for name in INTERFACE_NAMES:
+            if name.lower().startswith(abbreviation.lower()):
+                return f'interface {name}{number}'
+    return line
+
+
+class ConfigTree:
+    # A running-config indexed by section: global lines in one set, and for every section
+    # ('interface ...', 'router rip', ...) the set of lines configured under it.
+    def __init__(self):
+        self.globals = set()
+        self.sections = {}  # section line -> set of lines under it
+        # sections with a nested level (NX-OS 'hsrp 10' under an interface, 'address-family' under a router);
+        # their lines are kept flat, so rollback() cannot restore them
+        self.nested = set()
+
+    @classmethod
+    def parse(cls, text: str):
+        tree = cls()
+        section = None
+        child_indent = None
+        for raw_line in text.splitlines():
+            if not raw_line.strip() or raw_line.lstrip().startswith('!'):
+                continue
+            line = ' '.join(raw_line.split())
+            if raw_line[0].isspace():
+                # nested levels (e.g. address-family) are kept under their top-level section
+                if section is not None:
+                    indent = len(raw_line) - len(raw_line.lstrip())
+                    if child_indent is None:
+                        child_indent = indent
+                    elif indent > child_indent:
+                        tree.nested.add(section)
+                    tree.sections[section].add(line)
+                continue
+            section, child_indent = line, None
+            tree.sections.setdefault(section, set())
+            tree.globals.add(line)
+        return tree
+
+    def has(self, line: str, section=None) -> bool:
+        # a 'no ...' command counts as present when the line it negates is not configured
+        lines = self.globals if section is None else self.sections.get(section, set())
+        if line.startswith('no '):
+            positive = line[3:]
+            return line in lines or not any(l == positive or l.startswith(positive + ' ') for l in lines)
+        return line in lines
+
+    def delta(self, commands) -> list:
+        # returns only the commands that are not already configured, keeping the section lines
+        # needed to enter the sub-modes of the remaining commands
+        result = []
+        section = None
+        section_command = None
+        section_is_new = False
+        missing = []
+
+        def close_section():
+            if section_command is not None and (missing or section_is_new):
+                result.append(section_command)
+                result.extend(missing)
+                result.append('exit')
+
+        for command in commands:
+            line = normalize(command)
+            if line.startswith(SUBMODE_PREFIXES):
+                close_section()
+                section, section_command, missing = line, command, []
+                section_is_new = line not in self.sections
+            elif line in ('exit', 'end'):
+                close_section()
+                section, section_command, missing, section_is_new = None, None, [], False
+            elif section is not None:
+                if not self.has(line, section):
+                    missing.append(command)
+            elif not self.has(line):
+                result.append(command)
+        close_section()
+
+        # send_config_set leaves configuration mode by itself
+        if result and result[-1] == 'exit':
+            result.pop()
+        return result
+
+    def rollback(self, current, commands) -> list:
+        # returns the commands that bring the parts of the configuration touched by `commands` back from
+        # `current` to this (earlier) tree: lines added since are removed, removed or replaced lines are
+        # restored, and sections that did not exist before are deleted. Raises ValueError, without undoing
+        # anything, when a touched section cannot be restored from the trees (see below)
+        sections, keys = [], set()
+        in_section = False
+        for command in commands:
+            line = normalize(command)
+            if line.startswith(SUBMODE_PREFIXES):
+                in_section = True
+                if line not in sections:
+                    sections.append(line)
+            elif line in ('exit', 'end'):
+                in_section = False
+            elif not in_section:
+                keys.add(global_key(line))
+
+        undo = []
+        unsupported = []
+        for section in reversed(sections):
+            before, after = self.sections.get(section), current.sections.get(section)
+            if before is None and after is None:
+                if section.startswith('vlan '):
+                    unsupported.append(f"'{section}' is not in the running-config (VLANs of a VTP server or client "
+                                       f"are kept in vlan.dat)")
+                continue
+            if section in self.nested or section in current.nested:
+                unsupported.append(f"'{section}' has nested blocks (e.g. NX-OS 'hsrp' groups) that cannot be "
+                                   f"restored line by line")
+                continue
+            if before is None:
+                undo.append(f'no {section}')
+            elif after is None:
+                undo.extend([section, *sorted(before), 'exit'])
+            elif before != after:
+                undo.extend([section, *(f'no {line}' for line in sorted(after - before)), *sorted(before - after),
+                             'exit'])
+
+        # section lines are compared above; the globals only by the keys of the global commands
+        def related(lines):
+            return {l for l in lines if not l.startswith(SUBMODE_PREFIXES) and global_key(l) in keys}
+
+        before, after = related(self.globals), related(current.globals)
+        undo.extend(f'no {line}' for line in sorted(after - before))
+        undo.extend(sorted(before - after))
+        if unsupported:
+            raise ValueError("cannot be rolled back automatically: " + "; ".join(unsupported))
+
+        if undo and undo[-1] == 'exit':
+            undo.pop()
+        return undo
+
+
+def format_diff(commands, delta) -> str:
+    # shows the planned commands, marking with '+' the ones that will be sent
+    remaining = list(delta)
+    lines = []
+    for command in commands:
+        # 'exit' lines added by delta() to close a section have no counterpart in the planned commands
+        while remaining and remaining[0] == 'exit' and command != 'exit':
+            remaining.pop(0)
+        if remaining and command == remaining[0]:
+            remaining.pop(0)
+            lines.append(f"+ {command}")
+        else:
+            lines.append(f"  {command}")
+    return '\n'.join(lines)
@@ -0,0 +1,220 @@
+import atexit
+import os
+import queue
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+from Metrics import registry
+
+# recent output kept in memory per device for the menu, in bytes
+RING_BYTES = 64 * 1024
+# size at which a device's log file is compressed and a new one started, and compressed files kept per device
+MAX_FILE_BYTES = 10 * 1024 * 1024
+BACKUPS = 5
+# records waiting for the writer thread; when it falls this far behind, new records are dropped from the files
+QUEUE_SIZE = 10000
+# log files kept open by the writer; the least recently written is closed first
+MAX_OPEN_FILES = 64
+# seconds the writer waits for records before flushing what it has written
+IDLE_FLUSH = 1.0
+
+# passwords and secrets in configuration lines and show output are not written to the logs
+SECRET_PATTERN = re.compile(r'\b(password|secret|key-string|community)(\s+\d{1,2})?\s+\S+', re.IGNORECASE)
+
+
+def mask_secrets(text) -> str:
+    return SECRET_PATTERN.sub(r'\1\2 ********', text)
+
+
+class SessionRecorder:
+    # Transcript of what is sent to and received from every device. The last ring_bytes of each device stay
+    # in memory for the menu; with a log directory the records also go to <host>.log there, written by a
+    # background thread so a slow disk never holds up a session. A full log is compressed to <host>.log.1.gz
+    # (older ones move to .2.gz and so on, up to 'backups').
+    def __init__(self, log_dir=None, ring_bytes=RING_BYTES, max_file_bytes=MAX_FILE_BYTES, backups=BACKUPS,
+                 queue_size=QUEUE_SIZE, max_open_files=MAX_OPEN_FILES):
+        self.log_dir = log_dir
+        self.ring_bytes = ring_bytes
+        self.max_file_bytes = max_file_bytes
+        self.backups = backups
+        self.max_open_files = max_open_files
+        self._rings = {}  # host -> deque of (timestamp, direction, text)
+        self._partial = {}  # (host, id of the session) -> last line of received output, held until its newline
+        self._ring_sizes = {}  # host -> bytes held in its deque
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._files = OrderedDict()  # host -> open log file, least recently written first
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+    def record(self, host, direction, text, complete=True, session=None) -> None:
+        # direction is 'sent' or 'received', as in the byte counters; complete=False for chunks of output
+        # that is still arriving, from the connection given as `session`. Never blocks the caller.
+        if not text:
+            return
+        # secrets are masked line by line, so one split across two reads ('enable pass' + 'word 0 x') is still
+        # found: the last line of a chunk is held until its newline (the end of a command records one), or
+        # until something else is recorded for the same session. Lines are held per session, as a host can have
+        # several sessions open at once, and everything is recorded in one locked step to keep the order.
+        key = (host, id(session))
+        with self._lock:
+            held = self._partial.pop(key, '')
+            if direction == 'received' and not complete:
+                text, held = held + text, ''
+                cut = text.rfind('\n') + 1
+                if cut < len(text) and len(text) - cut < self.ring_bytes:
+                    text, self._partial[key] = text[:cut], text[cut:]
+            entries = []
+            if held:
+                entries.append(self._append_locked(host, 'received', held, complete=False))
+            if text:
+                entries.append(self._append_locked(host, direction, text, complete))
+            if not self.log_dir or not entries:
+                return
+            if self._writer is None:
+                self._start_writer()
+            for entry in entries:
+                try:
+                    self._queue.put_nowait((host, entry))
+                except queue.Full:
+                    registry.increment('netauto_session_records_dropped_total', device=host)
+
+    def recent(self, host) -> str:
+        # the transcript of the output still held in memory for a device
+        with self._lock:
+            entries = list(self._rings.get(host, ()))
+        return ''.join(_format(entry) for entry in entries)
+
+    def hosts(self) -> list:
+        with self._lock:
+            return sorted(self._rings)
+
+    def clear(self, host=None) -> None:
+        with self._lock:
+            for name in [host] if host is not None else list(self._rings):
+                self._rings.pop(name, None)
+                self._ring_sizes.pop(name, None)
+            for key in [key for key in self._partial if host is None or key[0] == host]:
+                del self._partial[key]
+
+    def flush(self) -> None:
+        # waits until everything recorded so far is written to the log files
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        # writes what is left and stops the writer thread; called at exit
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+    def _append_locked(self, host, direction, text, complete) -> tuple:
+        # masks the text and keeps it in the host's ring; returns the entry for the log file
+        text = mask_secrets(text)
+        if complete and direction == 'received' and not text.endswith('\n'):
+            text += '\n'
+        entry = (time.time(), direction, text[-self.ring_bytes:])
+        ring = self._rings.get(host)
+        if ring is None:
+            ring = self._rings[host] = deque()
+            self._ring_sizes[host] = 0
+        ring.append(entry)
+        self._ring_sizes[host] += len(entry[2])
+        while self._ring_sizes[host] > self.ring_bytes:
+            self._ring_sizes[host] -= len(ring.popleft()[2])
+        return entry
+
+    def _start_writer(self) -> None:
+        with self._writer_lock:
+            if self._writer is not None:
+                return
+            os.makedirs(self.log_dir, exist_ok=True)
+            self._writer = threading.Thread(target=self._write_loop, name='session-recorder', daemon=True)
+            self._writer.start()
+        atexit.register(self.close)
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=IDLE_FLUSH)
+            except queue.Empty:
+                self._flush_files()
+                continue
+            try:
+                if item is None:
+                    self._close_files()
+                    return
+                host, entry = item
+                try:
+                    self._write(host, _format(entry))
+                except OSError as e:
+                    registry.increment('netauto_session_records_dropped_total', device=host)
+                    print(f"Warning: could not write the session log of {host}: {e}", file=sys.stderr)
+                # records arrive in bursts; the files are flushed once the burst is written
+                if self._queue.empty():
+                    self._flush_files()
+            finally:
+                self._queue.task_done()
+
+    def _write(self, host, text) -> None:
+        file = self._files.pop(host, None)
+        if file is None:
+            if len(self._files) >= self.max_open_files:
+                self._files.popitem(last=False)[1].close()
+            file = open(self._path(host), 'a', encoding='utf-8')
+        self._files[host] = file
+        file.write(text)
+        if file.tell() >= self.max_file_bytes:
+            del self._files[host]
+            file.close()
+            self._rotate(host)
+
+    def _rotate(self, host) -> None:
+        # host.log -> host.log.1.gz, host.log.1.gz -> host.log.2.gz, ...; the oldest is removed
+        import gzip
+        import shutil
+
+        path = self._path(host)
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}.gz"):
+                os.replace(f"{path}.{index}.gz", f"{path}.{index + 1}.gz")
+        if self.backups > 0:
+            with open(path, 'rb') as source, gzip.open(f"{path}.1.gz.tmp", 'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.replace(f"{path}.1.gz.tmp", f"{path}.1.gz")
+        os.remove(path)
+
+    def _path(self, host) -> str:
+        # IPv6 addresses and odd hostnames become safe file names
+        return os.path.join(self.log_dir, re.sub(r'[^\w.-]', '_', host) + '.log')
+
+    def _flush_files(self) -> None:
+        for host, file in list(self._files.items()):
+            try:
+                file.flush()
+            except OSError as e:
+                print(f"Warning: could not write the session log of {host}: {e}", file=sys.stderr)
+
+    def _close_files(self) -> None:
+        self._flush_files()
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+
+
+def _format(entry) -> str:
+    # sent lines get a timestamp and '>'; received output is kept as the device printed it
+    timestamp, direction, text = entry
+    if direction == 'sent':
+        stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
+        return ''.join(f"[{stamp}] > {line}\n" for line in text.splitlines())
+    return text
+
+
+# recorder shared by the whole application; log files only when NETAUTO_SESSION_LOG_DIR is set
+recorder = SessionRecorder(os.environ.get('NETAUTO_SESSION_LOG_DIR'))
@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache:
+    # Keeps recent show command results in memory, keyed by (device host, command).
+    # Entries expire after `ttl` seconds and the least recently used ones are evicted past `max_entries`.
+    def __init__(self, ttl=60, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (host, command) -> (stored at, value)
+        self._lock = threading.Lock()
+
+    def get(self, host, command):
+        # returns (value, age in seconds), or None when there is no fresh entry
+        key = (host, command)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            age = time.monotonic() - entry[0]
+            if age > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], age
+
+    def put(self, host, command, value) -> None:
+        key = (host, command)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, host, command=None) -> None:
+        # drops the cached results of one command, or of every command for the host
+        with self._lock:
+            if command is not None:
+                self._entries.pop((host, command), None)
+                return
+            for key in [key for key in self._entries if key[0] == host]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
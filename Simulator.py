@@ -0,0 +1,570 @@
+import argparse
+import ipaddress
+import json
+import random
+import re
+import socket
+import threading
+import time
+
+import paramiko
+
+from RunningConfig import normalize
+
+# interfaces every simulated device starts with
+SWITCH_INTERFACES = [f'GigabitEthernet{slot}/{port}' for slot in (0, 1) for port in range(4)]
+ROUTER_INTERFACES = [f'GigabitEthernet0/{port}' for port in range(4)]
+DEFAULT_VLANS = [(1002, 'fddi-default'), (1003, 'token-ring-default'), (1004, 'fddinet-default'),
+                 (1005, 'trnet-default')]
+
+# configuration commands that open a sub-mode, and the prompt suffix of that mode
+SUBMODES = (('interface', 'config-if'), ('vlan', 'config-vlan'), ('router', 'config-router'),
+            ('ip dhcp pool', 'dhcp-config'), ('line', 'config-line'))
+
+# configuration commands that are kept once per value instead of replacing each other
+REPEATABLE = ('network ', 'ip helper-address ')
+
+INVALID_INPUT = "% Invalid input detected at '^' marker."
+# seconds an HSRP group takes to become active, and a DHCP client interface to get its lease, after configuring it
+CONVERGE_DELAY = 2.0
+INTERFACE_RANGE = re.compile(r'^([A-Za-z-]+\d+/)(\d+)\s*-\s*(\d+)$')
+
+
+def matches(line, command) -> bool:
+    # IOS-style abbreviations: each word typed must be a prefix of the command's word ("sh ip int br")
+    words, expected = line.split(), command.split()
+    return len(words) == len(expected) and all(e.startswith(w.lower()) for w, e in zip(words, expected))
+
+
+class SimulatedDevice:
+    # State of one emulated IOS switch or router: its configuration, prompts and failure settings.
+    def __init__(self, hostname, ip_address, device_kind='switch', username='admin', password='cisco',
+                 secret='pass', latency=0.0, connect_delay=0.0, failure_rate=0.0, auth_failure=False):
+        self.hostname = hostname
+        self.ip_address = ip_address
+        self.device_kind = device_kind
+        self.username = username
+        self.password = password
+        self.secret = secret
+        self.latency = latency
+        self.connect_delay = connect_delay
+        self.failure_rate = failure_rate
+        self.auth_failure = auth_failure
+        self.neighbors = []  # (local interface, neighbor SimulatedDevice, remote interface)
+        self.changed_at = {}  # section -> time.monotonic() of its last change, for HSRP and DHCP convergence
+
+        self.lock = threading.Lock()
+        self.global_lines = [f'hostname {hostname}']
+        self.sections = {}  # section line -> list of lines under it
+        interfaces = SWITCH_INTERFACES if device_kind == 'switch' else ROUTER_INTERFACES
+        for name in interfaces:
+            self.sections[f'interface {name}'] = []
+        management = 'interface Vlan1' if device_kind == 'switch' else f'interface {ROUTER_INTERFACES[0]}'
+        self.sections[management] = [f'ip address {ip_address} 255.255.255.0']
+
+    # --- configuration ---
+
+    def apply(self, section, line) -> None:
+        # adds a line globally or under a section; 'no ...' removes the line(s) it negates
+        with self.lock:
+            lines = self.global_lines if section is None else self.sections.setdefault(section, [])
+            if section is not None:
+                self.changed_at[section] = time.monotonic()
+            if line.startswith('no '):
+                positive = line[3:]
+                lines[:] = [l for l in lines if l != positive and not l.startswith(positive + ' ')]
+                if section is None and positive.startswith(tuple(prefix for prefix, _ in SUBMODES)):
+                    self.sections.pop(normalize(positive), None)
+                return
+            if line.startswith('hostname '):
+                self.hostname = line.split(None, 1)[1]
+            # commands that can be given several times (RIP networks, helper addresses) add a line each
+            if line.startswith(REPEATABLE):
+                if line not in lines:
+                    lines.append(line)
+                return
+            # a new value replaces the old one ("standby 1 priority 110" replaces "... priority 100")
+            key = ' '.join(line.split()[:2]) if line.startswith('ip address') else ' '.join(line.split()[:-1])
+            for index, existing in enumerate(lines):
+                existing_key = (' '.join(existing.split()[:2]) if existing.startswith('ip address')
+                                else ' '.join(existing.split()[:-1]))
+                if existing == line or (key and existing_key == key and len(existing.split()) == len(line.split())):
+                    lines[index] = line
+                    return
+            lines.append(line)
+
+    def running_config(self) -> str:
+        with self.lock:
+            out = ['Building configuration...', '', 'Current configuration : 1024 bytes', '!']
+            out.extend(self.global_lines)
+            out.append('!')
+            for section, lines in sorted(self.sections.items(), key=lambda item: _section_order(item[0])):
+                out.append(section)
+                out.extend(f' {line}' for line in lines)
+                out.append('!')
+            out.append('end')
+            return '\n'.join(out)
+
+    def interface_rows(self) -> list:
+        rows = []
+        with self.lock:
+            for section, lines in sorted(self.sections.items(), key=lambda item: _section_order(item[0])):
+                if not section.startswith('interface '):
+                    continue
+                address = next((l.split()[2] for l in lines if l.startswith('ip address ') and len(l.split()) >= 4),
+                               'unassigned')
+                method = 'manual' if address != 'unassigned' else 'unset'
+                if 'ip address dhcp' in lines:
+                    # the lease arrives a while after the interface was configured
+                    method = 'DHCP'
+                    if self._converged(section):
+                        address = f"192.0.2.{self.ip_address.rsplit('.', 1)[-1]}"
+                shutdown = 'shutdown' in lines
+                rows.append((section.split(None, 1)[1], address, method,
+                             'administratively down' if shutdown else 'up', 'down' if shutdown else 'up'))
+        return rows
+
+    def standby_rows(self) -> list:
+        # (interface, group, priority, preempt, state, virtual IP) of every HSRP group
+        rows = []
+        with self.lock:
+            for section, lines in sorted(self.sections.items(), key=lambda item: _section_order(item[0])):
+                for line in lines:
+                    parts = line.split()
+                    if len(parts) == 4 and parts[0] == 'standby' and parts[2] == 'ip':
+                        group = parts[1]
+                        priority = next((l.split()[-1] for l in lines if l.startswith(f'standby {group} priority ')),
+                                        '100')
+                        preempt = f'standby {group} preempt' in lines
+                        state = 'Active' if self._converged(section) else 'Speak'
+                        rows.append((section.split(None, 1)[1], group, priority, preempt, state, parts[3]))
+        return rows
+
+    def _converged(self, section) -> bool:
+        return time.monotonic() - self.changed_at.get(section, 0.0) >= CONVERGE_DELAY
+
+    def vlan_rows(self) -> list:
+        with self.lock:
+            vlans = {1: 'default'}
+            for section, lines in self.sections.items():
+                if section.startswith('vlan ') and section.split()[1].isdigit():
+                    vlan_id = int(section.split()[1])
+                    name = next((l.split(None, 1)[1] for l in lines if l.startswith('name ')), f'VLAN{vlan_id:04d}')
+                    vlans[vlan_id] = name
+            ports = {vlan_id: [] for vlan_id in vlans}
+            for section, lines in self.sections.items():
+                if not section.startswith('interface ') or 'Vlan' in section:
+                    continue
+                if 'switchport mode trunk' in lines:
+                    continue
+                access = next((int(l.split()[-1]) for l in lines if l.startswith('switchport access vlan ')), 1)
+                short_name = section.split(None, 1)[1].replace('GigabitEthernet', 'Gi')
+                ports.setdefault(access, []).append(short_name)
+        rows = [(vlan_id, vlans.get(vlan_id, f'VLAN{vlan_id:04d}'), 'active', ports[vlan_id]) for vlan_id in sorted(ports)]
+        rows.extend((vlan_id, name, 'act/unsup', []) for vlan_id, name in DEFAULT_VLANS)
+        return rows
+
+    def reachable(self, target) -> bool:
+        # a target answers pings when it is in one of the device's connected subnets
+        try:
+            address = ipaddress.IPv4Address(target)
+        except ValueError:
+            return False
+        with self.lock:
+            for lines in self.sections.values():
+                for line in lines:
+                    parts = line.split()
+                    if line.startswith('ip address ') and len(parts) >= 4:
+                        try:
+                            if address in ipaddress.IPv4Network(f'{parts[2]}/{parts[3]}', strict=False):
+                                return True
+                        except ValueError:
+                            continue
+        return False
+
+
+class CliSession:
+    # One SSH shell on a simulated device: tracks the CLI mode and turns input lines into output.
+    def __init__(self, device: SimulatedDevice):
+        self.device = device
+        self.privileged = False
+        self.config_mode = False
+        self.sections = []  # sections being configured ('interface range' can select several)
+        self.submode = None
+        self.awaiting_enable_password = False
+        self.closed = False
+
+    def prompt(self) -> str:
+        if self.awaiting_enable_password:
+            return 'Password: '
+        if self.config_mode:
+            return f"{self.device.hostname}({self.submode or 'config'})#"
+        return f"{self.device.hostname}{'#' if self.privileged else '>'}"
+
+    def execute(self, line) -> str:
+        if self.awaiting_enable_password:
+            self.awaiting_enable_password = False
+            if line == self.device.secret:
+                self.privileged = True
+                return ''
+            return '% Access denied'
+
+        line = ' '.join(line.split())
+        if not line:
+            return ''
+        if self.config_mode:
+            return self._configure(line)
+        return self._exec(line)
+
+    def _exec(self, line) -> str:
+        device = self.device
+        if matches(line, 'enable'):
+            if not self.privileged:
+                self.awaiting_enable_password = True
+            return ''
+        if matches(line, 'disable'):
+            self.privileged = False
+            return ''
+        if line.split()[0] in ('exit', 'logout', 'quit'):
+            self.closed = True
+            return ''
+        if line.startswith('terminal ') or line.startswith('term '):
+            return ''
+        if matches(line, 'show version'):
+            return f"Cisco IOS Software, Simulated {device.device_kind}\n{device.hostname} uptime is 1 day"
+        if matches(line, 'show ip interface brief'):
+            out = [f"{'Interface':<23}{'IP-Address':<16}OK? Method Status                Protocol"]
+            for name, address, method, status, protocol in device.interface_rows():
+                out.append(f"{name:<23}{address:<16}YES {method:<7}{status:<22}{protocol}")
+            return '\n'.join(out)
+        if matches(line, 'show vlan brief'):
+            if device.device_kind != 'switch':
+                return INVALID_INPUT
+            out = ['', f"{'VLAN':<5}{'Name':<33}{'Status':<10}Ports", f"{'-' * 4} {'-' * 32} {'-' * 9} {'-' * 31}"]
+            for vlan_id, name, status, ports in device.vlan_rows():
+                port_lines = [', '.join(ports[i:i + 4]) for i in range(0, len(ports), 4)] or ['']
+                out.append(f"{vlan_id:<5}{name:<33}{status:<10}{port_lines[0]}".rstrip())
+                out.extend(f"{'':<48}{port_line}" for port_line in port_lines[1:])
+            return '\n'.join(out)
+        if matches(line, 'show standby brief'):
+            out = ['                     P indicates configured to preempt.', '                     |',
+                   'Interface   Grp  Pri P State   Active          Standby         Virtual IP']
+            for name, group, priority, preempt, state, virtual_ip in device.standby_rows():
+                short_name = name.replace('GigabitEthernet', 'Gi')
+                out.append(f"{short_name:<12}{group:<5}{priority:<4}{'P' if preempt else ' '} {state:<8}"
+                           f"{'local':<16}{'unknown':<16}{virtual_ip}")
+            return '\n'.join(out)
+        if matches(line, 'show running-config') or matches(line, 'show run'):
+            return device.running_config() if self.privileged else INVALID_INPUT
+        if matches(line, 'show cdp neighbors detail'):
+            return self._cdp_neighbors()
+        if matches(line, 'show lldp neighbors detail'):
+            return self._lldp_neighbors()
+        if line.split()[0] == 'ping' and len(line.split()) >= 2:
+            return self._ping(line.split()[1:])
+        if matches(line, 'configure terminal') or matches(line, 'conf t'):
+            if not self.privileged:
+                return INVALID_INPUT
+            self.config_mode = True
+            return 'Enter configuration commands, one per line.  End with CNTL/Z.'
+        if matches(line, 'write memory') or line.startswith('copy run'):
+            return 'Building configuration...\n[OK]'
+        return INVALID_INPUT
+
+    def _configure(self, line) -> str:
+        if line == 'end':
+            self.config_mode, self.sections, self.submode = False, [], None
+            return ''
+        if line == 'exit':
+            if self.sections:
+                self.sections, self.submode = [], None
+            else:
+                self.config_mode = False
+            return ''
+        if line.startswith('do '):
+            return self._exec(line[3:])
+
+        for prefix, submode in SUBMODES:
+            if line.startswith(prefix + ' ') or line == prefix:
+                self.sections = self._expand_sections(line)
+                self.submode = submode
+                for section in self.sections:
+                    with self.device.lock:
+                        self.device.sections.setdefault(section, [])
+                return ''
+
+        if self.sections:
+            for section in self.sections:
+                self.device.apply(section, line)
+            return ''
+        # a global command typed in a sub-mode leaves the sub-mode, as on IOS
+        self.device.apply(None, line)
+        return ''
+
+    def _expand_sections(self, line) -> list:
+        # "interface range Gi0/1 - 3" selects GigabitEthernet0/1, 0/2 and 0/3
+        if not line.startswith('interface range '):
+            return [normalize(line)]
+        sections = []
+        for part in line[len('interface range '):].split(','):
+            match = INTERFACE_RANGE.match(part.strip())
+            if not match:
+                sections.append(normalize(f'interface {part.strip()}'))
+                continue
+            base, first, last = match.group(1), int(match.group(2)), int(match.group(3))
+            sections.extend(normalize(f'interface {base}{number}') for number in range(first, last + 1))
+        return sections
+
+    def _ping(self, args) -> str:
+        target = args[0]
+        repeat = int(args[args.index('repeat') + 1]) if 'repeat' in args else 5
+        timeout = args[args.index('timeout') + 1] if 'timeout' in args else '2'
+        ok = self.device.reachable(target)
+        marks = ('!' if ok else '.') * repeat
+        out = ['Type escape sequence to abort.',
+               f'Sending {repeat}, 100-byte ICMP Echos to {target}, timeout is {timeout} seconds:', marks]
+        if ok:
+            out.append(f'Success rate is 100 percent ({repeat}/{repeat}), round-trip min/avg/max = 1/2/4 ms')
+        else:
+            out.append(f'Success rate is 0 percent (0/{repeat})')
+        return '\n'.join(out)
+
+    def _cdp_neighbors(self) -> str:
+        out = []
+        for local_interface, neighbor, remote_interface in self.device.neighbors:
+            platform = 'cisco IOSv' if neighbor.device_kind == 'router' else 'cisco IOSvL2'
+            capabilities = 'Router' if neighbor.device_kind == 'router' else 'Switch IGMP'
+            out.extend(['-------------------------', f'Device ID: {neighbor.hostname}', 'Entry address(es): ',
+                        f'  IP address: {neighbor.ip_address}',
+                        f'Platform: {platform},  Capabilities: {capabilities}',
+                        f'Interface: {local_interface},  Port ID (outgoing port): {remote_interface}',
+                        'Holdtime : 150 sec', ''])
+        return '\n'.join(out)
+
+    def _lldp_neighbors(self) -> str:
+        out = []
+        for local_interface, neighbor, remote_interface in self.device.neighbors:
+            capabilities = 'R' if neighbor.device_kind == 'router' else 'B'
+            out.extend(['------------------------------------------------',
+                        f"Local Intf: {local_interface.replace('GigabitEthernet', 'Gi')}",
+                        f"Chassis id: 5254.00{neighbor.ip_address.split('.')[-1].zfill(2)[-2:]}.0000",
+                        f"Port id: {remote_interface.replace('GigabitEthernet', 'Gi')}",
+                        f'Port Description: {remote_interface}', f'System Name: {neighbor.hostname}', '',
+                        f'System Capabilities: {capabilities}', f'Enabled Capabilities: {capabilities}',
+                        'Management Addresses:', f'    IP: {neighbor.ip_address}', ''])
+        out.append(f'Total entries displayed: {len(self.device.neighbors)}')
+        return '\n'.join(out)
+
+
+class _SSHServer(paramiko.ServerInterface):
+    def __init__(self, device: SimulatedDevice):
+        self.device = device
+        self.shell_requested = threading.Event()
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if not self.device.auth_failure and username == self.device.username and password == self.device.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_requested.set()
+        return True
+
+
+class DeviceFarm:
+    # A set of simulated devices, each listening for SSH on its own loopback address (127.0.1.x),
+    # with configurable latency and injected failures.
+    def __init__(self, switches=4, routers=2, port=2222, base_address='127.0.1.', latency=0.0, connect_delay=0.0,
+                 failure_rate=0.0, down=0, auth_failures=0, username='admin', password='cisco', secret='pass',
+                 seed=None):
+        self.port = port
+        self.username = username
+        self.password = password
+        self.secret = secret
+        self.devices = []
+        self.down = set()
+        self._host_key = None
+        self._listeners = []
+        self._stopped = threading.Event()
+
+        kinds = ['switch'] * switches + ['router'] * routers
+        for index, kind in enumerate(kinds, start=1):
+            hostname = f"{'SW' if kind == 'switch' else 'R'}{index if kind == 'switch' else index - switches}"
+            self.devices.append(SimulatedDevice(hostname, f'{base_address}{index}', kind, username, password, secret,
+                                                latency=latency, connect_delay=connect_delay,
+                                                failure_rate=failure_rate))
+
+        # failures are spread over the farm reproducibly for a given seed
+        chooser = random.Random(seed)
+        shuffled = chooser.sample(self.devices, len(self.devices))
+        self.down = {device.hostname for device in shuffled[:down]}
+        for device in shuffled[down:down + auth_failures]:
+            device.auth_failure = True
+        self._link_neighbors()
+
+    def start(self):
+        self._host_key = paramiko.RSAKey.generate(2048)
+        for device in self.devices:
+            if device.hostname in self.down:
+                continue
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind((device.ip_address, self.port))
+            listener.listen(64)
+            self._listeners.append(listener)
+            threading.Thread(target=self._accept_loop, args=(listener, device), daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for listener in self._listeners:
+            listener.close()
+        self._listeners = []
+
+    def inventory(self) -> list:
+        # devices.json entries pointing at the simulated devices
+        return [{
+            'type': device.device_kind,
+            'hostname': device.hostname,
+            'ip_address': device.ip_address,
+            'port': self.port,
+            'username': self.username,
+            'password': self.password,
+            'exec_password': self.secret,
+            'device_type': 'cisco_ios',
+            'site': 'simulated',
+        } for device in self.devices]
+
+    def write_inventory(self, filename) -> None:
+        with open(filename, 'w') as file:
+            json.dump(self.inventory(), file, indent=2)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.stop()
+        return False
+
+    def _link_neighbors(self) -> None:
+        # simple topology for CDP: switches in a chain on Gi1/3 -> Gi1/2, routers attached to the first switches
+        switches = [d for d in self.devices if d.device_kind == 'switch']
+        routers = [d for d in self.devices if d.device_kind == 'router']
+        for left, right in zip(switches, switches[1:]):
+            _link(left, 'GigabitEthernet1/3', right, 'GigabitEthernet1/2')
+        for index, router in enumerate(routers):
+            if switches:
+                _link(router, 'GigabitEthernet0/1', switches[index % len(switches)], f'GigabitEthernet1/{index % 2}')
+
+    def _accept_loop(self, listener, device) -> None:
+        while not self._stopped.is_set():
+            try:
+                client, _ = listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(client, device), daemon=True).start()
+
+    def _serve(self, client, device: SimulatedDevice) -> None:
+        transport = paramiko.Transport(client)
+        try:
+            transport.add_server_key(self._host_key)
+            if device.connect_delay:
+                time.sleep(device.connect_delay)
+            server = _SSHServer(device)
+            transport.start_server(server=server)
+            channel = transport.accept(20)
+            if channel is None or not server.shell_requested.wait(10):
+                return
+            self._shell(channel, device)
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        finally:
+            transport.close()
+
+    def _shell(self, channel, device: SimulatedDevice) -> None:
+        session = CliSession(device)
+        channel.sendall(f"\r\n{session.prompt()}".encode())
+        buffer = ''
+        previous = ''
+        while not session.closed:
+            data = channel.recv(4096)
+            if not data:
+                return
+            for char in data.decode(errors='ignore'):
+                if char == '\n' and previous == '\r':
+                    previous = char
+                    continue
+                previous = char
+                if char in '\r\n':
+                    line, buffer = buffer, ''
+                    echo = '' if session.awaiting_enable_password else line
+                    output = session.execute(line)
+                    if device.latency:
+                        time.sleep(device.latency)
+                    if device.failure_rate and random.random() < device.failure_rate:
+                        # injected failure: the device drops the session mid-command
+                        channel.close()
+                        return
+                    text = f"{echo}\r\n" + (output.replace('\n', '\r\n') + '\r\n' if output else '')
+                    if session.closed:
+                        channel.sendall(text.encode())
+                        return
+                    channel.sendall((text + session.prompt()).encode())
+                elif char in '\x08\x7f':
+                    buffer = buffer[:-1]
+                elif char == '\x1a':
+                    session.execute('end')
+                else:
+                    buffer += char
+
+
+def _link(left, left_interface, right, right_interface) -> None:
+    left.neighbors.append((left_interface, right, right_interface))
+    right.neighbors.append((right_interface, left, left_interface))
+
+
+def _section_order(section):
+    # interfaces first in numeric order, like a real running-config
+    numbers = [int(n) for n in re.findall(r'\d+', section)]
+    return (0 if section.startswith('interface') else 1, re.sub(r'[\d/.]+', '', section), numbers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local farm of simulated IOS devices reachable over SSH.")
+    parser.add_argument('--switches', type=int, default=4)
+    parser.add_argument('--routers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=2222)
+    parser.add_argument('--latency', type=float, default=0.0, help="delay added to every command, in seconds")
+    parser.add_argument('--connect-delay', type=float, default=0.0, help="delay before the SSH handshake")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="chance of dropping the session per command")
+    parser.add_argument('--down', type=int, default=0, help="number of devices that refuse connections")
+    parser.add_argument('--auth-failures', type=int, default=0, help="number of devices that reject the login")
+    parser.add_argument('--inventory', default='sim_devices.json', help="devices file written for the farm")
+    args = parser.parse_args()
+
+    farm = DeviceFarm(args.switches, args.routers, args.port, latency=args.latency, connect_delay=args.connect_delay,
+                      failure_rate=args.failure_rate, down=args.down, auth_failures=args.auth_failures)
+    with farm:
+        farm.write_inventory(args.inventory)
+        print(f"{len(farm.devices)} simulated devices listening on port {args.port}; inventory written to "
+              f"'{args.inventory}'. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\nStopping the simulated devices...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import argparse
+import sqlite3
+import sys
+import time
+
+from Fleet import FleetExecutor, build_device
+from Parsers import format_table
+from Switch import Switch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    host TEXT PRIMARY KEY,
+    hostname TEXT NOT NULL,
+    type TEXT NOT NULL,
+    collected_at REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS interfaces (
+    host TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    ip_address TEXT,
+    method TEXT,
+    status TEXT,
+    protocol TEXT,
+    PRIMARY KEY (host, interface)
+);
+CREATE INDEX IF NOT EXISTS idx_interfaces_status ON interfaces (protocol, status);
+CREATE TABLE IF NOT EXISTS vlans (
+    host TEXT NOT NULL,
+    vlan_id INTEGER NOT NULL,
+    name TEXT,
+    status TEXT,
+    PRIMARY KEY (host, vlan_id)
+);
+CREATE INDEX IF NOT EXISTS idx_vlans_vlan_id ON vlans (vlan_id);
+CREATE TABLE IF NOT EXISTS vlan_ports (
+    host TEXT NOT NULL,
+    vlan_id INTEGER NOT NULL,
+    port TEXT NOT NULL,
+    PRIMARY KEY (host, port)
+);
+CREATE INDEX IF NOT EXISTS idx_vlan_ports_vlan_id ON vlan_ports (vlan_id);
+"""
+
+# results written per transaction while collecting; fewer commits make large fleets much faster to store
+COMMIT_EVERY = 50
+
+
+class StateStore:
+    # Local SQLite copy of the fleet's interface and VLAN tables, so questions about the whole network
+    # ("which switches have VLAN 30", "which interfaces are down") are answered without connecting.
+    def __init__(self, path='state.db'):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        # WAL lets queries read while a collection is writing
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(SCHEMA)
+
+    def collect(self, devices, max_workers=32, timeout=120) -> list:
+        # polls every device in parallel; the rows of each device are replaced as soon as it answers.
+        # A device that fails keeps its previous rows, and the error is recorded next to it.
+        def poll(device):
+            state = {'interfaces': device.interfaces(refresh=True)}
+            if isinstance(device, Switch):
+                state['vlans'] = device.vlans(refresh=True)
+            return state
+
+        devices = list(devices)
+        by_host = {device.device_details['host']: device for device in devices}
+        results = []
+        start = time.monotonic()
+        for result in FleetExecutor(max_workers=max_workers, timeout=timeout).run(devices, poll):
+            results.append(result)
+            print(f"[{len(results)}/{len(devices)}] {'OK' if result.ok else 'FAILED':6} {result.hostname} "
+                  f"({result.host}){'' if result.ok else f': {result.error}'}")
+            self._store(by_host[result.host], result)
+            if len(results) % COMMIT_EVERY == 0:
+                self.db.commit()
+        self.db.commit()
+
+        failed = sum(1 for result in results if not result.ok)
+        print(f"Collected {len(results) - failed}/{len(results)} device(s) into '{self.path}' "
+              f"in {time.monotonic() - start:.1f}s.")
+        return results
+
+    def devices_with_vlan(self, vlan_id) -> list:
+        return self.query("SELECT d.hostname, v.host, v.vlan_id, v.name, v.status, "
+                          "(SELECT group_concat(p.port, ', ') FROM vlan_ports p "
+                          " WHERE p.host = v.host AND p.vlan_id = v.vlan_id) AS ports "
+                          "FROM vlans v JOIN devices d ON d.host = v.host WHERE v.vlan_id = ? ORDER BY d.hostname",
+                          (int(vlan_id),))
+
+    def interfaces_down(self, include_shutdown=False) -> list:
+        # interfaces whose line protocol is down; administratively shut ones only when asked for
+        sql = ("SELECT d.hostname, i.host, i.interface, i.ip_address, i.status, i.protocol "
+               "FROM interfaces i JOIN devices d ON d.host = i.host WHERE i.protocol = 'down'")
+        if not include_shutdown:
+            sql += " AND i.status != 'administratively down'"
+        return self.query(sql + " ORDER BY d.hostname, i.interface")
+
+    def port_vlan(self, port) -> list:
+        # the access VLAN of a port on every switch that has it
+        return self.query("SELECT d.hostname, p.host, p.port, p.vlan_id FROM vlan_ports p "
+                          "JOIN devices d ON d.host = p.host WHERE p.port = ? ORDER BY d.hostname", (port,))
+
+    def stale(self, max_age) -> list:
+        # devices not collected successfully within max_age seconds
+        return self.query("SELECT hostname, host, collected_at, error FROM devices "
+                          "WHERE collected_at IS NULL OR collected_at < ? OR error IS NOT NULL ORDER BY hostname",
+                          (time.time() - max_age,))
+
+    def query(self, sql, params=()) -> list:
+        return [dict(row) for row in self.db.execute(sql, params)]
+
+    def read_only_query(self, sql) -> list:
+        # for SQL typed by a user: a statement that would change the store fails with sqlite3.Error
+        self.db.execute('PRAGMA query_only = ON')
+        try:
+            return self.query(sql)
+        finally:
+            self.db.execute('PRAGMA query_only = OFF')
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _store(self, device, result) -> None:
+        host = result.host
+        device_type = 'switch' if isinstance(device, Switch) else 'router'
+        if not result.ok:
+            # keep the last good rows; only note the error
+            self.db.execute("INSERT INTO devices (host, hostname, type, error) VALUES (?, ?, ?, ?) "
+                            "ON CONFLICT (host) DO UPDATE SET hostname = excluded.hostname, error = excluded.error",
+                            (host, result.hostname, device_type, result.error))
+            return
+
+        self.db.execute("INSERT OR REPLACE INTO devices (host, hostname, type, collected_at, error) "
+                        "VALUES (?, ?, ?, ?, NULL)", (host, result.hostname, device_type, time.time()))
+        self.db.execute("DELETE FROM interfaces WHERE host = ?", (host,))
+        self.db.executemany("INSERT OR REPLACE INTO interfaces VALUES (?, ?, ?, ?, ?, ?)",
+                            [(host, row['interface'], row['ip_address'], row['method'], row['status'],
+                              row['protocol']) for row in result.output['interfaces']])
+        if 'vlans' in result.output:
+            self.db.execute("DELETE FROM vlans WHERE host = ?", (host,))
+            self.db.execute("DELETE FROM vlan_ports WHERE host = ?", (host,))
+            vlans = result.output['vlans']
+            self.db.executemany("INSERT OR REPLACE INTO vlans VALUES (?, ?, ?, ?)",
+                                [(host, vlan['vlan_id'], vlan['name'], vlan['status']) for vlan in vlans])
+            self.db.executemany("INSERT OR REPLACE INTO vlan_ports VALUES (?, ?, ?)",
+                                [(host, vlan['vlan_id'], port) for vlan in vlans for port in vlan['ports']])
+
+
+def print_rows(rows) -> None:
+    if not rows:
+        print("No matching rows.")
+        return
+    print(format_table(rows, [(key, key) for key in rows[0]]))
+    print(f"({len(rows)} row(s))")
+
+
+def main():
+    from Menu import load_devices_from_json
+
+    parser = argparse.ArgumentParser(description="Collect interface and VLAN tables from the fleet into SQLite "
+                                                 "and query them offline.")
+    parser.add_argument('--db', default='state.db', help="SQLite file (default: state.db)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    collect = commands.add_parser('collect', help="poll the devices and store their tables")
+    collect.add_argument('--devices', default='devices.json', help="device data file (default: devices.json)")
+    collect.add_argument('--type', help="only devices of this type (router/switch)")
+    collect.add_argument('--site', help="only devices of this site")
+    collect.add_argument('--group', help="only devices of this group")
+    collect.add_argument('--parallel', type=int, default=32, help="devices polled at the same time")
+    collect.add_argument('--timeout', type=int, default=120, help="per-device timeout in seconds")
+
+    vlan = commands.add_parser('vlan', help="devices that have a VLAN")
+    vlan.add_argument('vlan_id', type=int)
+    down = commands.add_parser('down', help="interfaces whose line protocol is down")
+    down.add_argument('--include-shutdown', action='store_true', help="also list administratively down ones")
+    port = commands.add_parser('port', help="VLAN of a port on every switch (e.g. Gi0/1)")
+    port.add_argument('port')
+    stale = commands.add_parser('stale', help="devices not collected successfully recently")
+    stale.add_argument('--max-age', type=int, default=86400, help="seconds (default: one day)")
+    sql = commands.add_parser('sql', help="run a read-only SQL query")
+    sql.add_argument('query')
+    args = parser.parse_args()
+
+    store = StateStore(args.db)
+    try:
+        if args.command == 'collect':
+            records = load_devices_from_json(args.devices).filter(type=args.type, site=args.site, group=args.group)
+            devices = []
+            for record in records:
+                try:
+                    devices.append(build_device(record))
+                except (KeyError, ValueError) as e:
+                    print(f"Skipping '{record.get('hostname', 'N/A')}': {e}")
+            results = store.collect(devices, args.parallel, args.timeout)
+            if any(not result.ok for result in results):
+                raise SystemExit(1)
+            return
+
+        start = time.perf_counter()
+        if args.command == 'vlan':
+            rows = store.devices_with_vlan(args.vlan_id)
+        elif args.command == 'down':
+            rows = store.interfaces_down(args.include_shutdown)
+        elif args.command == 'port':
+            rows = store.port_vlan(args.port)
+        elif args.command == 'stale':
+            rows = store.stale(args.max_age)
+        else:
+            # the store cannot be changed from the command line
+            try:
+                rows = store.read_only_query(args.query)
+            except sqlite3.Error as e:
+                print(f"Error: {e}", file=sys.stderr)
+                raise SystemExit(2)
+        print_rows(rows)
+        print(f"Query time: {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
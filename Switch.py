@@ -1,135 +1,278 @@
-from Device import Device
-
-
-class Switch(Device):
-    def config_security(self):  # Security configuration
-
-        # Warning for interface selection
-        print("\n==========================================================")
-        print("WARNING! Applying port security to the wrong interface")
-        print("(example: a management interface or trunk port) can result")
-        print("in loss of connectivity of the end device to the switch.")
-        print("==========================================================\n")
-
-        # Input interface
-        interface = input("Enter the ACCESS interface for port security (e.g., GigabitEthernet0/1): ")
-        if not interface:
-            print("Interface cannot be empty. Aborting.")
-            return
-
-        # Input vlan ID
-        access_vlan = input(f"Enter the VLAN ID for this access port {interface} (eg. 10): ")
-        if not access_vlan.isdigit():
-            print("Invalid VLAN ID. Aborting.")
-            return
-
-        print("\nConfigure Port Security Violation Action:")
-        print("1. shutdown (Port is disabled - most secure)")
-        print("2. restrict (Drops violating packets; logs and port stay up)")
-        print("3. protect (Drops violating packets, no logs sent, port stays up - least disruptive)")
-        violation_choice = input("Choose violation action (1/2/3, default 3 'protect'): ").strip()
-
-        violation_action = "switchport port-security violation protect"  # default
-        if violation_choice == '1':
-            violation_action = "switchport port-security violation shutdown"
-        elif violation_choice == '2':
-            violation_action = "switchport port-security violation restrict"
-
-        # Numb of allowed MAC Addresses
-        max_mac = input("Allow maximum how many MAC addresses on this port? (default 1): ").strip() or "1"
-        if not max_mac.isdigit() or int(max_mac) < 1:
-            print("Invalid input for maximum MACs. Defaulting to 1.")
-            max_mac = "1"
-
-        commands = [
-            f'interface {interface}',
-            'switchport mode access',
-            f'switchport access vlan {access_vlan}',
-            'switchport port-security',
-            f'switchport port-security maximum {max_mac}',
-            violation_action,
-            'spanning-tree portfast',
-            'spanning-tree bpduguard enable'
-        ]
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print("\nSending Port Security configuration commands...")
-                output = net_connect.send_config_set(commands)
-                print("--- Command Output ---")
-                print(output)
-                print("--- End of Output ---")
-                print(f"Port Security configuration attempted on {self.hostname}.")
-
-    def config_vlan(self):
-        # Input a VLAN ID and name
-        vlan_id = input("Enter the VLAN ID (1-4094): ")
-        vlan_name = input(f"Enter the name for VLAN {vlan_id} (e.g., DATA_VLAN): ")
-
-        if not (vlan_id.isdigit() and 1 <= int(vlan_id) <= 4094):
-            print("Invalid VLAN ID. Aborting.")
-            return
-        if not vlan_name:
-            print("VLAN name cannot be empty. Aborting.")
-            return
-
-        commands = [
-            f'vlan {vlan_id}',
-            f'name {vlan_name}'
-        ]
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print("\nSending VLAN configuration commands...")
-                output = net_connect.send_config_set(commands)
-                print("--- Command Output ---")
-                print(output)
-                print("--- End of Output ---")
-                print(f"VLAN {vlan_id} ({vlan_name}) configuration attempted on {self.hostname}.")
-
-    def show_vlan_brief(self):
-        # Sends the 'show vlan br' command to the device
-        command = 'show vlan brief'
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print(f"Sending command: {command}")
-                output = net_connect.send_command(command)
-                print(f"\n--- Output of '{command}' from {self.hostname} ---")
-                print(output)
-                print("--- End of Output ---")
-
-    def config_stp(self):
-        commands_to_send = []
-
-        # Choose if rapid pvst mode should be on (default) or not
-        stp_mode_choice = input("Set STP mode to 'rapid-pvst'? (yes/no, default yes): ").lower().strip()
-        if stp_mode_choice in ["yes", ""]:
-            commands_to_send.append('spanning-tree mode rapid-pvst')
-
-        # Input primary vlan ID
-        primary_vlan_str = input("Enter VLAN ID to be STP primary root (or press Enter to skip): ").strip()
-        if primary_vlan_str.isdigit():
-            commands_to_send.append(f'spanning-tree vlan {primary_vlan_str} root primary')
-
-        # Input sec vlan ID
-        secondary_vlan_str = input("Enter VLAN ID to be STP secondary root (or press Enter to skip): ").strip()
-        if secondary_vlan_str.isdigit():
-            if secondary_vlan_str == primary_vlan_str:
-                print(f"Cannot set VLAN {secondary_vlan_str} as secondary; it's already primary. Skipping.")
-            else:
-                commands_to_send.append(f'spanning-tree vlan {secondary_vlan_str} root secondary')
-
-        # if the user did not input any of the three options, the method will stop
-        if not commands_to_send:
-            print("No STP changes selected.")
-            return
-
-        with self._connect() as net_connect:
-            if net_connect:
-                print("\nSending STP configuration commands...")
-                output = net_connect.send_config_set(commands_to_send)
-                print("--- Command Output ---")
-                print(output)
-                print("--- End of Output ---")
-                print(f"STP configuration attempted on {self.hostname}.")
+import re
+
+from Device import Device
+from Parsers import parse_vlan_brief
+from Templates import DEFAULT_PLATFORM, template
+from Verification import checks_for
+
+VLAN_COLUMNS = [('vlan_id', 'VLAN'), ('name', 'Name'), ('status', 'Status'), ('ports', 'Ports')]
+# one part of an 'interface range': "GigabitEthernet1/0/1 - 48" -> ('GigabitEthernet1/0/', '1', '48')
+INTERFACE_RANGE = re.compile(r'^\s*([A-Za-z-]+\s*(?:\d+[/.])*)(\d+)\s*(?:-\s*(\d+))?\s*$')
+
+
+class Switch(Device):
+    # Each config method can be called with its parameters (for scripts and job files),
+    # or without them, in which case the values are asked for interactively.
+
+    def config_security(self, interface=None, access_vlan=None, violation='protect', max_mac=1):  # Security configuration
+        if interface is None:
+            # Warning for interface selection
+            print("\n==========================================================")
+            print("WARNING! Applying port security to the wrong interface")
+            print("(example: a management interface or trunk port) can result")
+            print("in loss of connectivity of the end device to the switch.")
+            print("==========================================================\n")
+
+            # Input interface
+            interface = input("Enter the ACCESS interface for port security (e.g., GigabitEthernet0/1): ")
+            if not interface:
+                print("Interface cannot be empty. Aborting.")
+                return
+
+            # Input vlan ID
+            access_vlan = input(f"Enter the VLAN ID for this access port {interface} (eg. 10): ")
+            if not access_vlan.isdigit():
+                print("Invalid VLAN ID. Aborting.")
+                return
+
+            print("\nConfigure Port Security Violation Action:")
+            print("1. shutdown (Port is disabled - most secure)")
+            print("2. restrict (Drops violating packets; logs and port stay up)")
+            print("3. protect (Drops violating packets, no logs sent, port stays up - least disruptive)")
+            violation_choice = input("Choose violation action (1/2/3, default 3 'protect'): ").strip()
+            violation = {'1': 'shutdown', '2': 'restrict'}.get(violation_choice, 'protect')
+
+            # Numb of allowed MAC Addresses
+            max_mac = input("Allow maximum how many MAC addresses on this port? (default 1): ").strip() or "1"
+            if not max_mac.isdigit() or int(max_mac) < 1:
+                print("Invalid input for maximum MACs. Defaulting to 1.")
+                max_mac = "1"
+
+        try:
+            commands = Switch.security_commands(interface, access_vlan, violation, max_mac, platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        self._send_config(commands, "Sending Port Security configuration commands...",
+                          f"Port Security configuration attempted on {self.hostname}.",
+                          checks_for('port_security', self.platform, interface=interface))
+
+    @staticmethod
+    def security_commands(interface, access_vlan, violation='protect', max_mac=1, platform=DEFAULT_PLATFORM) -> list:
+        # builds the port security command list for one access interface
+        if not interface:
+            raise ValueError("Interface cannot be empty.")
+        if not str(access_vlan).isdigit():
+            raise ValueError("Invalid VLAN ID.")
+        if violation not in ('shutdown', 'restrict', 'protect'):
+            raise ValueError(f"Invalid violation action '{violation}'.")
+        if not str(max_mac).isdigit() or int(max_mac) < 1:
+            raise ValueError("Invalid maximum number of MAC addresses.")
+
+        return template('port_security', platform)(interface=interface, access_vlan=access_vlan,
+                                                   max_mac=max_mac, violation=violation)
+
+    def config_vlan(self, vlan_id=None, vlan_name=None):
+        if vlan_id is None:
+            # Input a VLAN ID and name
+            vlan_id = input("Enter the VLAN ID (1-4094): ")
+            vlan_name = input(f"Enter the name for VLAN {vlan_id} (e.g., DATA_VLAN): ")
+
+        try:
+            commands = Switch.vlan_commands(vlan_id, vlan_name, platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        self._send_config(commands, "Sending VLAN configuration commands...",
+                          f"VLAN {vlan_id} ({vlan_name}) configuration attempted on {self.hostname}.",
+                          checks_for('vlan', self.platform, vlan_id=vlan_id, vlan_name=vlan_name))
+
+    @staticmethod
+    def vlan_commands(vlan_id, vlan_name, platform=DEFAULT_PLATFORM) -> list:
+        if not (str(vlan_id).isdigit() and 1 <= int(vlan_id) <= 4094):
+            raise ValueError("Invalid VLAN ID.")
+        if not vlan_name:
+            raise ValueError("VLAN name cannot be empty.")
+
+        return template('vlan', platform)(vlan_id=vlan_id, vlan_name=vlan_name)
+
+    def config_vlan_range(self, vlans=None, name_template=None):
+        # Creates many VLANs in one configuration set, e.g. vlans "10-29,40" with name_template "DATA_{id}"
+        if vlans is None:
+            vlans = input("Enter the VLAN IDs to create (e.g., 10-29,40): ").strip()
+            name_template = input("Enter the name template, {id} is replaced by the VLAN ID "
+                                  "(default VLAN_{id}): ").strip() or "VLAN_{id}"
+
+        try:
+            commands = Switch.vlan_range_commands(vlans, name_template or "VLAN_{id}", platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        vlan_count = len(commands) // 2
+        self._send_config(commands, f"Sending configuration for {vlan_count} VLANs...",
+                          f"Configuration of {vlan_count} VLANs attempted on {self.hostname}.",
+                          checks_for('vlan_range', self.platform, vlans=vlans, name_template=name_template))
+
+    @staticmethod
+    def vlan_range_commands(vlans, name_template="VLAN_{id}", platform=DEFAULT_PLATFORM) -> list:
+        commands = []
+        vlan_template = template('vlan', platform)
+        for vlan_id in Switch.parse_vlan_range(vlans):
+            try:
+                vlan_name = name_template.format(id=vlan_id)
+            except (KeyError, IndexError, ValueError):
+                raise ValueError(f"Invalid name template '{name_template}' (use {{id}} for the VLAN ID).")
+            if ' ' in vlan_name:
+                raise ValueError(f"VLAN name '{vlan_name}' cannot contain spaces.")
+            # the IDs are already validated by parse_vlan_range, so each VLAN is only rendered
+            commands += vlan_template(vlan_id=vlan_id, vlan_name=vlan_name)
+        return commands
+
+    @staticmethod
+    def parse_vlan_range(vlans) -> list:
+        # turns "10-12,20" (or a list of IDs/ranges) into [10, 11, 12, 20]
+        if isinstance(vlans, (list, tuple)):
+            vlans = ','.join(str(v) for v in vlans)
+        vlan_ids = set()
+        for part in str(vlans).replace(' ', '').split(','):
+            if not part:
+                continue
+            start, _, end = part.partition('-')
+            if not start.isdigit() or (end and not end.isdigit()):
+                raise ValueError(f"Invalid VLAN range '{part}'.")
+            first, last = int(start), int(end or start)
+            if not 1 <= first <= last <= 4094:
+                raise ValueError(f"Invalid VLAN range '{part}' (VLAN IDs are 1-4094).")
+            vlan_ids.update(range(first, last + 1))
+        if not vlan_ids:
+            raise ValueError("No VLAN IDs given.")
+        return sorted(vlan_ids)
+
+    @staticmethod
+    def parse_interface_range(interface_range) -> list:
+        # turns an 'interface range' argument ("Gi1/0/1 - 4, Gi1/0/10") into its interfaces:
+        # ['Gi1/0/1', 'Gi1/0/2', 'Gi1/0/3', 'Gi1/0/4', 'Gi1/0/10']
+        interfaces = []
+        for part in str(interface_range).split(','):
+            match = INTERFACE_RANGE.match(part)
+            if not match:
+                raise ValueError(f"Invalid interface range '{part.strip()}'.")
+            prefix, start, end = match.groups()
+            first, last = int(start), int(end or start)
+            if first > last:
+                raise ValueError(f"Invalid interface range '{part.strip()}' (the range ends before it starts).")
+            interfaces.extend(f"{prefix.replace(' ', '')}{number}" for number in range(first, last + 1))
+        return interfaces
+
+    def config_security_range(self, interface_range=None, access_vlan=None, violation='protect', max_mac=1):
+        # Applies one port security profile to a whole 'interface range' in one configuration set
+        if interface_range is None:
+            print("\n==========================================================")
+            print("WARNING! Every interface in the range becomes an access port")
+            print("with port security. Make sure no trunk or uplink is included.")
+            print("==========================================================\n")
+            interface_range = input("Enter the ACCESS interface range (e.g., GigabitEthernet0/1 - 24): ").strip()
+            access_vlan = input("Enter the VLAN ID for these access ports (eg. 10): ").strip()
+            violation_choice = input("Violation action: 1. shutdown, 2. restrict, 3. protect (default 3): ").strip()
+            violation = {'1': 'shutdown', '2': 'restrict'}.get(violation_choice, 'protect')
+            max_mac = input("Allow maximum how many MAC addresses per port? (default 1): ").strip() or "1"
+
+        try:
+            commands = Switch.security_range_commands(interface_range, access_vlan, violation, max_mac,
+                                                      platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        self._send_config(commands, f"Sending Port Security configuration for {interface_range}...",
+                          f"Port Security configuration of {interface_range} attempted on {self.hostname}.",
+                          checks_for('port_security_range', self.platform, interface_range=interface_range))
+
+    @staticmethod
+    def security_range_commands(interface_range, access_vlan, violation='protect', max_mac=1,
+                                platform=DEFAULT_PLATFORM) -> list:
+        # same profile as security_commands, applied with 'interface range' (IOS accepts up to 5 ranges)
+        if not interface_range:
+            raise ValueError("Interface range cannot be empty.")
+        if len(str(interface_range).split(',')) > 5:
+            raise ValueError("An interface range can contain at most 5 ranges.")
+        Switch.parse_interface_range(interface_range)
+        return Switch.security_commands(f'range {interface_range}', access_vlan, violation, max_mac, platform)
+
+    def show_vlan_brief(self, refresh=False):
+        # Shows the 'show vlan br' output as a table (served from the cache unless refresh is set)
+        self._print_show('show vlan brief', parse_vlan_brief, VLAN_COLUMNS, refresh)
+
+    def vlans(self, refresh=False) -> list:
+        # 'show vlan brief' as a list of dicts: vlan_id, name, status, ports
+        return self.show_structured('show vlan brief', parse_vlan_brief, refresh)
+
+    def config_stp(self, rapid_pvst=None, primary_vlan=None, secondary_vlan=None):
+        if rapid_pvst is None:
+            # Choose if rapid pvst mode should be on (default) or not
+            stp_mode_choice = input("Set STP mode to 'rapid-pvst'? (yes/no, default yes): ").lower().strip()
+            rapid_pvst = stp_mode_choice in ["yes", ""]
+
+            # Input primary vlan ID
+            primary_vlan = input("Enter VLAN ID to be STP primary root (or press Enter to skip): ").strip()
+            if not primary_vlan.isdigit():
+                primary_vlan = None
+
+            # Input sec vlan ID
+            secondary_vlan = input("Enter VLAN ID to be STP secondary root (or press Enter to skip): ").strip()
+            if not secondary_vlan.isdigit():
+                secondary_vlan = None
+            elif secondary_vlan == primary_vlan:
+                print(f"Cannot set VLAN {secondary_vlan} as secondary; it's already primary. Skipping.")
+                secondary_vlan = None
+
+        try:
+            commands_to_send = Switch.stp_commands(rapid_pvst, primary_vlan, secondary_vlan, platform=self.platform)
+        except ValueError as e:
+            print(f"{e} Aborting.")
+            return
+
+        # if the user did not input any of the three options, the method will stop
+        if not commands_to_send:
+            print("No STP changes selected.")
+            return
+
+        self._send_config(commands_to_send, "Sending STP configuration commands...",
+                          f"STP configuration attempted on {self.hostname}.",
+                          checks_for('stp', self.platform, rapid_pvst=rapid_pvst))
+
+    @staticmethod
+    def stp_commands(rapid_pvst=True, primary_vlan=None, secondary_vlan=None, platform=DEFAULT_PLATFORM) -> list:
+        for vlan in (primary_vlan, secondary_vlan):
+            if vlan is not None and not str(vlan).isdigit():
+                raise ValueError(f"Invalid VLAN ID '{vlan}'.")
+        if primary_vlan is not None and str(primary_vlan) == str(secondary_vlan):
+            raise ValueError(f"Cannot set VLAN {secondary_vlan} as both primary and secondary root.")
+        return template('stp', platform)(rapid_pvst=rapid_pvst, primary_vlan=primary_vlan,
+                                         secondary_vlan=secondary_vlan)
+
+    # --- async API (see Device.run_command_async); parameters as in the *_commands builders ---
+
+    async def show_vlan_brief_async(self, refresh=False) -> list:
+        return await self.show_structured_async('show vlan brief', parse_vlan_brief, refresh)
+
+    async def config_vlan_async(self, vlan_id, vlan_name) -> str:
+        return await self.push_config_async(Switch.vlan_commands(vlan_id, vlan_name, platform=self.platform))
+
+    async def config_vlan_range_async(self, vlans, name_template="VLAN_{id}") -> str:
+        return await self.push_config_async(Switch.vlan_range_commands(vlans, name_template, platform=self.platform))
+
+    async def config_security_async(self, interface, access_vlan, violation='protect', max_mac=1) -> str:
+        return await self.push_config_async(Switch.security_commands(interface, access_vlan, violation, max_mac,
+                                                                    platform=self.platform))
+
+    async def config_security_range_async(self, interface_range, access_vlan, violation='protect', max_mac=1) -> str:
+        return await self.push_config_async(
+            Switch.security_range_commands(interface_range, access_vlan, violation, max_mac, platform=self.platform))
+
+    async def config_stp_async(self, rapid_pvst=True, primary_vlan=None, secondary_vlan=None) -> str:
+        return await self.push_config_async(Switch.stp_commands(rapid_pvst, primary_vlan, secondary_vlan,
+                                                                platform=self.platform))
@@ -0,0 +1,198 @@
+import threading
+from string import Formatter
+
+# Command templates of every configuration operation, per platform (Netmiko device_type).
+# Each line is rendered with the operation's values:
+#   {name}    is replaced by the value; the line is left out when the value is None
+#   {*name}   repeats the line for every item of a list value
+#   {?name}   at the start of a line keeps the line only when the value is true
+TEMPLATES = {
+    'vlan': {
+        'cisco_ios': ['vlan {vlan_id}', 'name {vlan_name}'],
+        'cisco_nxos': ['vlan {vlan_id}', 'name {vlan_name}'],
+    },
+    'port_security': {
+        'cisco_ios': [
+            'interface {interface}',
+            'switchport mode access',
+            'switchport access vlan {access_vlan}',
+            'switchport port-security',
+            'switchport port-security maximum {max_mac}',
+            'switchport port-security violation {violation}',
+            'spanning-tree portfast',
+            'spanning-tree bpduguard enable',
+        ],
+        'cisco_nxos': [
+            'feature port-security',
+            'interface {interface}',
+            'switchport',
+            'switchport mode access',
+            'switchport access vlan {access_vlan}',
+            'switchport port-security',
+            'switchport port-security maximum {max_mac}',
+            'switchport port-security violation {violation}',
+            'spanning-tree port type edge',
+            'spanning-tree bpduguard enable',
+        ],
+    },
+    'stp': {
+        'cisco_ios': [
+            '{?rapid_pvst}spanning-tree mode rapid-pvst',
+            'spanning-tree vlan {primary_vlan} root primary',
+            'spanning-tree vlan {secondary_vlan} root secondary',
+        ],
+        'cisco_nxos': [
+            '{?rapid_pvst}spanning-tree mode rapid-pvst',
+            'spanning-tree vlan {primary_vlan} root primary',
+            'spanning-tree vlan {secondary_vlan} root secondary',
+        ],
+    },
+    'dhcp_server': {
+        'cisco_ios': [
+            'ip dhcp pool {pool_name}',
+            'network {network_address} {netmask}',
+            'default-router {default_router}',
+            'dns-server {dns_server}',
+            '{?excluded_start}exit',
+            'ip dhcp excluded-address {excluded_start} {excluded_end}',
+        ],
+    },
+    'dhcp_helper': {
+        'cisco_ios': ['interface {interface}', 'ip helper-address {helper_address}'],
+        'cisco_nxos': ['feature dhcp', 'interface {interface}', 'ip dhcp relay address {helper_address}'],
+    },
+    'dhcp_client': {
+        'cisco_ios': ['interface {interface}', 'ip address dhcp', 'no shutdown'],
+    },
+    'hsrp': {
+        'cisco_ios': [
+            'interface {interface}',
+            'encapsulation dot1q {encapsulation_vlan}',
+            'ip address {real_ip} {subnet_mask}',
+            'standby version 2',
+            'standby {group_id} ip {virtual_ip}',
+            'standby {group_id} priority {priority}',
+            '{?preempt}standby {group_id} preempt',
+        ],
+        'cisco_nxos': [
+            'feature hsrp',
+            'interface {interface}',
+            'encapsulation dot1q {encapsulation_vlan}',
+            'ip address {real_ip}/{prefix_length}',
+            'hsrp version 2',
+            'hsrp {group_id}',
+            'ip {virtual_ip}',
+            'priority {priority}',
+            '{?preempt}preempt',
+        ],
+    },
+    'ripv2': {
+        'cisco_ios': [
+            'router rip',
+            'version 2',
+            'no auto-summary',
+            'network {*networks}',
+            '{?redistribute_static}redistribute static',
+        ],
+    },
+}
+
+# Netmiko device types that take the commands of another platform
+PLATFORM_ALIASES = {
+    'cisco_xe': 'cisco_ios',
+    'cisco_ios_telnet': 'cisco_ios',
+    'cisco_ios_serial': 'cisco_ios',
+    'cisco_nxos_ssh': 'cisco_nxos',
+}
+DEFAULT_PLATFORM = 'cisco_ios'
+
+_compiled = {}  # (operation, platform) -> render function
+_compile_lock = threading.Lock()
+
+
+def platform_for(device_type) -> str:
+    # device types without templates of their own (e.g. 'autodetect') get the IOS syntax, as before
+    device_type = PLATFORM_ALIASES.get(device_type, device_type)
+    known = {platform for templates in TEMPLATES.values() for platform in templates}
+    return device_type if device_type in known else DEFAULT_PLATFORM
+
+
+def render(operation, platform=DEFAULT_PLATFORM, **values) -> list:
+    # the command lines of an operation for a platform
+    return template(operation, platform)(**values)
+
+
+def template(operation, platform=DEFAULT_PLATFORM):
+    # the compiled renderer of an operation for a platform, a function taking the values as keyword
+    # arguments; the template is compiled on first use. Builders that render many times (e.g. a range
+    # of VLANs) call the renderer directly.
+    renderer = _compiled.get((operation, platform))
+    if renderer is not None:
+        return renderer
+    with _compile_lock:
+        key = (operation, platform)
+        if key not in _compiled:
+            resolved = platform_for(platform)
+            lines = TEMPLATES.get(operation, {}).get(resolved)
+            if lines is None:
+                raise ValueError(f"Operation '{operation}' is not available for {platform} devices.")
+            _compiled[key] = _build_renderer(operation, resolved, lines)
+        return _compiled[key]
+
+
+def _build_renderer(operation, platform, lines):
+    # turns the template into the source of one Python function taking the values as keyword arguments,
+    # with an f-string per line; it is compiled once, so rendering does not parse the template again
+    names = set()
+    body = []
+    literal_run = []  # consecutive lines without conditions, emitted as one list display
+
+    def flush():
+        if literal_run:
+            body.append(f"    lines += [{', '.join(literal_run)}]")
+            literal_run.clear()
+
+    for line in lines:
+        conditions = []
+        if line.startswith('{?'):
+            flag, _, line = line[2:].partition('}')
+            conditions.append(flag)
+            names.add(flag)
+
+        text, loop_field = '', None
+        for literal, field, _, _ in Formatter().parse(line):
+            text += literal.replace('{', '{{').replace('}', '}}')
+            if field is None:
+                continue
+            if field.startswith('*'):
+                loop_field = field[1:]
+                names.add(loop_field)
+                text += '{item}'
+            else:
+                conditions.append(f"{field} is not None")
+                names.add(field)
+                text += f'{{{field}}}'
+
+        if not conditions and not loop_field:
+            literal_run.append(f"f{text!r}")
+            continue
+        flush()
+        indent = '    '
+        if conditions:
+            body.append(f"{indent}if {' and '.join(dict.fromkeys(conditions))}:")
+            indent += '    '
+        if loop_field:
+            body.append(f"{indent}lines += [f{text!r} for item in {loop_field}]")
+        else:
+            body.append(f"{indent}lines.append(f{text!r})")
+    flush()
+
+    for name in names:
+        if not name.isidentifier():
+            raise ValueError(f"Invalid field '{name}' in the {platform} template of '{operation}'.")
+    # values used only by the templates of other platforms (e.g. prefix_length) are accepted and ignored
+    source = '\n'.join([f"def render(*, {''.join(name + ', ' for name in sorted(names))}**_):",
+                        '    lines = []'] + body + ['    return lines'])
+    namespace = {}
+    exec(compile(source, f'<template {operation}/{platform}>', 'exec'), namespace)
+    return namespace['render']
@@ -0,0 +1,373 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from Fleet import build_device
+from Parsers import format_table, parse_cdp_neighbors_detail, parse_lldp_neighbors_detail
+from RunningConfig import normalize
+from Vault import SECRET_FIELDS, vault
+
+# neighbor tables read from every device, in one batch; CDP comes first, LLDP adds the ports CDP does not list
+NEIGHBOR_COMMANDS = {
+    'cdp': ('show cdp neighbors detail', parse_cdp_neighbors_detail),
+    'lldp': ('show lldp neighbors detail', parse_lldp_neighbors_detail),
+}
+# seconds a device's neighbors are taken from the cache before it is asked again
+CACHE_MAX_AGE = 3600
+# hops beyond the inventory that neighbors missing from devices.json are crawled; none unless asked for, as
+# CDP/LLDP is unauthenticated: a crawled neighbor is sent the credentials of the device that found it, so
+# anything on the wire advertising an address would receive the fleet's passwords
+MAX_DEPTH = 0
+# devices a crawl logs in to at most; neighbors found beyond this are recorded but not crawled
+MAX_DEVICES = 5000
+CACHE_VERSION = 1
+
+IPV4 = re.compile(r'^\d+\.\d+\.\d+\.\d+$')
+
+
+def node_name(device_id) -> str:
+    # CDP and LLDP may send the domain and the serial number with the hostname: 'SW2.lab.local(FOX1234)' -> 'SW2'
+    name = re.sub(r'\(.*\)$', '', device_id.strip())
+    return name if IPV4.match(name) else name.split('.')[0]
+
+
+def full_interface(name) -> str:
+    # LLDP prints short interface names ('Gi0/1'), CDP full ones; the graph always uses the full names
+    return normalize(f"interface {name}")[len('interface '):]
+
+
+def device_kind(capabilities):
+    # 'switch' or 'router' for neighbors that can be crawled, None for phones, hosts, access points...
+    # LLDP phones (B,T) and access points (B,W) also advertise B for their built-in bridge
+    if 'Switch' in capabilities:
+        return 'switch'
+    if 'T' in capabilities or 'W' in capabilities:
+        return None
+    if 'B' in capabilities:
+        return 'switch'
+    if 'Router' in capabilities or 'R' in capabilities:
+        return 'router'
+    return None
+
+
+class Topology:
+    # Adjacency graph of the network, discovered from the CDP/LLDP neighbors of every device and cached in
+    # topology.json. A crawl starts from the inventory; with max_depth it also logs in to neighbors missing
+    # from it (with the credentials of the device that found them, see MAX_DEPTH). Devices whose neighbors were
+    # read less than max_age seconds ago are taken from the cache, so a refresh only asks the devices that are
+    # out of date.
+    def __init__(self, path='topology.json'):
+        self.path = path
+        self.nodes = {}  # name -> {'ip_address', 'type', 'platform', 'source', 'crawled_at', 'error', 'neighbors'}
+        self.crawled_at = None
+        self._load()
+
+    def crawl(self, records, max_workers=32, max_depth=MAX_DEPTH, max_devices=MAX_DEVICES, max_age=CACHE_MAX_AGE,
+              read_timeout=60) -> dict:
+        # Every inventory device is queued at once and a neighbor is queued as soon as the device that found it
+        # answers, so up to max_workers devices are asked at any time and the crawl takes about
+        # (devices / max_workers + hops beyond the inventory) round trips. Returns the counts of devices
+        # polled, cached, failed and discovered, and of neighbors skipped because of max_devices.
+        start = time.monotonic()
+        inventory = {}  # name -> devices.json entry
+        by_ip = {}
+        for record in records:
+            entry = record.as_dict() if hasattr(record, 'as_dict') else dict(record)
+            inventory[node_name(entry['hostname'])] = entry
+            by_ip[entry['ip_address']] = node_name(entry['hostname'])
+        by_lower_name = {name.lower(): name for name in inventory}
+        vault.unlock_for(entry.get(field) for entry in inventory.values() for field in SECRET_FIELDS)
+
+        nodes = {}  # the graph of this crawl; devices no longer reachable from the inventory drop out of it
+        frontier = deque()  # (name, entry, depth) waiting for a worker
+        stats = dict.fromkeys(('polled', 'cached', 'failed', 'discovered', 'skipped'), 0)
+        queued = 0
+
+        def add(name, details, entry, depth):
+            nonlocal queued
+            nodes[name] = details
+            if entry is None:
+                return
+            if queued >= max_devices:
+                stats['skipped'] += 1
+                return
+            queued += 1
+            frontier.append((name, entry, depth))
+
+        def resolve(neighbor) -> str:
+            # the inventory name of a neighbor when its address or hostname is known, else its CDP/LLDP name
+            name = node_name(neighbor['neighbor'])
+            return by_ip.get(neighbor['ip_address']) or by_lower_name.get(name.lower()) or name
+
+        def expand(name, entry, depth):
+            for neighbor in nodes[name]['neighbors']:
+                other = neighbor['neighbor']
+                kind = device_kind(neighbor['capabilities'])
+                if other in nodes:
+                    nodes[other]['platform'] = nodes[other]['platform'] or neighbor['platform']
+                    continue
+                # devices missing from the inventory are logged in to like the device that found them
+                crawlable = kind and neighbor['ip_address'] and depth < max_depth
+                stats['discovered'] += 1
+                add(other, _node(neighbor['ip_address'], kind, neighbor['platform'], 'discovered'),
+                    dict(entry, type=kind, hostname=other, ip_address=neighbor['ip_address']) if crawlable else None,
+                    depth + 1)
+
+        for name, entry in inventory.items():
+            add(name, _node(entry['ip_address'], entry['type'], '', 'inventory'), entry, 0)
+
+        now = time.time()
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='topology')
+        running = {}
+        try:
+            while frontier or running:
+                while frontier and len(running) < max_workers:
+                    name, entry, depth = frontier.popleft()
+                    cached = self.nodes.get(name)
+                    if cached and not cached.get('error') and cached.get('crawled_at') and \
+                            now - cached['crawled_at'] < max_age:
+                        nodes[name].update(crawled_at=cached['crawled_at'], neighbors=cached['neighbors'])
+                        stats['cached'] += 1
+                        expand(name, entry, depth)
+                    else:
+                        running[executor.submit(self._poll, entry, read_timeout)] = (name, entry, depth)
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, entry, depth = running.pop(future)
+                    node = nodes[name]
+                    try:
+                        neighbors = future.result()
+                    except Exception as e:
+                        # the neighbors seen last time are kept, so one unreachable device does not cut the graph
+                        node['error'] = str(e) or type(e).__name__
+                        node['neighbors'] = (self.nodes.get(name) or {}).get('neighbors', [])
+                        node['crawled_at'] = (self.nodes.get(name) or {}).get('crawled_at')
+                        stats['failed'] += 1
+                        print(f"FAILED {name} ({entry['ip_address']}): {node['error']}")
+                    else:
+                        for neighbor in neighbors:
+                            neighbor['neighbor'] = resolve(neighbor)
+                        node.update(neighbors=neighbors, crawled_at=time.time(), error=None)
+                        stats['polled'] += 1
+                        print(f"OK     {name} ({entry['ip_address']}): {len(neighbors)} neighbor(s)")
+                    expand(name, entry, depth)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        self.nodes = nodes
+        self.crawled_at = time.time()
+        self.save()
+        print(f"Crawled {stats['polled']} device(s) ({stats['cached']} from the cache, {stats['failed']} failed); "
+              f"{len(nodes)} device(s) and {len(self.links())} link(s) saved to '{self.path}' "
+              f"in {time.monotonic() - start:.1f}s.")
+        if stats['skipped']:
+            print(f"{stats['skipped']} neighbor(s) were not crawled: the limit of {max_devices} device(s) was reached.")
+        return stats
+
+    def graph(self) -> dict:
+        # name -> sorted neighbor names; a link reported by one side only is included in both directions
+        adjacency = {name: set() for name in self.nodes}
+        for name, node in self.nodes.items():
+            for neighbor in node['neighbors']:
+                adjacency[name].add(neighbor['neighbor'])
+                adjacency.setdefault(neighbor['neighbor'], set()).add(name)
+        return {name: sorted(others) for name, others in adjacency.items()}
+
+    def links(self) -> list:
+        # every link once, as seen from the device whose name sorts first
+        links = {}
+        for name, node in self.nodes.items():
+            for neighbor in node['neighbors']:
+                ends = sorted([(name, neighbor['interface']), (neighbor['neighbor'], neighbor['neighbor_interface'])])
+                links.setdefault(tuple(ends), neighbor['protocol'])
+        return [{'device': left[0], 'interface': left[1], 'neighbor': right[0], 'neighbor_interface': right[1],
+                 'protocol': protocol} for (left, right), protocol in sorted(links.items())]
+
+    def neighbors(self, name) -> list:
+        name = self._find(name)
+        return [link for link in self.links() if name in (link['device'], link['neighbor'])]
+
+    def stp_roots(self) -> list:
+        # switches ordered by how well they suit the STP root: fewest hops to the farthest switch of their
+        # switched domain first, then most links; the first two are the primary and secondary root candidates
+        switches = self._switch_graph()
+        ranking = []
+        for domain in self._domains(switches):
+            for name in domain:
+                ranking.append((-len(domain), _eccentricity(switches, name), -len(switches[name]), name))
+        return [{'switch': name, 'domain_size': -size, 'max_hops': hops, 'links': -links}
+                for size, hops, links, name in sorted(ranking)]
+
+    def gateway_groups(self) -> list:
+        # the routers attached to each switched domain: routers of the same group can serve as an HSRP pair
+        switches = self._switch_graph()
+        adjacency = self.graph()
+        groups = []
+        for domain in self._domains(switches):
+            routers = sorted({other for name in domain for other in adjacency.get(name, ())
+                              if self.nodes.get(other, {}).get('type') == 'router'})
+            if routers:
+                groups.append({'switches': domain, 'routers': routers})
+        return groups
+
+    def save(self) -> None:
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as file:
+            json.dump({'version': CACHE_VERSION, 'crawled_at': self.crawled_at, 'nodes': self.nodes}, file, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _load(self) -> None:
+        # a missing or unreadable cache only means that every device is asked again
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring the topology cache '{self.path}': {e}", file=sys.stderr)
+            return
+        if isinstance(data, dict) and data.get('version') == CACHE_VERSION:
+            self.nodes = data.get('nodes', {})
+            self.crawled_at = data.get('crawled_at')
+
+    def _find(self, name) -> str:
+        if name in self.nodes:
+            return name
+        for other, node in self.nodes.items():
+            if other.lower() == name.lower() or node.get('ip_address') == name:
+                return other
+        raise KeyError(f"'{name}' is not in the topology '{self.path}'.")
+
+    def _switch_graph(self) -> dict:
+        return {name: [other for other in others if self.nodes.get(other, {}).get('type') == 'switch']
+                for name, others in self.graph().items() if self.nodes.get(name, {}).get('type') == 'switch'}
+
+    @staticmethod
+    def _domains(switches) -> list:
+        # connected groups of switches, largest first
+        domains, seen = [], set()
+        for name in sorted(switches):
+            if name in seen:
+                continue
+            hops = _hops(switches, name)
+            seen.update(hops)
+            domains.append(sorted(hops))
+        return sorted(domains, key=len, reverse=True)
+
+    @staticmethod
+    def _poll(entry, read_timeout) -> list:
+        # the merged CDP and LLDP neighbors of one device, with full interface names
+        device = build_device(entry)
+        outputs = device.run_commands([command for command, _ in NEIGHBOR_COMMANDS.values()],
+                                      read_timeout=read_timeout)
+        neighbors, ports = [], set()
+        for protocol, (command, parser) in NEIGHBOR_COMMANDS.items():
+            for neighbor in parser(outputs.get(command, '')):
+                interface = full_interface(neighbor['interface'])
+                if interface in ports:
+                    continue
+                ports.add(interface)
+                neighbors.append(dict(neighbor, interface=interface,
+                                      neighbor_interface=full_interface(neighbor['neighbor_interface']),
+                                      protocol=protocol))
+        return neighbors
+
+
+def _node(ip_address, kind, platform, source) -> dict:
+    return {'ip_address': ip_address, 'type': kind, 'platform': platform, 'source': source, 'crawled_at': None,
+            'error': None, 'neighbors': []}
+
+
+def _hops(adjacency, start) -> dict:
+    # breadth-first hop counts from start to every device it reaches
+    hops = {start: 0}
+    queue = deque([start])
+    while queue:
+        name = queue.popleft()
+        for other in adjacency.get(name, ()):
+            if other not in hops:
+                hops[other] = hops[name] + 1
+                queue.append(other)
+    return hops
+
+
+def _eccentricity(adjacency, name) -> int:
+    return max(_hops(adjacency, name).values())
+
+
+def main():
+    from Menu import load_devices_from_json
+
+    parser = argparse.ArgumentParser(description="Discover how the devices are connected from their CDP/LLDP "
+                                                 "neighbors and query the cached topology.")
+    parser.add_argument('--cache', default='topology.json', help="topology cache file (default: topology.json)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    crawl = commands.add_parser('crawl', help="read the neighbors of the devices and update the cache")
+    crawl.add_argument('--devices', default='devices.json', help="device data file (default: devices.json)")
+    crawl.add_argument('--site', help="only start from devices of this site")
+    crawl.add_argument('--group', help="only start from devices of this group")
+    crawl.add_argument('--parallel', type=int, default=32, help="devices asked at the same time")
+    crawl.add_argument('--max-depth', type=int, default=MAX_DEPTH,
+                       help=f"hops beyond the inventory to crawl (default: {MAX_DEPTH}, the inventory only); "
+                            f"neighbors found over CDP/LLDP are sent the credentials of the device that found them")
+    crawl.add_argument('--max-devices', type=int, default=MAX_DEVICES,
+                       help=f"devices logged in to at most (default: {MAX_DEVICES})")
+    crawl.add_argument('--max-age', type=int, default=CACHE_MAX_AGE,
+                       help=f"seconds cached neighbors are reused (default: {CACHE_MAX_AGE})")
+    crawl.add_argument('--full', action='store_true', help="ask every device again, ignoring the cache")
+    crawl.add_argument('--timeout', type=int, default=60, help="seconds a device may take to answer")
+
+    commands.add_parser('links', help="every link of the topology")
+    neighbors = commands.add_parser('neighbors', help="the links of one device")
+    neighbors.add_argument('device', help="hostname or IP address")
+    commands.add_parser('roots', help="switches best suited as STP root, per switched domain")
+    commands.add_parser('gateways', help="routers attached to each switched domain (HSRP pair candidates)")
+    args = parser.parse_args()
+
+    topology = Topology(args.cache)
+    if args.command == 'crawl':
+        records = load_devices_from_json(args.devices).filter(site=args.site, group=args.group)
+        if not records:
+            print("No devices to start from.")
+            raise SystemExit(2)
+        stats = topology.crawl(records, args.parallel, args.max_depth, args.max_devices,
+                               0 if args.full else args.max_age, args.timeout)
+        if stats['failed']:
+            raise SystemExit(1)
+        return
+
+    if not topology.nodes:
+        print(f"No topology in '{args.cache}'; run 'python3 Topology.py crawl' first.")
+        raise SystemExit(2)
+    if args.command == 'links':
+        rows = topology.links()
+    elif args.command == 'neighbors':
+        try:
+            rows = topology.neighbors(args.device)
+        except KeyError as e:
+            print(f"Error: {e.args[0]}")
+            raise SystemExit(2)
+    elif args.command == 'roots':
+        rows = topology.stp_roots()
+    else:
+        rows = [{'switches': ', '.join(group['switches']), 'routers': ', '.join(group['routers'])}
+                for group in topology.gateway_groups()]
+
+    if not rows:
+        print("No matching rows.")
+        return
+    print(format_table(rows, [(key, key) for key in rows[0]]))
+    print(f"({len(rows)} row(s); crawled {time.strftime('%Y-%m-%d %H:%M', time.localtime(topology.crawled_at))})")
+
+
+if __name__ == "__main__":
+    main()
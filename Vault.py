@@ -0,0 +1,292 @@
+import argparse
+import base64
+import getpass
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+# devices.json values of this form are looked up in the vault: "password": "vault:core-admin"
+REFERENCE_PREFIX = 'vault:'
+# seconds a decrypted secret is kept in memory before it is decrypted again
+SECRET_TTL = 900
+# scrypt cost parameters for deriving the key from the passphrase (about 0.1s, done once per run)
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 15, 8, 1
+# plaintext of the token that tells a wrong passphrase from a right one, also in a vault without secrets
+CHECK_VALUE = b'netauto-vault'
+PASSPHRASE_VARIABLE = 'NETAUTO_VAULT_PASSPHRASE'
+# the fields of Device.device_details that may hold references
+SECRET_FIELDS = ('password', 'secret')
+
+
+class VaultError(Exception):
+    pass
+
+
+def is_reference(value) -> bool:
+    return isinstance(value, str) and value.startswith(REFERENCE_PREFIX)
+
+
+class Vault:
+    # Device passwords encrypted in a local file (vault.json) with a key derived from a passphrase. The key is
+    # derived once, when the first secret is needed, and kept in memory for the rest of the run; decrypted
+    # secrets are kept for 'ttl' seconds, so a job on thousands of devices that share credentials decrypts
+    # them once instead of once per connection.
+    def __init__(self, path='vault.json', ttl=SECRET_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._fernet = None
+        self._data = None  # contents of the vault file: salt, scrypt parameters, check token, secrets
+        self._signature = None  # (mtime, size) of the file when it was read
+        self._cache = {}  # name -> (secret, monotonic time it expires)
+        self._error = None  # a wrong passphrase is not asked for again in the same run
+        self._lock = threading.Lock()
+
+    def unlock(self, passphrase=None) -> None:
+        # derives the key; the passphrase comes from the argument, NETAUTO_VAULT_PASSPHRASE or a prompt
+        with self._lock:
+            self._unlock_locked(passphrase)
+
+    def unlock_for(self, values, attempts=1) -> None:
+        # unlocks the vault now if any of the values is a reference, so a fleet job asks for the passphrase once
+        # and not from every worker thread; after a failure the devices report the error when they connect.
+        # A wrong passphrase is asked for again up to `attempts` times in all (the menu allows a few typos).
+        if not any(is_reference(value) for value in values):
+            return
+        for attempt in range(attempts):
+            try:
+                # retries always prompt, as the first passphrase may have come from the environment
+                self.unlock(getpass.getpass(f"Passphrase of '{self.path}': ") if attempt else None)
+                return
+            except VaultError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                if e is not self._error:
+                    return
+
+    def lock(self) -> None:
+        # forgets the key and every decrypted secret
+        with self._lock:
+            self._fernet = None
+            self._error = None
+            self._cache.clear()
+
+    def get(self, name) -> str:
+        cached = self._cache.get(name)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        with self._lock:
+            self._unlock_locked()
+            token = self._data['secrets'].get(name)
+            if token is None:
+                raise VaultError(f"No secret named '{name}' in the vault '{self.path}'.")
+            secret = self._decrypt(token).decode()
+            self._cache[name] = (secret, time.monotonic() + self.ttl)
+            return secret
+
+    def resolve(self, value):
+        # the secret a devices.json value refers to, or the value itself when it is not a reference
+        return self.get(value[len(REFERENCE_PREFIX):]) if is_reference(value) else value
+
+    def resolve_details(self, device_details) -> dict:
+        # connection details with the referenced secrets filled in; the original dict is not changed, so the
+        # secrets are only held by the connection being opened
+        if not any(is_reference(device_details.get(field)) for field in SECRET_FIELDS):
+            return device_details
+        resolved = dict(device_details)
+        for field in SECRET_FIELDS:
+            if field in resolved:
+                resolved[field] = self.resolve(resolved[field])
+        return resolved
+
+    def names(self) -> list:
+        with self._lock:
+            return sorted(self._read()['secrets'])
+
+    def create(self, passphrase) -> None:
+        if os.path.exists(self.path):
+            raise VaultError(f"The vault '{self.path}' already exists.")
+        salt = os.urandom(16)
+        data = {'kdf': 'scrypt', 'salt': base64.b64encode(salt).decode(), 'n': SCRYPT_N, 'r': SCRYPT_R,
+                'p': SCRYPT_P, 'secrets': {}}
+        with self._lock:
+            self._fernet = _fernet(passphrase, data)
+            data['check'] = self._fernet.encrypt(CHECK_VALUE).decode()
+            self._data = data
+            self._write()
+
+    def set(self, name, secret) -> None:
+        with self._lock:
+            self._unlock_locked()
+            self._data['secrets'][name] = self._fernet.encrypt(secret.encode()).decode()
+            self._cache.pop(name, None)
+            self._write()
+
+    def remove(self, name) -> None:
+        with self._lock:
+            self._unlock_locked()
+            if self._data['secrets'].pop(name, None) is None:
+                raise VaultError(f"No secret named '{name}' in the vault '{self.path}'.")
+            self._cache.pop(name, None)
+            self._write()
+
+    def _unlock_locked(self, passphrase=None) -> None:
+        data = self._read()
+        if self._fernet is not None:
+            return
+        # a wrong passphrase is not asked for again, but one given explicitly (a retry) is always tried
+        if self._error is not None and passphrase is None:
+            raise self._error
+        if passphrase is None:
+            passphrase = os.environ.get(PASSPHRASE_VARIABLE) or getpass.getpass(f"Passphrase of '{self.path}': ")
+        fernet = _fernet(passphrase, data)
+        self._fernet = fernet
+        try:
+            self._decrypt(data['check'])
+        except VaultError:
+            self._fernet = None
+            self._error = VaultError(f"Wrong passphrase for the vault '{self.path}'.")
+            raise self._error
+        self._error = None
+
+    def _read(self) -> dict:
+        # the file is read again only when it changed (e.g. a secret was set from another terminal); the key is
+        # kept unless the vault was created anew with another salt
+        try:
+            signature = _file_signature(self.path)
+        except FileNotFoundError:
+            raise VaultError(f"Vault file '{self.path}' not found; create it with 'python3 Vault.py init'.")
+        if self._data is not None and signature == self._signature:
+            return self._data
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            raise VaultError(f"Could not read the vault '{self.path}': {e}")
+        if not isinstance(data, dict) or not {'salt', 'check', 'secrets'} <= data.keys():
+            raise VaultError(f"'{self.path}' is not a vault file.")
+        if self._data is None or data['salt'] != self._data['salt']:
+            self._fernet = None
+        self._data, self._signature = data, signature
+        self._cache.clear()
+        return data
+
+    def _write(self) -> None:
+        temp_path = f"{self.path}.tmp"
+        # the file only holds encrypted values, but there is no reason for others to read it
+        with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+            json.dump(self._data, file, indent=2)
+        os.replace(temp_path, self.path)
+        self._signature = _file_signature(self.path)
+
+    def _decrypt(self, token) -> bytes:
+        from cryptography.fernet import InvalidToken
+
+        try:
+            return self._fernet.decrypt(token.encode())
+        except InvalidToken:
+            raise VaultError(f"A secret in the vault '{self.path}' could not be decrypted.") from None
+
+
+def _fernet(passphrase, data):
+    # Fernet (AES-128-CBC with an HMAC) with a key derived from the passphrase by scrypt
+    try:
+        from cryptography.fernet import Fernet
+    except ImportError:
+        raise VaultError("The vault needs the 'cryptography' package: pip3 install cryptography") from None
+    n, r, p = data.get('n', SCRYPT_N), data.get('r', SCRYPT_R), data.get('p', SCRYPT_P)
+    key = hashlib.scrypt(passphrase.encode(), salt=base64.b64decode(data['salt']), n=n, r=r, p=p,
+                         maxmem=256 * n * r + 1024 * 1024, dklen=32)
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def _file_signature(path) -> tuple:
+    status = os.stat(path)
+    return status.st_mtime_ns, status.st_size
+
+
+def migrate(vault, filename) -> int:
+    # moves the plaintext passwords of a devices file into the vault and replaces them with references;
+    # devices with the same password share one secret. Existing secrets are never overwritten: another device
+    # may refer to them, so a new secret whose name is taken is stored as <name>-2, <name>-3, ...
+    # Returns the number of values replaced.
+    with open(filename, 'r') as file:
+        entries = json.load(file)
+    names = {}  # secret -> name it is stored under
+    taken = set(vault.names())
+    for name in taken:
+        names[vault.get(name)] = name
+    replaced = 0
+    for entry in entries:
+        for field, suffix in (('password', 'password'), ('exec_password', 'enable')):
+            value = entry.get(field)
+            if not isinstance(value, str) or not value or is_reference(value):
+                continue
+            name = names.get(value)
+            if name is None:
+                base = name = f"{entry.get('hostname', entry.get('ip_address'))}-{suffix}"
+                number = 2
+                while name in taken:
+                    name, number = f"{base}-{number}", number + 1
+                names[value] = name
+                taken.add(name)
+                vault.set(name, value)
+            entry[field] = REFERENCE_PREFIX + name
+            replaced += 1
+
+    temp_path = f"{filename}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump(entries, file, indent=2)
+    os.replace(temp_path, filename)
+    return replaced
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the encrypted device passwords referenced from devices.json "
+                                                 "as \"vault:<name>\".")
+    parser.add_argument('--vault', default=os.environ.get('NETAUTO_VAULT_FILE', 'vault.json'),
+                        help="vault file (default: vault.json, or NETAUTO_VAULT_FILE)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('init', help="create a new vault")
+    commands.add_parser('list', help="names of the stored secrets")
+    set_secret = commands.add_parser('set', help="store a secret (asked for without echo)")
+    set_secret.add_argument('name')
+    remove = commands.add_parser('remove', help="delete a secret")
+    remove.add_argument('name')
+    migrate_file = commands.add_parser('migrate', help="move the plaintext passwords of a devices file into the vault")
+    migrate_file.add_argument('--devices', default='devices.json', help="device data file (default: devices.json)")
+    args = parser.parse_args()
+
+    store = Vault(args.vault)
+    try:
+        if args.command == 'init':
+            passphrase = getpass.getpass("New vault passphrase: ")
+            if not passphrase or passphrase != getpass.getpass("Repeat the passphrase: "):
+                raise VaultError("The passphrases are empty or do not match.")
+            store.create(passphrase)
+            print(f"Vault '{args.vault}' created.")
+        elif args.command == 'list':
+            for name in store.names():
+                print(name)
+        elif args.command == 'set':
+            store.unlock()
+            store.set(args.name, getpass.getpass(f"Secret '{args.name}': "))
+            print(f"Stored '{args.name}'; use \"{REFERENCE_PREFIX}{args.name}\" in the devices file.")
+        elif args.command == 'remove':
+            store.remove(args.name)
+            print(f"Removed '{args.name}'.")
+        else:
+            store.unlock()
+            replaced = migrate(store, args.devices)
+            print(f"Replaced {replaced} plaintext password(s) in '{args.devices}' with vault references.")
+    except (VaultError, OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        raise SystemExit(1)
+
+
+# vault shared by the whole application
+vault = Vault(os.environ.get('NETAUTO_VAULT_FILE', 'vault.json'))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import re
+import time
+
+from Addressing import classful_network, dotted_netmask
+from RunningConfig import ConfigTree, SUBMODE_PREFIXES, normalize
+from Templates import DEFAULT_PLATFORM, platform_for
+
+# post-checks of every configuration operation, per platform, run after the change was pushed. A check either
+#   'expect's (or 'reject's) a regex in the output of a show 'command', or
+#   needs the 'config' lines in the running-config: the first line may open a section ('interface ...'), and
+#   the others must be configured under it
+# {name} is replaced by the operation's value ({*name} repeats the line for every item of a list), and
+# 'when' names a value that must be true for the check to apply. 'converge' checks wait for the network
+# to settle (an HSRP election, a DHCP lease): they are polled with backoff until they pass or time out.
+CHECKS = {
+    'vlan': {
+        'cisco_ios': [{'name': "VLAN {vlan_id} is active", 'command': 'show vlan brief',
+                       'expect': r'^{vlan_id}\s+{vlan_name}\s+active\b'}],
+        'cisco_nxos': [{'name': "VLAN {vlan_id} is active", 'command': 'show vlan brief',
+                        'expect': r'^{vlan_id}\s+{vlan_name}\s+active\b'}],
+    },
+    'port_security': {
+        'cisco_ios': [{'name': "port security is enabled on {interface}",
+                       'config': ['interface {interface}', 'switchport port-security']}],
+        'cisco_nxos': [{'name': "port security is enabled on {interface}",
+                        'config': ['interface {interface}', 'switchport port-security']}],
+    },
+    'stp': {
+        'cisco_ios': [{'name': "spanning tree runs rapid-PVST+", 'when': 'rapid_pvst',
+                       'config': ['spanning-tree mode rapid-pvst']}],
+        'cisco_nxos': [{'name': "spanning tree runs rapid-PVST+", 'when': 'rapid_pvst',
+                        'config': ['spanning-tree mode rapid-pvst']}],
+    },
+    'dhcp_server': {
+        'cisco_ios': [{'name': "DHCP pool {pool_name} serves {network_address}",
+                       'config': ['ip dhcp pool {pool_name}', 'network {network_address} {netmask}',
+                                  'default-router {default_router}']}],
+    },
+    'dhcp_helper': {
+        'cisco_ios': [{'name': "{interface} relays DHCP to {helper_address}",
+                       'config': ['interface {interface}', 'ip helper-address {helper_address}']}],
+        'cisco_nxos': [{'name': "{interface} relays DHCP to {helper_address}",
+                        'config': ['interface {interface}', 'ip dhcp relay address {helper_address}']}],
+    },
+    'dhcp_client': {
+        'cisco_ios': [{'name': "{interface} has a DHCP lease", 'command': 'show ip interface brief',
+                       'expect': r'^{interface}\s+\d+\.\d+\.\d+\.\d+\s+\S+\s+DHCP\b', 'converge': True}],
+    },
+    'hsrp': {
+        'cisco_ios': [
+            {'name': "HSRP group {group_id} on {interface} has virtual IP {virtual_ip}",
+             'config': ['interface {interface}', 'standby {group_id} ip {virtual_ip}']},
+            {'name': "HSRP group {group_id} on {interface} is active or standby", 'command': 'show standby brief',
+             'expect': r'^{short_interface}\s+{group_id}\s+\d+\s+P?\s*(Active|Standby)\b', 'converge': True},
+        ],
+    },
+    'ripv2': {
+        'cisco_ios': [{'name': "RIP advertises its networks", 'config': ['router rip', 'network {*networks}']}],
+    },
+}
+
+# seconds converging checks are polled for: the first delay between polls, the longest one, and the limit
+POLL_DELAY = 1.0
+MAX_POLL_DELAY = 8.0
+CONVERGE_TIMEOUT = 60.0
+
+# how the command builders send some values, so the checks look for them in the same form
+VALUE_FORMS = {
+    'netmask': dotted_netmask,
+    'networks': lambda networks: list(dict.fromkeys(classful_network(network) for network in networks)),
+}
+
+FIELD = re.compile(r'\{(\*?)(\w+)\}')
+
+
+def checks_for(operation, platform=DEFAULT_PLATFORM, **values) -> list:
+    # the checks of an operation with its values filled in, for run_checks; the values are those given to the
+    # operation's command builder (Switch.vlan_commands, Router.hsrp_commands, ...)
+    if operation == 'vlan_range':
+        # every VLAN of the range is checked like a single VLAN
+        from Switch import Switch
+
+        name_template = values.get('name_template') or "VLAN_{id}"
+        return [check for vlan_id in Switch.parse_vlan_range(values['vlans'])
+                for check in checks_for('vlan', platform, vlan_id=vlan_id,
+                                        vlan_name=name_template.format(id=vlan_id))]
+
+    if operation == 'port_security_range':
+        # every interface of the range is checked like a single port security interface
+        from Switch import Switch
+
+        return [check for interface in Switch.parse_interface_range(values['interface_range'])
+                for check in checks_for('port_security', platform, interface=interface)]
+
+    # values the builders send in another form than they are given ('/24' is sent as 255.255.255.0)
+    values = {name: VALUE_FORMS[name](value) if name in VALUE_FORMS and value else value
+              for name, value in values.items()}
+    if values.get('interface'):
+        # show commands print full interface names, 'show standby brief' short ones ('Gi0/1')
+        full_name = normalize(f"interface {values['interface']}")[len('interface '):]
+        values = dict(values, interface=full_name, short_interface=full_name[:2] + re.sub(r'^\D+', '', full_name))
+
+    checks = []
+    for definition in CHECKS.get(operation, {}).get(platform_for(platform), []):
+        if definition.get('when') and not values.get(definition['when']):
+            continue
+        check = {'name': _fill(definition['name'], values), 'converge': definition.get('converge', False)}
+        if 'config' in definition:
+            check['command'] = 'show running-config'
+            check['config'] = [line for text in definition['config'] for line in _fill_lines(text, values)]
+        else:
+            check['command'] = _fill(definition['command'], values)
+            for key in ('expect', 'reject'):
+                if key in definition:
+                    check[key] = _fill(definition[key], values, re.escape)
+        checks.append(check)
+    return checks
+
+
+def run_checks(device, checks, converge_timeout=CONVERGE_TIMEOUT, read_timeout=60) -> list:
+    # runs the checks on one device and returns one {'name', 'ok', 'detail'} per check, in order. The show
+    # commands of all pending checks are sent as one batch per poll; checks that fail are failed at once,
+    # except 'converge' ones, which are polled again after 1, 2, 4... seconds until converge_timeout.
+    results = [None] * len(checks)
+    pending = list(enumerate(checks))
+    deadline = time.monotonic() + converge_timeout
+    delay = POLL_DELAY
+    while pending:
+        outputs = device.run_commands([check['command'] for _, check in pending], read_timeout=read_timeout)
+        waiting = []
+        for index, check in pending:
+            detail = _evaluate(check, outputs.get(check['command'], ''))
+            if detail and check.get('converge') and time.monotonic() + delay < deadline:
+                waiting.append((index, check))
+            else:
+                results[index] = {'name': check.get('name') or check['command'], 'ok': detail is None,
+                                  'detail': detail}
+        pending = waiting
+        if pending:
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_POLL_DELAY)
+    return results
+
+
+def format_results(results) -> str:
+    # one PASS/FAIL line per check
+    lines = []
+    for result in results:
+        lines.append(f"{'PASS' if result['ok'] else 'FAIL'}  {result['name']}")
+        if not result['ok']:
+            lines.append(f"      {result['detail']}")
+    return '\n'.join(lines)
+
+
+def failed_checks(results) -> str:
+    # the failed checks of one device as one line, for error messages; empty when all passed
+    return "; ".join(f"{result['name']} ({result['detail']})" for result in results if not result['ok'])
+
+
+def _evaluate(check, output):
+    # returns why the check failed, or None when it passed
+    if 'config' in check:
+        tree = ConfigTree.parse(output)
+        section = None
+        missing = []
+        for line in check['config']:
+            line = normalize(line)
+            if line.startswith(SUBMODE_PREFIXES) and section is None:
+                section = line
+                if section not in tree.sections:
+                    return f"'{section}' is not in the running-config"
+            elif not tree.has(line, section):
+                missing.append(line)
+        return f"missing from the running-config: {', '.join(missing)}" if missing else None
+
+    if check.get('expect') and not re.search(check['expect'], output, re.MULTILINE):
+        return f"'{check['command']}' does not match '{check['expect']}'"
+    if check.get('reject') and re.search(check['reject'], output, re.MULTILINE):
+        return f"'{check['command']}' matches '{check['reject']}'"
+    return None
+
+
+def _fill(text, values, escape=str) -> str:
+    # replaces {name} with the value; braces that do not name a value (regex repetitions) are left alone
+    return FIELD.sub(lambda match: escape(str(values[match.group(2)])) if match.group(2) in values
+                     else match.group(0), text)
+
+
+def _fill_lines(text, values) -> list:
+    # a line with {*name} is repeated for every item of the list value
+    match = FIELD.search(text)
+    if match and match.group(1) == '*':
+        return [text.replace(match.group(0), str(item)) for item in values.get(match.group(2)) or []]
+    return [_fill(text, values)]
@@ -0,0 +1,36 @@
+import ipaddress
+import itertools
+import random
+
+from Addressing import find_overlaps
+
+
+def net(text):
+    return ipaddress.IPv4Network(text)
+
+
+def test_find_overlaps_nested_and_disjoint():
+    networks = [('a', net('10.0.0.0/16')), ('b', net('10.1.0.0/24')), ('c', net('10.0.5.0/24')),
+                ('d', net('10.0.5.128/25')), ('e', net('192.168.0.0/24'))]
+    found = {(label, other) for label, _, other, _ in find_overlaps(networks)}
+    assert found == {('c', 'a'), ('d', 'a')}
+
+
+def test_find_overlaps_reports_every_overlapping_network():
+    # each network overlapping another is reported once, like comparing every pair would find
+    rng = random.Random(7)
+    networks = []
+    for i in range(300):
+        prefix = rng.randint(20, 30)
+        address = ipaddress.IPv4Address(rng.randrange(0x0A000000, 0x0A100000))
+        networks.append((f'n{i}', ipaddress.IPv4Network(f'{address}/{prefix}', strict=False)))
+
+    reported = [label for label, *_ in find_overlaps(networks)]
+    expected = set()
+    for (i, (a, x)), (j, (b, y)) in itertools.combinations(enumerate(networks), 2):
+        if x.overlaps(y):
+            # the later of the two in address order (equal networks: in the given order) is the one reported
+            first, second = sorted([(x.network_address, x.prefixlen, i, a), (y.network_address, y.prefixlen, j, b)])
+            expected.add(second[3])
+    assert len(reported) == len(set(reported))
+    assert set(reported) == expected
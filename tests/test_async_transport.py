@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from ConnectionPool import ConnectionPool
+from Health import CircuitOpenError, DeviceHealth
+
+asyncssh = pytest.importorskip('asyncssh')
+
+from AsyncTransport import AsyncSSHTransport  # noqa: E402
+
+DETAILS = {'host': '192.0.2.1', 'username': 'admin', 'password': 'cisco', 'device_type': 'cisco_ios'}
+
+
+def transport_with(tmp_path, outcomes):
+    # a transport whose connection attempts raise or succeed in the given order, counting them
+    pool = ConnectionPool(retries=2, retry_delay=0.001, health=DeviceHealth(str(tmp_path / 'health.json'),
+                                                                            failure_threshold=2))
+    transport = AsyncSSHTransport(DETAILS, pool=pool)
+    transport.attempts = 0
+
+    async def connect_once(details):
+        transport.attempts += 1
+        outcome = outcomes.pop(0)
+        if outcome is not None:
+            raise outcome
+
+    transport._connect = connect_once
+    return transport
+
+
+def test_connect_retries_and_records_success(tmp_path):
+    transport = transport_with(tmp_path, [ConnectionRefusedError(), asyncio.TimeoutError(), None])
+    asyncio.run(transport.connect())
+    assert transport.attempts == 3
+    assert transport.pool.health.unhealthy() == {}
+
+
+def test_connect_fails_fast_once_the_circuit_is_open(tmp_path):
+    transport = transport_with(tmp_path, [ConnectionRefusedError()] * 6)
+    for _ in range(2):
+        with pytest.raises(ConnectionRefusedError):
+            asyncio.run(transport.connect())
+    assert transport.attempts == 6
+    # the device is known to be down: no connection is attempted
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(transport.connect())
+    assert transport.attempts == 6
+
+
+def test_wrong_credentials_are_not_retried(tmp_path):
+    transport = transport_with(tmp_path, [asyncssh.PermissionDenied('denied'), None])
+    with pytest.raises(asyncssh.PermissionDenied):
+        asyncio.run(transport.connect())
+    assert transport.attempts == 1
+    assert '192.0.2.1' in transport.pool.health.unhealthy()
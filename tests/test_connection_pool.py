@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from ConnectionPool import ConnectionPool
+
+DETAILS = {'host': '192.0.2.1', 'device_type': 'cisco_ios'}
+
+
+class FakeConnection:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.disconnected = False
+
+    def is_alive(self):
+        return self.alive
+
+    def disconnect(self):
+        self.disconnected = True
+
+
+def pool_with(connections, **kwargs):
+    # a pool whose connections come from the given list instead of SSH
+    pool = ConnectionPool(**kwargs)
+    pool._open_with_retry = lambda device_details: connections.pop(0)
+    return pool
+
+
+def release_idle(pool, session):
+    # released as if it had sat idle past the keepalive interval, so the next acquire checks it
+    pool.release(session)
+    session.last_used -= pool.keepalive_interval + 1
+
+
+def test_reconnected_session_belongs_to_the_new_thread():
+    # a session that failed its health check is reopened for the thread that asked for it, so cancel() of
+    # that thread reaches it
+    dead, fresh = FakeConnection(alive=False), FakeConnection()
+    pool = pool_with([dead, fresh])
+    release_idle(pool, pool.acquire(DETAILS))
+
+    owners = []
+
+    def worker():
+        session = pool.acquire(DETAILS)
+        owners.append((session.connection, session.owner, threading.get_ident()))
+        pool.cancel(threading.get_ident())
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    connection, owner, ident = owners[0]
+    assert connection is fresh and owner == ident
+    assert fresh.disconnected
+    pool.uncancel(ident)
+    pool.close_all()
+
+
+def test_reconnect_of_a_cancelled_worker_fails():
+    dead, fresh = FakeConnection(alive=False), FakeConnection()
+    pool = pool_with([dead, fresh])
+    release_idle(pool, pool.acquire(DETAILS))
+
+    # the worker is cancelled while it reconnects
+    def open_and_cancel(device_details):
+        pool.cancel(threading.get_ident())
+        return fresh
+
+    pool._open_with_retry = open_and_cancel
+    with pytest.raises(TimeoutError):
+        pool.acquire(DETAILS)
+    pool.uncancel(threading.get_ident())
+    assert fresh.disconnected
+    assert pool._sessions == {}
+    pool.close_all()
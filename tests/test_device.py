@@ -0,0 +1,77 @@
+import pytest
+
+import asyncio
+
+from Device import Device
+
+
+class FakeConnection:
+    # answers like a device on one channel: each command is echoed and followed by its output and the prompt
+    # (the prompt before the first command was read at login), handed out in chunks that split lines and prompts
+    base_prompt = 'SW1'
+
+    def __init__(self, outputs, chunk_size=5):
+        self.outputs = outputs
+        self.chunk_size = chunk_size
+        self.pending = ''
+
+    def normalize_cmd(self, command):
+        return command.rstrip('\n') + '\n'
+
+    def write_channel(self, text):
+        for command in text.splitlines():
+            self.pending += f'{command}\r\n' + ''.join(f'{line}\r\n' for line in self.outputs[command]) + 'SW1#'
+
+    def read_channel(self):
+        chunk, self.pending = self.pending[:self.chunk_size], self.pending[self.chunk_size:]
+        return chunk
+
+
+def test_run_batch_splits_output_by_prompt():
+    pytest.importorskip('netmiko')
+    outputs = {
+        'show clock': ['*10:00:00.000 UTC Mon Oct 19 2026'],
+        'show vlan brief': ['VLAN Name Status Ports', '10   USERS active Gi0/1'],
+        'show ip route': [],
+    }
+    device = Device('SW1', '192.0.2.1', 'admin', 'cisco', 'pass', 'cisco_ios')
+    connection = FakeConnection(outputs)
+    result = device._run_batch(connection, list(outputs))
+    assert result == {command: '\n'.join(lines) for command, lines in outputs.items()}
+
+
+def parse_rows(output):
+    return [{'line': line, 'ports': []} for line in output.splitlines()]
+
+
+def test_show_structured_returns_copies_of_the_cached_rows():
+    device = Device('SW1', '192.0.2.10', 'admin', 'cisco', 'pass', 'cisco_ios')
+    device.run_command = lambda command: 'a\nb'
+    try:
+        rows = device.show_structured('show x', parse_rows)
+        rows[0]['ports'].append('Gi0/1')
+        rows.pop()
+        assert device.show_structured('show x', parse_rows) == parse_rows('a\nb')
+    finally:
+        device.clear_cached_output()
+
+
+def test_show_structured_async_returns_copies_of_the_cached_rows():
+    device = Device('SW1', '192.0.2.11', 'admin', 'cisco', 'pass', 'cisco_ios')
+
+    async def run_command_async(command):
+        return 'a\nb'
+
+    async def change_and_read():
+        # the rows of a miss and of a hit are both the caller's own
+        first = await device.show_structured_async('show x', parse_rows)
+        first[0]['ports'].append('Gi0/1')
+        second = await device.show_structured_async('show x', parse_rows)
+        second.pop()
+        return await device.show_structured_async('show x', parse_rows)
+
+    device.run_command_async = run_command_async
+    try:
+        assert asyncio.run(change_and_read()) == parse_rows('a\nb')
+    finally:
+        device.clear_cached_output()
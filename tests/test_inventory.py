@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import time
+
+import pytest
+
+from Inventory import Inventory, iter_json_array
+
+
+def entry(hostname, ip_address, **extra):
+    return dict({'type': 'switch', 'hostname': hostname, 'ip_address': ip_address, 'username': 'admin',
+                 'password': 'cisco', 'exec_password': 'pass', 'device_type': 'cisco_ios'}, **extra)
+
+
+def write(path, entries):
+    # bumps the modification time so reload_if_changed sees the new file even within one tick
+    path.write_text(json.dumps(entries))
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64 * 1024])
+def test_iter_json_array_matches_json_load(chunk_size):
+    # elements split across chunks are decoded the same as with json.load
+    entries = [entry(f'SW{i}', f'10.0.0.{i}', groups=['core', 'lab']) for i in range(1, 20)] + [[1, [2]], 'x]', 3]
+    text = json.dumps(entries, indent=2)
+    assert list(iter_json_array(io.StringIO(text), chunk_size)) == entries
+
+
+def test_iter_json_array_empty_and_whitespace():
+    assert list(iter_json_array(io.StringIO(' \n [ \n ] '), 2)) == []
+
+
+@pytest.mark.parametrize('text', ['{"a": 1}', '', '[{"a": 1},'])
+def test_iter_json_array_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), 4))
+
+
+def test_load_streamed_equals_parsed(tmp_path):
+    path = tmp_path / 'devices.json'
+    write(path, [entry('SW1', '10.0.0.1'), entry('SW2', '10.0.0.2', site='HQ')])
+    parsed = Inventory.load(str(path), stream=False)
+    streamed = Inventory.load(str(path), stream=True)
+    assert [r.as_dict() for r in parsed] == [r.as_dict() for r in streamed]
+
+
+def test_reload_applies_differences(tmp_path):
+    path = tmp_path / 'devices.json'
+    write(path, [entry('SW1', '10.0.0.1'), entry('SW2', '10.0.0.2', site='HQ'), entry('R1', '10.0.0.3')])
+    inventory = Inventory.load(str(path))
+    unchanged = inventory.by_ip('10.0.0.1')
+
+    write(path, [entry('SW1', '10.0.0.1'), entry('SW2', '10.0.0.2', site='Branch'), entry('R2', '10.0.0.4')])
+    added, removed, changed = inventory.reload_if_changed()
+
+    assert [r.hostname for r in added] == ['R2']
+    assert [r.hostname for r in removed] == ['R1']
+    assert [(old['site'], new['site']) for old, new in changed] == [('HQ', 'Branch')]
+    # unchanged records are kept as they are, and the file's order is kept
+    assert inventory.by_ip('10.0.0.1') is unchanged
+    assert [r.hostname for r in inventory] == ['SW1', 'SW2', 'R2']
+    assert inventory.by_ip('10.0.0.3') is None and inventory.by_hostname('R1') is None
+    assert inventory.by_hostname('sw2')['site'] == 'Branch'
+    assert inventory.reload_if_changed() is None
+
+
+def test_watcher_keeps_warnings_instead_of_printing(tmp_path, capsys):
+    path = tmp_path / 'devices.json'
+    write(path, [entry('SW1', '10.0.0.1')])
+    inventory = Inventory.load(str(path))
+    inventory.watch(interval=0.05)
+
+    write(path, [entry('SW1', '10.0.0.1'), entry('SW2', '10.0.0.1')])
+    deadline = time.monotonic() + 5
+    warnings = []
+    while not warnings and time.monotonic() < deadline:
+        time.sleep(0.05)
+        warnings = inventory.take_warnings()
+
+    assert warnings == ["Warning: Duplicate IP address 10.0.0.1 for 'SW2'. Skipping it."]
+    assert inventory.take_warnings() == []
+    assert capsys.readouterr() == ('', '')
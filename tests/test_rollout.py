@@ -0,0 +1,35 @@
+from Inventory import DeviceRecord, Inventory
+from Rollout import Rollout
+
+
+def inventory():
+    return Inventory(DeviceRecord.from_entry({'type': device_type, 'hostname': hostname,
+                                              'ip_address': f'10.0.0.{i}', 'username': 'admin',
+                                              'password': 'cisco', 'exec_password': 'pass',
+                                              'device_type': 'cisco_ios'})
+                     for i, (hostname, device_type) in enumerate(
+                         [('SW1', 'switch'), ('SW2', 'switch'), ('SW3', 'switch'), ('R1', 'router'),
+                          ('R2', 'router')], start=1))
+
+
+def hsrp(real_ip, priority):
+    return {'hsrp': {'interface': 'Gi0/1', 'real_ip': real_ip, 'subnet_mask': '255.255.255.0', 'group_id': 10,
+                     'virtual_ip': '192.168.10.1', 'priority': priority}}
+
+
+def test_waves_keep_groups_together():
+    job_data = {'jobs': [
+        {'devices': ['SW1'], 'operations': [{'vlan': {'vlan_id': 10, 'vlan_name': 'A'}}]},
+        {'devices': ['R1'], 'group': 'pair', 'operations': [hsrp('192.168.10.2', 110)]},
+        {'devices': ['SW2', 'SW3'], 'operations': [{'vlan': {'vlan_id': 10, 'vlan_name': 'A'}}]},
+        {'devices': ['R2'], 'group': 'pair', 'operations': [hsrp('192.168.10.3', 100)]},
+    ]}
+    assert Rollout(inventory(), canary=1, wave_size=1).waves(job_data) == [['SW1'], ['R1', 'R2'], ['SW2', 'SW3']]
+
+
+def test_waves_without_groups_split_jobs():
+    job_data = {'jobs': [
+        {'devices': ['R1'], 'operations': [hsrp('192.168.10.2', 110)]},
+        {'devices': ['R2'], 'operations': [hsrp('192.168.10.3', 100)]},
+    ]}
+    assert Rollout(inventory(), canary=1, wave_size=1).waves(job_data) == [['R1'], ['R2']]
@@ -0,0 +1,69 @@
+import pytest
+
+from RunningConfig import ConfigTree
+
+RUNNING = """!
+hostname SW1
+spanning-tree mode rapid-pvst
+!
+vlan 10
+ name USERS
+!
+interface GigabitEthernet0/1
+ switchport mode access
+ switchport access vlan 10
+!
+end
+"""
+
+
+def test_delta_drops_configured_commands():
+    tree = ConfigTree.parse(RUNNING)
+    assert tree.delta(['spanning-tree mode rapid-pvst', 'vlan 10', 'name USERS']) == []
+
+
+def test_delta_keeps_section_line_for_missing_subcommands():
+    tree = ConfigTree.parse(RUNNING)
+    commands = ['vlan 10', 'name USERS', 'exit', 'interface Gi0/1', 'switchport mode access',
+                'switchport port-security', 'exit', 'spanning-tree vlan 10 root primary']
+    # 'interface Gi0/1' matches the full interface name of the running-config
+    assert tree.delta(commands) == ['interface Gi0/1', 'switchport port-security', 'exit',
+                                    'spanning-tree vlan 10 root primary']
+
+
+def test_delta_sends_new_sections_even_when_empty():
+    tree = ConfigTree.parse(RUNNING)
+    assert tree.delta(['vlan 20', 'name USERS']) == ['vlan 20', 'name USERS']
+
+
+def test_delta_negations():
+    tree = ConfigTree.parse(RUNNING)
+    assert tree.delta(['no ip domain-lookup', 'no spanning-tree mode rapid-pvst']) == [
+        'no spanning-tree mode rapid-pvst']
+
+
+def test_rollback_restores_changed_sections():
+    before = ConfigTree.parse(RUNNING)
+    current = ConfigTree.parse(RUNNING.replace(' switchport access vlan 10\n', ' switchport access vlan 20\n')
+                               + 'vlan 30\n name NEW\n')
+    commands = ['vlan 30', 'name NEW', 'exit', 'interface Gi0/1', 'switchport access vlan 20']
+    assert before.rollback(current, commands) == [
+        'interface GigabitEthernet0/1', 'no switchport access vlan 20', 'switchport access vlan 10', 'exit',
+        'no vlan 30']
+
+
+def test_rollback_refuses_nested_blocks():
+    # NX-OS keeps HSRP groups as a nested level under the interface
+    before = ConfigTree.parse('interface Vlan10\n  ip address 10.0.0.2/24\n')
+    current = ConfigTree.parse('interface Vlan10\n  ip address 10.0.0.2/24\n  hsrp version 2\n  hsrp 10\n'
+                               '    ip 10.0.0.1\n    priority 110\n')
+    commands = ['interface Vlan10', 'hsrp version 2', 'hsrp 10', 'ip 10.0.0.1', 'priority 110']
+    with pytest.raises(ValueError, match="nested"):
+        before.rollback(current, commands)
+
+
+def test_rollback_refuses_vlans_missing_from_the_running_config():
+    # with VTP in server or client mode the VLANs are not in the running-config, so their change is unknown
+    tree = ConfigTree.parse(RUNNING)
+    with pytest.raises(ValueError, match="vlan 20"):
+        tree.rollback(tree, ['vlan 20', 'name VOICE'])
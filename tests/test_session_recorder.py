@@ -0,0 +1,44 @@
+from SessionRecorder import SessionRecorder
+
+
+def test_secret_split_across_chunks_is_masked():
+    recorder = SessionRecorder()
+    recorder.record('10.0.0.1', 'sent', 'show running-config | include pass')
+    for chunk in ['enable pass', 'word 0 hunter2\nuser', 'name admin sec', 'ret 5 $1$abc\n', 'SW1#']:
+        recorder.record('10.0.0.1', 'received', chunk, complete=False)
+    # the end of the command
+    recorder.record('10.0.0.1', 'received', '\n', complete=False)
+
+    transcript = recorder.recent('10.0.0.1')
+    assert 'hunter2' not in transcript and '$1$abc' not in transcript
+    assert transcript.endswith('enable password 0 ********\nusername admin secret 5 ********\nSW1#\n')
+
+
+def test_held_line_is_written_before_the_next_record():
+    recorder = SessionRecorder()
+    recorder.record('10.0.0.1', 'received', 'SW1#', complete=False)
+    recorder.record('10.0.0.1', 'sent', 'show clock')
+    assert recorder.recent('10.0.0.1').startswith('SW1#')
+    assert '> show clock' in recorder.recent('10.0.0.1')
+
+
+def test_partial_lines_are_held_per_session():
+    # two pooled sessions to the same device, their output arriving interleaved
+    recorder = SessionRecorder()
+    first, second = object(), object()
+    recorder.record('10.0.0.1', 'received', 'enable pass', complete=False, session=first)
+    recorder.record('10.0.0.1', 'received', 'interface Gi0/', complete=False, session=second)
+    recorder.record('10.0.0.1', 'received', 'word 0 hunter2\n', complete=False, session=first)
+    recorder.record('10.0.0.1', 'received', '1\n', complete=False, session=second)
+
+    transcript = recorder.recent('10.0.0.1')
+    assert 'hunter2' not in transcript
+    assert 'enable password 0 ********\n' in transcript
+    assert 'interface Gi0/1\n' in transcript
+
+
+def test_clear_drops_held_lines():
+    recorder = SessionRecorder()
+    recorder.record('10.0.0.1', 'received', 'SW1#', complete=False, session=object())
+    recorder.clear()
+    assert recorder._partial == {}
@@ -0,0 +1,89 @@
+import sqlite3
+
+import pytest
+
+from Router import Router
+from StateStore import StateStore
+from Switch import Switch
+
+INTERFACES = """Interface              IP-Address      OK? Method Status                Protocol
+GigabitEthernet0/0     10.0.0.1        YES manual up                    up
+GigabitEthernet0/1     unassigned      YES unset  down                  down
+GigabitEthernet0/2     unassigned      YES unset  administratively down down
+"""
+VLANS = """VLAN Name                             Status    Ports
+---- -------------------------------- --------- -------------------------------
+1    default                          active    Gi0/3
+10   USERS                            active    Gi0/1, Gi0/2
+"""
+
+
+def fake(cls, hostname, ip_address, outputs=None):
+    # a device that answers its show commands with canned output instead of connecting
+    device = cls(hostname, ip_address, 'admin', 'cisco', 'pass', 'cisco_ios')
+
+    def run_command(command, *args, **kwargs):
+        if outputs is None:
+            raise ConnectionError("unreachable")
+        return outputs[command]
+
+    device.run_command = run_command
+    return device
+
+
+@pytest.fixture
+def store(tmp_path):
+    devices = [fake(Switch, 'SW1', '192.0.2.21', {'show ip interface brief': INTERFACES, 'show vlan brief': VLANS}),
+               fake(Router, 'R1', '192.0.2.22',
+                    {'show ip interface brief': INTERFACES.replace('10.0.0.1', '10.0.1.1')})]
+    store = StateStore(str(tmp_path / 'state.db'))
+    try:
+        results = store.collect(devices, max_workers=2)
+        assert all(result.ok for result in results)
+        yield store
+    finally:
+        store.close()
+        for device in devices:
+            device.clear_cached_output()
+
+
+def test_collect_stores_the_parsed_tables(store):
+    assert store.query("SELECT host, hostname, type, error FROM devices ORDER BY hostname") == [
+        {'host': '192.0.2.22', 'hostname': 'R1', 'type': 'router', 'error': None},
+        {'host': '192.0.2.21', 'hostname': 'SW1', 'type': 'switch', 'error': None}]
+    assert store.query("SELECT COUNT(*) AS n FROM interfaces") == [{'n': 6}]
+    # routers have no VLAN table
+    assert store.query("SELECT DISTINCT host FROM vlans") == [{'host': '192.0.2.21'}]
+
+
+def test_queries(store):
+    assert store.devices_with_vlan(10) == [{'hostname': 'SW1', 'host': '192.0.2.21', 'vlan_id': 10, 'name': 'USERS',
+                                            'status': 'active', 'ports': 'Gi0/1, Gi0/2'}]
+    assert store.devices_with_vlan(30) == []
+    assert [(row['hostname'], row['interface']) for row in store.interfaces_down()] == [
+        ('R1', 'GigabitEthernet0/1'), ('SW1', 'GigabitEthernet0/1')]
+    assert len(store.interfaces_down(include_shutdown=True)) == 4
+    assert store.port_vlan('Gi0/2') == [{'hostname': 'SW1', 'host': '192.0.2.21', 'port': 'Gi0/2', 'vlan_id': 10}]
+    assert store.stale(3600) == []
+    assert [row['hostname'] for row in store.stale(-1)] == ['R1', 'SW1']
+
+
+def test_failed_collection_keeps_the_last_rows(store):
+    device = fake(Switch, 'SW1', '192.0.2.21')
+    try:
+        assert not store.collect([device])[0].ok
+    finally:
+        device.clear_cached_output()
+    assert store.devices_with_vlan(10)[0]['ports'] == 'Gi0/1, Gi0/2'
+    stale = store.stale(3600)
+    assert [row['hostname'] for row in stale] == ['SW1'] and 'unreachable' in stale[0]['error']
+
+
+def test_sql_command_is_read_only(store):
+    assert store.read_only_query("SELECT COUNT(*) AS n FROM vlans") == [{'n': 2}]
+    for statement in ("DELETE FROM vlans", "DROP TABLE devices", "INSERT INTO vlans VALUES ('x', 1, 'a', 'b')"):
+        with pytest.raises(sqlite3.Error):
+            store.read_only_query(statement)
+    assert store.query("SELECT COUNT(*) AS n FROM vlans") == [{'n': 2}]
+    # the store's own writes are not affected
+    store.db.execute("DELETE FROM vlans")
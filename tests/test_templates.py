@@ -0,0 +1,44 @@
+import pytest
+
+from Router import Router
+from Switch import Switch
+from Templates import render
+
+
+# the command lists the builders sent before they were rendered from templates
+def test_switch_builders_match_original_commands():
+    assert Switch.vlan_commands(10, 'USERS') == ['vlan 10', 'name USERS']
+    assert Switch.security_commands('Gi0/1', 10, 'restrict', 2) == [
+        'interface Gi0/1', 'switchport mode access', 'switchport access vlan 10', 'switchport port-security',
+        'switchport port-security maximum 2', 'switchport port-security violation restrict',
+        'spanning-tree portfast', 'spanning-tree bpduguard enable']
+    assert Switch.stp_commands(True, 10, 20) == [
+        'spanning-tree mode rapid-pvst', 'spanning-tree vlan 10 root primary', 'spanning-tree vlan 20 root secondary']
+    assert Switch.stp_commands(False, 10) == ['spanning-tree vlan 10 root primary']
+
+
+def test_router_builders_match_original_commands():
+    assert Router.ripv2_commands(['10.0.0.0', '192.168.1.0'], True) == [
+        'router rip', 'version 2', 'no auto-summary', 'network 10.0.0.0', 'network 192.168.1.0',
+        'redistribute static']
+    assert Router.dhcp_helper_commands('Gi0/1', '10.9.9.9') == ['interface Gi0/1', 'ip helper-address 10.9.9.9']
+    assert Router.dhcp_client_commands('Gi0/1') == ['interface Gi0/1', 'ip address dhcp', 'no shutdown']
+    assert Router.hsrp_commands('Gi0/0.10', '10.0.0.2', '/24', 1, '10.0.0.1', 110, True, 10) == [
+        'interface Gi0/0.10', 'encapsulation dot1q 10', 'ip address 10.0.0.2 255.255.255.0', 'standby version 2',
+        'standby 1 ip 10.0.0.1', 'standby 1 priority 110', 'standby 1 preempt']
+    # no encapsulation on a physical interface, no preempt when disabled
+    assert Router.hsrp_commands('Gi0/0', '10.0.0.2', '255.255.255.0', 1, '10.0.0.1', 100, False, 10) == [
+        'interface Gi0/0', 'ip address 10.0.0.2 255.255.255.0', 'standby version 2', 'standby 1 ip 10.0.0.1',
+        'standby 1 priority 100']
+
+
+@pytest.mark.parametrize('platform', ['cisco_ios', 'cisco_xe', 'cisco_ios_telnet'])
+def test_ios_family_renders_the_same(platform):
+    assert render('vlan', platform, vlan_id=10, vlan_name='USERS') == ['vlan 10', 'name USERS']
+
+
+def test_interface_range_is_validated():
+    assert Switch.parse_interface_range('Gi0/1.10 - 11') == ['Gi0/1.10', 'Gi0/1.11']
+    for interface_range in ('Gi0/5 - 2', 'Gi0/1 to 4'):
+        with pytest.raises(ValueError):
+            Switch.security_range_commands(interface_range, 10)
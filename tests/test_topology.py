@@ -0,0 +1,20 @@
+import pytest
+
+from Topology import device_kind
+
+
+@pytest.mark.parametrize('capabilities, kind', [
+    (['Router', 'Switch', 'IGMP'], 'switch'),
+    (['Switch', 'IGMP'], 'switch'),
+    (['Router'], 'router'),
+    (['Host', 'Phone', 'Two-port', 'Mac', 'Relay'], None),
+    (['B'], 'switch'),
+    (['B', 'R'], 'switch'),
+    (['R'], 'router'),
+    (['B', 'T'], None),
+    (['B', 'W'], None),
+    ([], None),
+])
+def test_device_kind(capabilities, kind):
+    # phones and access points advertise LLDP B (bridge) too, and are never crawled
+    assert device_kind(capabilities) == kind
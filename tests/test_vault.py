@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from Vault import Vault, VaultError, migrate
+
+pytest.importorskip('cryptography')
+
+
+def test_migrate_never_overwrites_a_secret(tmp_path):
+    vault = Vault(str(tmp_path / 'vault.json'))
+    vault.create('passphrase')
+    vault.unlock('passphrase')
+    vault.set('SW1-password', 'used-elsewhere')
+    devices = tmp_path / 'devices.json'
+    devices.write_text(json.dumps([
+        {'type': 'switch', 'hostname': 'SW1', 'ip_address': '10.0.0.1', 'username': 'admin', 'password': 'new',
+         'exec_password': 'used-elsewhere', 'device_type': 'cisco_ios'}]))
+
+    assert migrate(vault, str(devices)) == 2
+    assert vault.get('SW1-password') == 'used-elsewhere'
+    assert vault.get('SW1-password-2') == 'new'
+    entry = json.loads(devices.read_text())[0]
+    assert (entry['password'], entry['exec_password']) == ('vault:SW1-password-2', 'vault:SW1-password')
+
+
+def test_unlock_retry_after_a_wrong_passphrase(tmp_path, monkeypatch):
+    Vault(str(tmp_path / 'vault.json')).create('right')
+    vault = Vault(str(tmp_path / 'vault.json'))
+    with pytest.raises(VaultError):
+        vault.unlock('wrong')
+    # the wrong one is not asked for again, but a passphrase given explicitly is tried
+    monkeypatch.delenv('NETAUTO_VAULT_PASSPHRASE', raising=False)
+    monkeypatch.setattr('getpass.getpass', lambda prompt='': pytest.fail("asked for the passphrase again"))
+    with pytest.raises(VaultError):
+        vault.unlock()
+    vault.unlock('right')
+    vault.set('a', 'b')
+    assert vault.get('a') == 'b'
+
+
+def test_unlock_for_asks_again_after_a_wrong_passphrase(tmp_path, monkeypatch, capsys):
+    Vault(str(tmp_path / 'vault.json')).create('right')
+    vault = Vault(str(tmp_path / 'vault.json'))
+    monkeypatch.setenv('NETAUTO_VAULT_PASSPHRASE', 'wrong')
+    answers = ['typo', 'right']
+    monkeypatch.setattr('getpass.getpass', lambda prompt='': answers.pop(0))
+
+    vault.unlock_for(['plain', 'vault:a'], attempts=3)
+    assert answers == []
+    assert capsys.readouterr().err.count('Wrong passphrase') == 2
+    vault.set('a', 'b')
@@ -0,0 +1,31 @@
+from Verification import checks_for
+
+
+def test_checks_for_fills_values():
+    checks = checks_for('vlan', vlan_id=10, vlan_name='USERS')
+    assert checks == [{'name': 'VLAN 10 is active', 'converge': False, 'command': 'show vlan brief',
+                       'expect': r'^10\s+USERS\s+active\b'}]
+
+
+def test_checks_for_vlan_range_checks_every_vlan():
+    checks = checks_for('vlan_range', vlans='10-12,20', name_template='V{id}')
+    assert [check['name'] for check in checks] == [f'VLAN {i} is active' for i in (10, 11, 12, 20)]
+    assert checks[-1]['expect'] == r'^20\s+V20\s+active\b'
+
+
+def test_checks_for_normalizes_interfaces_and_masks():
+    checks = checks_for('hsrp', interface='Gi0/0', group_id=1, virtual_ip='10.0.0.1')
+    assert checks and all('Gi0/0' not in check['name'] or 'GigabitEthernet0/0' in check['name']
+                          for check in checks)
+
+
+def test_checks_for_unknown_operation():
+    assert checks_for('no_such_operation') == []
+
+
+def test_checks_for_port_security_range_checks_every_interface():
+    checks = checks_for('port_security_range', interface_range='Gi1/0/1 - 3, Fa0/5', access_vlan=10)
+    assert [check['config'][0] for check in checks] == [
+        'interface GigabitEthernet1/0/1', 'interface GigabitEthernet1/0/2', 'interface GigabitEthernet1/0/3',
+        'interface FastEthernet0/5']
+    assert all(check['config'][1] == 'switchport port-security' for check in checks)